@@ -2,8 +2,9 @@ import streamlit as st
 import os
 import json
 from common import (
-    DATA_FILE, Gang, load_data
+    DATA_FILE, Gang
 )
+from campaign_store import sync_session_campaign
 
 # # Set page config (this must be the very first Streamlit command)
 # st.set_page_config(
@@ -13,11 +14,7 @@ from common import (
 # )
 
 # -------------------- Session State Initialization --------------------
-if 'gangs' not in st.session_state:
-    gangs, territories, battles = load_data()
-    st.session_state.gangs = gangs
-    st.session_state.territories = territories
-    st.session_state.battles = battles
+sync_session_campaign()
 
 if "equipment_list" not in st.session_state:
     st.session_state.equipment_list = []
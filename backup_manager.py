@@ -2,31 +2,398 @@
 import os
 import json
 import shutil
+import gzip
+import hashlib
+import tarfile
+import time
+import atexit
+import threading
+import zipfile
 from datetime import datetime
 from pathlib import Path
 
+# How many hourly/daily/weekly buckets keep their newest backup
+RETENTION_TIERS = {"hourly": 48, "daily": 30, "weekly": 52}
+# The most recent backups are always kept, whatever their bucket
+KEEP_RECENT = 10
+
+# export_archive() formats: suffix -> tarfile mode (None means zip)
+ARCHIVE_FORMATS = {".tar.gz": "w:gz", ".tar.xz": "w:xz", ".zip": None}
+
+# Entity directories under data/ (files named <key>.json) and the journals replayed over them, oldest first
+ENTITY_DIRS = ("gangs", "territories", "battles", "equipment")
+JOURNAL_FILES = ("journal.compacting.jsonl", "journal.jsonl")
+
 class BackupManager:
+    """
+    Content-addressed backups of the data/ directory.
+
+    Every distinct file content is stored once, gzip-compressed, under backups/objects/,
+    named by the hash of the uncompressed content. A backup is a small JSON manifest
+    (backups/backup_<timestamp>.json) mapping each file's path to its hash, so a backup
+    only costs the files that changed since the previous one. Old backups are thinned
+    out by hourly/daily/weekly retention tiers.
+    """
     def __init__(self, backup_dir="backups"):
         self.backup_dir = Path(backup_dir)
-        self.backup_dir.mkdir(parents=True, exist_ok=True)
-        
+        self.objects_dir = self.backup_dir / "objects"
+        self.objects_dir.mkdir(parents=True, exist_ok=True)
+
+    def schedule_backup(self):
+        """
+        Requests a backup without waiting for it. Requests are coalesced by the
+        process-wide scheduler for this backup directory and run on its worker thread.
+        """
+        _scheduler_for(self).request()
+
     def create_backup(self, data_dir="data"):
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        backup_path = self.backup_dir / f"backup_{timestamp}"
-        
         try:
-            # Create a new backup directory with timestamp
-            shutil.copytree(data_dir, backup_path)
-            
-            # Keep only the last 5 backups
+            previous = self._latest_manifest()
+            files = self._snapshot_files(Path(data_dir), previous.get("files", {}) if previous else {})
+            if previous and previous.get("files") == files:
+                # Nothing changed since the last backup; it is still a valid restore point
+                return True
+
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+            manifest = {"created": datetime.now().isoformat(), "data_dir": str(data_dir), "files": files}
+            manifest_path = self.backup_dir / f"backup_{timestamp}.json"
+            tmp_path = manifest_path.with_suffix(".tmp")
+            tmp_path.write_text(json.dumps(manifest))
+            os.replace(tmp_path, manifest_path)
+
             self._cleanup_old_backups()
             return True
         except Exception as e:
             print(f"Backup failed: {e}")
             return False
-            
-    def _cleanup_old_backups(self, keep_last=5):
-        backups = sorted(self.backup_dir.glob("backup_*"))
-        if len(backups) > keep_last:
-            for backup in backups[:-keep_last]:
+
+    def _snapshot_files(self, data_dir, previous_files, store=True):
+        """
+        Stores the blobs of every file under data_dir and returns {relative path: entry}.
+        Files whose size and mtime match the previous backup reuse its hash unread.
+        With store=False only the hashes are computed (used to diff live data).
+        """
+        files = {}
+        for path in sorted(data_dir.rglob("*")):
+            if not path.is_file() or path.suffix == ".tmp":
+                continue
+            rel_path = path.relative_to(data_dir).as_posix()
+            stat = path.stat()
+            entry = previous_files.get(rel_path)
+            if entry and entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns \
+                    and self._blob_path(entry["hash"]).exists():
+                files[rel_path] = entry
+                continue
+            files[rel_path] = {
+                "hash": self._store_blob(path) if store else _hash_file(path),
+                "size": stat.st_size,
+                "mtime_ns": stat.st_mtime_ns,
+            }
+        return files
+
+    def _blob_path(self, digest):
+        """Path of a stored blob; blobs written before compression was added have no .gz suffix."""
+        compressed = self.objects_dir / digest[:2] / f"{digest}.gz"
+        if compressed.exists():
+            return compressed
+        plain = self.objects_dir / digest[:2] / digest
+        return plain if plain.exists() else compressed
+
+    def _open_blob(self, digest):
+        blob_path = self._blob_path(digest)
+        return gzip.open(blob_path, "rb") if blob_path.suffix == ".gz" else open(blob_path, "rb")
+
+    def _store_blob(self, path):
+        """Compresses a file into the object store unless its content is already there. Returns its hash."""
+        digest = _hash_file(path)
+        blob_path = self._blob_path(digest)
+        if blob_path.exists():
+            # Refresh so a concurrent garbage collection treats it as in use
+            os.utime(blob_path)
+        else:
+            blob_path.parent.mkdir(exist_ok=True)
+            tmp_path = blob_path.with_suffix(".tmp")
+            with open(path, "rb") as src, gzip.open(tmp_path, "wb") as dst:
+                shutil.copyfileobj(src, dst)
+            os.replace(tmp_path, blob_path)
+        return digest
+
+    def list_backups(self, manifests_only=False):
+        """Backup names, oldest first. Older full-copy backups are directories, newer ones manifests."""
+        return [
+            p.stem if p.is_file() else p.name
+            for p in sorted(self.backup_dir.glob("backup_*"))
+            if p.suffix == ".json" or (p.is_dir() and not manifests_only)
+        ]
+
+    def load_manifest(self, name):
+        with open(self.backup_dir / f"{name}.json", "r") as f:
+            return json.load(f)
+
+    def _latest_manifest(self):
+        manifests = sorted(self.backup_dir.glob("backup_*.json"))
+        return self.load_manifest(manifests[-1].stem) if manifests else None
+
+    def export_backup(self, name, target_dir):
+        """Writes out the full data/ tree of a backup into target_dir."""
+        target_dir = Path(target_dir)
+        for rel_path, entry in self.load_manifest(name)["files"].items():
+            target = target_dir / rel_path
+            target.parent.mkdir(parents=True, exist_ok=True)
+            with self._open_blob(entry["hash"]) as src, open(target, "wb") as dst:
+                shutil.copyfileobj(src, dst)
+
+    def export_archive(self, name, archive_path):
+        """
+        Writes a backup as one compressed archive (.tar.gz, .tar.xz or .zip, picked by
+        archive_path's suffix), e.g. for syncing it off this machine.
+        """
+        archive_path = str(archive_path)
+        suffix = next((s for s in ARCHIVE_FORMATS if archive_path.endswith(s)), None)
+        if suffix is None:
+            raise ValueError(f"Unsupported archive format: {archive_path} (use {', '.join(ARCHIVE_FORMATS)})")
+        files = self.load_manifest(name)["files"]
+        if ARCHIVE_FORMATS[suffix] is None:
+            with zipfile.ZipFile(archive_path, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+                for rel_path, entry in files.items():
+                    with self._open_blob(entry["hash"]) as src, archive.open(rel_path, "w") as dst:
+                        shutil.copyfileobj(src, dst)
+        else:
+            with tarfile.open(archive_path, ARCHIVE_FORMATS[suffix]) as archive:
+                for rel_path, entry in files.items():
+                    info = tarfile.TarInfo(rel_path)
+                    info.size = entry["size"]
+                    info.mtime = entry["mtime_ns"] // 1_000_000_000
+                    with self._open_blob(entry["hash"]) as src:
+                        archive.addfile(info, src)
+
+    # ---- Point-in-time diff and restore ----
+
+    def backup_at(self, when):
+        """Name of the newest backup taken at or before `when` (a datetime), or None."""
+        candidates = [
+            p for p in sorted(self.backup_dir.glob("backup_*.json"))
+            if self._backup_time(p) <= when
+        ]
+        return candidates[-1].stem if candidates else None
+
+    def _state(self, name, data_dir):
+        """(file map, reader) of a backup, or of the live data_dir when name is None."""
+        if name is not None:
+            files = self.load_manifest(name)["files"]
+            def read(rel_path):
+                with self._open_blob(files[rel_path]["hash"]) as f:
+                    return f.read()
+            return files, read
+        latest = self._latest_manifest()
+        files = self._snapshot_files(Path(data_dir), latest["files"] if latest else {}, store=False)
+        return files, lambda rel_path: (Path(data_dir) / rel_path).read_bytes()
+
+    @staticmethod
+    def _entity_sources(files, read):
+        """
+        {kind: {key: source}} for one state. A source is ("file", hash, path) for an entity
+        file, or ("journal", data) when an uncompacted journal record supersedes the file.
+        Only the journals are parsed.
+        """
+        sources = {kind: {} for kind in ENTITY_DIRS}
+        for rel_path, entry in files.items():
+            kind, _, file_name = rel_path.partition("/")
+            if kind in sources and file_name.endswith(".json") and "/" not in file_name:
+                sources[kind][file_name[:-len(".json")]] = ("file", entry["hash"], rel_path)
+        for journal in JOURNAL_FILES:
+            if journal not in files:
+                continue
+            for line in read(journal).splitlines():
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue  # torn write
+                if record["op"] == "delete":
+                    sources[record["kind"]].pop(record["key"], None)
+                else:
+                    sources[record["kind"]][record["key"]] = ("journal", record["data"])
+        return sources
+
+    @staticmethod
+    def _load_source(source, read):
+        return source[1] if source[0] == "journal" else json.loads(read(source[2]))
+
+    def diff(self, old_name, new_name=None, data_dir="data"):
+        """
+        What changed between backup old_name and backup new_name (or the live data when
+        new_name is None). Entity files are compared by hash; only entities whose hashes
+        differ (or that come from the journal) are parsed.
+
+        Returns {kind: {"added": [keys], "changed": [keys], "removed": [keys]}} for gangs,
+        territories, battles and equipment, plus "fighters" with (gang key, ganger_id, name)
+        tuples from the changed gangs.
+        """
+        old_files, old_read = self._state(old_name, data_dir)
+        new_files, new_read = self._state(new_name, data_dir)
+        old_sources = self._entity_sources(old_files, old_read)
+        new_sources = self._entity_sources(new_files, new_read)
+
+        result = {}
+        fighters = {"added": [], "changed": [], "removed": []}
+        for kind in ENTITY_DIRS:
+            old, new = old_sources[kind], new_sources[kind]
+            changed = []
+            for key in new.keys() & old.keys():
+                if old[key][0] == new[key][0] == "file" and old[key][1] == new[key][1]:
+                    continue
+                old_data = self._load_source(old[key], old_read)
+                new_data = self._load_source(new[key], new_read)
+                if old_data == new_data:
+                    continue
+                changed.append(key)
+                if kind == "gangs":
+                    self._diff_fighters(key, old_data, new_data, fighters)
+            result[kind] = {
+                "added": sorted(new.keys() - old.keys()),
+                "changed": sorted(changed),
+                "removed": sorted(old.keys() - new.keys()),
+            }
+        result["fighters"] = fighters
+        return result
+
+    @staticmethod
+    def _diff_fighters(gang_key, old_gang, new_gang, fighters):
+        old = {f["ganger_id"]: f for f in old_gang.get("gangers", [])}
+        new = {f["ganger_id"]: f for f in new_gang.get("gangers", [])}
+        for ganger_id, fighter in new.items():
+            if ganger_id not in old:
+                fighters["added"].append((gang_key, ganger_id, fighter.get("name")))
+            elif fighter != old[ganger_id]:
+                fighters["changed"].append((gang_key, ganger_id, fighter.get("name")))
+        for ganger_id, fighter in old.items():
+            if ganger_id not in new:
+                fighters["removed"].append((gang_key, ganger_id, fighter.get("name")))
+
+    def read_entity(self, name, kind, key, data_dir="data"):
+        """One entity's data as of backup `name` (journal records included), or None if it didn't exist."""
+        files, read = self._state(name, data_dir)
+        source = self._entity_sources(files, read)[kind].get(key)
+        return self._load_source(source, read) if source else None
+
+    @staticmethod
+    def _backup_time(path):
+        # backup_YYYYmmdd_HHMMSS, optionally followed by _microseconds
+        return datetime.strptime(path.name[len("backup_"):len("backup_") + 15], "%Y%m%d_%H%M%S")
+
+    def _retained(self, backups):
+        """The newest backup of each of the most recent hourly, daily and weekly buckets, plus the latest few."""
+        keep = set(backups[-KEEP_RECENT:])
+        bucket_keys = {
+            "hourly": lambda t: (t.date(), t.hour),
+            "daily": lambda t: t.date(),
+            "weekly": lambda t: t.isocalendar()[:2],
+        }
+        for tier, count in RETENTION_TIERS.items():
+            newest_per_bucket = {}
+            for backup in backups:  # oldest first, so later backups win their bucket
+                newest_per_bucket[bucket_keys[tier](self._backup_time(backup))] = backup
+            for bucket in sorted(newest_per_bucket)[-count:]:
+                keep.add(newest_per_bucket[bucket])
+        return keep
+
+    def _cleanup_old_backups(self):
+        backups = sorted(p for p in self.backup_dir.glob("backup_*") if p.is_dir() or p.suffix == ".json")
+        keep = self._retained(backups)
+        removed = False
+        for backup in backups:
+            if backup in keep:
+                continue
+            if backup.is_dir():
                 shutil.rmtree(backup)
+            else:
+                backup.unlink()
+            removed = True
+        if removed:
+            self._collect_garbage()
+
+    def _collect_garbage(self, grace_seconds=3600):
+        """Deletes blobs no remaining backup refers to, sparing recent ones a backup in progress may be about to reference."""
+        referenced = set()
+        for manifest_path in self.backup_dir.glob("backup_*.json"):
+            with open(manifest_path, "r") as f:
+                referenced.update(entry["hash"] for entry in json.load(f)["files"].values())
+        cutoff = time.time() - grace_seconds
+        for blob_path in self.objects_dir.glob("*/*"):
+            digest = blob_path.name.split(".")[0]
+            if digest not in referenced and blob_path.stat().st_mtime < cutoff:
+                blob_path.unlink()
+
+def _hash_file(path):
+    hasher = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+class BackupScheduler:
+    """
+    Background worker that coalesces backup requests. A backup runs once requests have
+    been quiet for `debounce` seconds, or `max_delay` seconds after the first pending
+    request, whichever comes first. A pending backup is flushed at interpreter exit.
+    """
+    def __init__(self, manager, debounce=30, max_delay=300):
+        self.manager = manager
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self._cond = threading.Condition()
+        self._first_request = None
+        self._last_request = None
+        self._run_lock = threading.Lock()  # one backup at a time, worker or flush
+        self._thread = None
+        atexit.register(self.flush)
+
+    def request(self):
+        with self._cond:
+            now = time.monotonic()
+            if self._first_request is None:
+                self._first_request = now
+            self._last_request = now
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="backup-scheduler", daemon=True)
+                self._thread.start()
+            self._cond.notify()
+
+    def _take_due(self, wait):
+        """Clears and returns True once a pending backup is due; waits for it when `wait` is set."""
+        with self._cond:
+            while True:
+                if self._first_request is None:
+                    if not wait:
+                        return False
+                    self._cond.wait()
+                    continue
+                due = min(self._last_request + self.debounce, self._first_request + self.max_delay)
+                now = time.monotonic()
+                if not wait or now >= due:
+                    self._first_request = self._last_request = None
+                    return True
+                self._cond.wait(due - now)
+
+    def _run(self):
+        while True:
+            self._take_due(wait=True)
+            with self._run_lock:
+                self.manager.create_backup()
+
+    def flush(self):
+        """Runs a pending backup now, on the calling thread."""
+        if self._take_due(wait=False):
+            with self._run_lock:
+                self.manager.create_backup()
+
+# One scheduler per backup directory, shared by every session's BackupManager
+_schedulers = {}
+_schedulers_lock = threading.Lock()
+
+def _scheduler_for(manager):
+    key = manager.backup_dir.resolve()
+    with _schedulers_lock:
+        if key not in _schedulers:
+            _schedulers[key] = BackupScheduler(manager)
+        return _schedulers[key]
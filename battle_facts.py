@@ -0,0 +1,175 @@
+import threading
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+FACT_COLUMNS = ["battle_id", "gang", "won", "date", "scenario", "territory"]
+
+def _parse_date(value):
+    try:
+        return datetime.fromisoformat(value).replace(tzinfo=None)
+    except (TypeError, ValueError):
+        return None
+
+def fact_rows(battle):
+    """One participation row per gang that fought in the battle."""
+    date = _parse_date(battle.battle_created_datetime)
+    return [
+        (battle.battle_id, gang_name, gang_name == battle.winner_gang, date,
+         battle.battle_scenario, battle.winner_territory)
+        for gang_name in dict.fromkeys(battle.participating_gangs)
+    ]
+
+def _frame(rows):
+    frame = pd.DataFrame(rows, columns=FACT_COLUMNS)
+    frame["won"] = frame["won"].astype(bool)
+    frame["date"] = pd.to_datetime(frame["date"])
+    return frame
+
+class BattleFacts:
+    """
+    The battle-participation fact table: one row per (battle, gang) with whether that
+    gang won, the date, scenario and territory won. Gangs are identified by name, as
+    battles record them. Win rates, head-to-head records, form and scenario records
+    are pandas groupbys over it.
+
+    Like CampaignMetrics, the table is built from load() (() -> battles) on first read,
+    then kept current by apply() with every committed Change; writes that bypass the
+    commit queue call invalidate(). Changes committed while the table is loading are
+    queued and replayed onto it. Each update publishes a new frame, so readers can keep
+    using the one they got without locking.
+    """
+    def __init__(self, load):
+        self._load = load
+        self._lock = threading.Lock()  # Guards the frame and versions
+        self._build_lock = threading.Lock()  # One build at a time
+        self._frame = None
+        self._versions = {}
+        self._pending = None  # Changes committed while a build is loading
+        # Bumped by invalidate(), so a build that raced one isn't kept
+        self._generation = 0
+
+    # ---- Reads ----
+
+    @property
+    def frame(self) -> pd.DataFrame:
+        frame = self._frame
+        if frame is not None:
+            return frame
+        with self._build_lock:
+            if self._frame is not None:
+                return self._frame
+            with self._lock:
+                self._pending = []
+                generation = self._generation
+            try:
+                battles = self._load()
+                frame = _frame([row for battle in battles for row in fact_rows(battle)])
+                with self._lock:
+                    self._versions = {
+                        battle.battle_id: battle.stored_version for battle in battles
+                    }
+                    # Commits that landed after load() read the store; older ones
+                    # are skipped by version
+                    for changes in self._pending:
+                        frame = self._apply(frame, changes)
+                    if generation == self._generation:
+                        self._frame = frame
+            finally:
+                with self._lock:
+                    self._pending = None
+        return frame
+
+    def win_rates(self) -> pd.DataFrame:
+        """Battles, wins and win rate (%) per gang."""
+        records = self.frame.groupby("gang")["won"].agg(battles="count", wins="sum")
+        records["win_rate"] = records["wins"] / records["battles"] * 100
+        return records
+
+    def head_to_head(self) -> pd.DataFrame:
+        """
+        Matrix of each gang's (rows) win rate (%) in battles against each opponent
+        (columns).
+        """
+        facts = self.frame
+        gangs, names = pd.factorize(facts["gang"], sort=True)
+        battles = pd.factorize(facts["battle_id"])[0]
+        sides = pd.DataFrame(
+            {"battle": battles, "gang": gangs, "won": facts["won"].to_numpy()}
+        )
+        pairs = sides.merge(
+            sides[["battle", "gang"]], on="battle", suffixes=("", "_opponent")
+        )
+        pairs = pairs[pairs["gang"] != pairs["gang_opponent"]]
+        # Count meetings and wins per (gang, opponent) cell of a flat n x n grid
+        size = len(names)
+        cells = pairs["gang"].to_numpy() * size + pairs["gang_opponent"].to_numpy()
+        met = np.bincount(cells, minlength=size**2)
+        won = np.bincount(cells, weights=pairs["won"].to_numpy(), minlength=size**2)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            rates = (won / met * 100).reshape(size, size)
+        return pd.DataFrame(
+            rates,
+            index=pd.Index(names, name="gang"),
+            columns=pd.Index(names, name="gang_opponent"),
+        )
+
+    def form(self, last_n=5) -> pd.DataFrame:
+        """
+        Each gang's win rate (%) over its previous `last_n` battles, after every battle
+        it fought.
+        """
+        facts = self.frame.dropna(subset=["date"]).sort_values("date", kind="stable")
+        by_gang = facts.groupby("gang")["won"]
+        wins = by_gang.cumsum()
+        # Wins in the window are the running total minus the total last_n battles
+        # earlier
+        window_wins = wins - wins.groupby(facts["gang"]).shift(last_n, fill_value=0)
+        window = (by_gang.cumcount() + 1).clip(upper=last_n)
+        form = facts[["gang", "date"]].copy()
+        form["form"] = window_wins / window * 100
+        return form
+
+    def scenario_records(self) -> pd.DataFrame:
+        """Battles, wins and win rate (%) per gang and scenario."""
+        by_scenario = self.frame.groupby(["gang", "scenario"])["won"]
+        records = by_scenario.agg(battles="count", wins="sum")
+        records["win_rate"] = records["wins"] / records["battles"] * 100
+        return records.reset_index()
+
+    # ---- Updates ----
+
+    def apply(self, changes):
+        """Replaces the rows of battles in committed changes (commit_queue.Change)."""
+        with self._lock:
+            if self._pending is not None:
+                # Replayed once the build in progress has loaded
+                self._pending.append(changes)
+            elif self._frame is not None:
+                self._frame = self._apply(self._frame, changes)
+            # Otherwise the next build reads these changes from the store
+
+    def _apply(self, frame, changes):
+        changed, rows = set(), []
+        for change in changes:
+            if change.kind != "battles":
+                continue
+            if change.version < self._versions.get(change.key, 0):
+                continue
+            changed.add(change.key)
+            self._versions[change.key] = change.version
+            if change.op == "put":
+                rows += fact_rows(change.entity)
+        if not changed:
+            return frame
+        kept = frame[~frame["battle_id"].isin(changed)]
+        if not rows:
+            return kept.reset_index(drop=True)
+        return pd.concat([kept, _frame(rows)], ignore_index=True)
+
+    def invalidate(self):
+        """Drops the table; it is rebuilt from storage on the next read."""
+        with self._lock:
+            self._frame = None
+            self._generation += 1
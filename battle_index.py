@@ -0,0 +1,141 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+
+# Sort key for battles whose timestamp can't be parsed: first in the log, never on any
+# date
+UNDATED = np.iinfo(np.int64).min
+_EPOCH = datetime(1970, 1, 1)
+
+def _timestamp(value):
+    """Microseconds since the epoch of an ISO timestamp, read as wall-clock time."""
+    try:
+        parsed = datetime.fromisoformat(value).replace(tzinfo=None)
+    except (TypeError, ValueError):
+        return UNDATED
+    return (parsed - _EPOCH) // timedelta(microseconds=1)
+
+class BattlePage:
+    """One page of a filtered battle log, with the keyset cursors of its neighbours."""
+    def __init__(self, battles, total, before, after):
+        self.battles = battles
+        self.total = total
+        self.before = before  # Cursor for the previous page, or None on the first
+        self.after = after  # Cursor for the next page, or None on the last
+
+class BattleIndex:
+    """
+    Battles in log order (by timestamp, then id) with the columns the battle history
+    filters on: parsed timestamps, dictionary-encoded scenarios and the battles each
+    gang fought in. Built once per data version; a filter is a binary search over the
+    timestamps plus array masks, and a page is read by keyset from a cursor, so the
+    cost of a page doesn't depend on how many battles the campaign has recorded.
+
+    Cursors are (timestamp, battle_id) keys, so a cursor stays valid across data
+    versions: the next page starts after that battle even if others were added.
+    """
+    def __init__(self, battles):
+        battles = list(battles)
+        parsed = (_timestamp(b.battle_created_datetime) for b in battles)
+        timestamps = np.fromiter(parsed, np.int64, len(battles))
+        ids = [b.battle_id for b in battles]
+        order = sorted(range(len(battles)), key=lambda i: (timestamps[i], ids[i]))
+        self.battles = [battles[i] for i in order]
+        self.timestamps = timestamps[order] if battles else timestamps
+        self.ids = [ids[i] for i in order]
+
+        # Scenario codes index into the distinct scenario names
+        self.scenarios = []
+        codes = {}
+        self.scenario_codes = np.empty(len(self.battles), np.int32)
+        for rank, battle in enumerate(self.battles):
+            code = codes.get(battle.battle_scenario)
+            if code is None:
+                code = codes[battle.battle_scenario] = len(self.scenarios)
+                self.scenarios.append(battle.battle_scenario)
+            self.scenario_codes[rank] = code
+        self._scenario_keys = [s.lower() for s in self.scenarios]
+
+        # Gang name -> ranks (ascending) of the battles it took part in
+        fought = {}
+        for rank, battle in enumerate(self.battles):
+            for gang_name in set(battle.participating_gangs):
+                fought.setdefault(gang_name, []).append(rank)
+        self.gang_battles = {
+            name: np.array(ranks, np.int64) for name, ranks in fought.items()
+        }
+
+    def __len__(self):
+        return len(self.battles)
+
+    @property
+    def gang_names(self):
+        return sorted(self.gang_battles)
+
+    def filter(self, scenario="", on_date=None, gang_name=None):
+        """
+        Ranks (ascending) of the battles whose scenario contains `scenario`
+        (case-insensitive), fought on `on_date` and, if given, involving gang_name.
+        """
+        lo, hi = 0, len(self.battles)
+        if on_date:
+            day = datetime.combine(on_date, datetime.min.time())
+            bounds = [day, day + timedelta(days=1)]
+            lo, hi = np.searchsorted(
+                self.timestamps, [_timestamp(bound.isoformat()) for bound in bounds]
+            )
+        ranks = np.arange(lo, hi, dtype=np.int64)
+        if scenario:
+            # Substring matching runs over the distinct names only; battles are then
+            # masked by code
+            scenario = scenario.lower()
+            keys = self._scenario_keys
+            matching = [code for code, key in enumerate(keys) if scenario in key]
+            ranks = ranks[np.isin(self.scenario_codes[lo:hi], matching)]
+        if gang_name is not None:
+            fought = self.gang_battles.get(gang_name, ranks[:0])
+            ranks = np.intersect1d(ranks, fought, assume_unique=True)
+        return ranks
+
+    def page(self, ranks, size, after=None, before=None):
+        """
+        The `size` battles of `ranks` following the cursor `after`, or preceding the
+        cursor `before`; the first page if neither is given.
+        """
+        if before is not None:
+            end = int(np.searchsorted(ranks, self._rank_of(before)))
+            start = max(0, end - size)
+        else:
+            start = 0
+            if after is not None:
+                start = int(np.searchsorted(ranks, self._rank_after(after)))
+            end = start + size
+        page = ranks[start:end]
+        return BattlePage(
+            [self.battles[rank] for rank in page],
+            len(ranks),
+            self._key(page[0]) if start > 0 and len(page) else None,
+            self._key(page[-1]) if end < len(ranks) and len(page) else None,
+        )
+
+    def _key(self, rank):
+        return (int(self.timestamps[rank]), self.ids[rank])
+
+    def _rank_of(self, key):
+        """Rank of the first battle at or after key."""
+        timestamp, battle_id = key
+        rank = int(np.searchsorted(self.timestamps, timestamp))
+        while (
+            rank < len(self.ids)
+            and self.timestamps[rank] == timestamp
+            and self.ids[rank] < battle_id
+        ):
+            rank += 1
+        return rank
+
+    def _rank_after(self, key):
+        """Rank of the first battle strictly after key."""
+        rank = self._rank_of(key)
+        if rank < len(self.ids) and self._key(rank) == tuple(key):
+            rank += 1
+        return rank
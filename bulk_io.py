@@ -0,0 +1,184 @@
+import json
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+
+from pydantic import ValidationError
+
+from common import (
+    ENTITY_STORES,
+    MANIFEST_DIRS,
+    SCHEMA_VERSION,
+    compact_journal,
+    construct_trusted,
+    file_digest,
+    invalidate_aggregates,
+    manifest_entries_by_file,
+    save_data,
+    update_manifest,
+    write_entity_file,
+)
+
+# Directories with at least this many changed files are validated in worker processes
+# (on multi-core machines; shipping models back is too costly to pay off on one core)
+PROCESS_POOL_MIN_FILES = 2000
+VALIDATION_CHUNK_SIZE = 500
+IO_WORKERS = min(32, (os.cpu_count() or 1) * 4)
+
+def _read(path, entry):
+    """
+    Reads a file and reports whether it is exactly what the manifest recorded. Files
+    whose size and mtime match their entry aren't hashed.
+    """
+    with open(path, "rb") as f:
+        stat = os.fstat(f.fileno())
+        raw = f.read()
+    if entry is None or entry.get("schema") != SCHEMA_VERSION:
+        return raw, False
+    if entry.get("size") == stat.st_size and entry.get("mtime_ns") == stat.st_mtime_ns:
+        return raw, True
+    return raw, entry.get("hash") == file_digest(raw)
+
+def _validate_chunk(model, items):
+    """
+    Process-pool worker: validates (file name, data) pairs, returning models or error
+    messages.
+    """
+    results = []
+    for name, data in items:
+        try:
+            results.append((name, model(**data), None))
+        except ValidationError as e:
+            results.append((name, None, str(e)))
+    return results
+
+def load_directory(kind, model, progress=None):
+    """
+    Loads every *.json file in the directory of `kind` as `model`, reading files on a
+    thread pool. The journal is compacted first, so the files hold every committed
+    change. Files that match the manifest were written (and validated) by this app and
+    are built without validation, clean; other files are validated, in worker processes
+    when there are many of them, and come back dirty. Entities keep their stored commit
+    version.
+
+    progress(done, total) is called from the calling thread as files complete.
+    Returns (objects, errors) where errors is a list of (file name, message).
+    """
+    compact_journal()
+    directory = MANIFEST_DIRS[kind]
+    entries = manifest_entries_by_file(kind)
+    names = sorted(name for name in os.listdir(directory) if name.endswith(".json"))
+    total = len(names) * 2  # read + build
+    done = 0
+    parsed, errors = {}, []
+    trusted, changed = [], []
+
+    with ThreadPoolExecutor(max_workers=IO_WORKERS) as pool:
+        futures = {
+            pool.submit(_read, os.path.join(directory, name), entries.get(name)): name
+            for name in names
+        }
+        for future in as_completed(futures):
+            name = futures[future]
+            try:
+                raw, unchanged = future.result()
+                parsed[name] = json.loads(raw)
+            except (OSError, ValueError) as e:
+                errors.append((name, str(e)))
+            else:
+                (trusted if unchanged else changed).append(name)
+            done += 1
+            if progress:
+                progress(done, total)
+
+    objects = {}
+    for name in trusted:
+        objects[name] = construct_trusted(model, parsed[name])
+    done += len(trusted)
+    if progress and trusted:
+        progress(done, total)
+
+    items = [(name, parsed[name]) for name in changed]
+    chunks = [
+        items[i:i + VALIDATION_CHUNK_SIZE]
+        for i in range(0, len(items), VALIDATION_CHUNK_SIZE)
+    ]
+    if len(items) >= PROCESS_POOL_MIN_FILES and (os.cpu_count() or 1) > 1:
+        # Spawned, not forked: a fork would copy locks the writer or compactor thread
+        # may hold
+        spawn = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(mp_context=spawn) as pool:
+            futures = [pool.submit(_validate_chunk, model, c) for c in chunks]
+            results = (f.result() for f in as_completed(futures))
+            done = _collect(results, objects, errors, done, total, progress)
+    else:
+        results = (_validate_chunk(model, c) for c in chunks)
+        done = _collect(results, objects, errors, done, total, progress)
+    for name, obj in objects.items():
+        if name in entries:
+            obj._version = entries[name].get("version", 0)
+    return [objects[name] for name in names if name in objects], errors
+
+def _collect(results, objects, errors, done, total, progress):
+    for chunk in results:
+        for name, obj, error in chunk:
+            if error is None:
+                objects[name] = obj
+            else:
+                errors.append((name, error))
+        done += len(chunk)
+        if progress:
+            progress(done, total)
+    return done
+
+def _write(kind, key, entity, entry):
+    """
+    Writes `entity` unless its file already holds exactly this content. Returns its new
+    manifest entry, or None.
+    """
+    data = entity.model_dump()
+    if entry is not None:
+        raw = json.dumps(data, indent=4).encode("utf-8")
+        unchanged = entry.get("hash") == file_digest(raw)
+        if unchanged and entry.get("schema") == SCHEMA_VERSION:
+            return None
+    return write_entity_file(kind, key, data)
+
+def save_directory(kind, entities, key_attr, progress=None):
+    """
+    Saves a whole collection. Gangs, territories and battles go through the commit
+    queue as one request, like save_data(): changed entities are written, ones missing
+    from `entities` are removed, and ConflictError is raised if another session changed
+    them first. The equipment library, which has no commit versions, is written to its
+    files on a thread pool, skipping files whose content would not change, and recorded
+    in the manifest with one update. Returns the number of entities written.
+    """
+    if kind in ENTITY_STORES:
+        return _commit_collection(kind, entities, progress)
+    entries = manifest_entries_by_file(kind)
+    written = {}
+    with ThreadPoolExecutor(max_workers=IO_WORKERS) as pool:
+        futures = {}
+        for entity in entities:
+            key = getattr(entity, key_attr)
+            entry = entries.get(f"{key}.json")
+            futures[pool.submit(_write, kind, key, entity, entry)] = key
+        for done, future in enumerate(as_completed(futures), 1):
+            entry = future.result()
+            if entry is not None:
+                written[futures[future]] = entry
+            if progress:
+                progress(done, len(futures))
+    if written:
+        update_manifest(kind, written)
+        invalidate_aggregates()
+    return len(written)
+
+def _commit_collection(kind, entities, progress):
+    changed = sum(1 for entity in entities if entity.is_dirty())
+    collections = dict.fromkeys(ENTITY_STORES)
+    collections[kind] = entities
+    save_data(collections["gangs"], collections["territories"], collections["battles"])
+    if progress:
+        progress(1, 1)
+    return changed
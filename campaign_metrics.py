@@ -0,0 +1,167 @@
+import threading
+from collections import Counter, namedtuple
+
+# What one entity adds to the totals. Kept per key so a change can swap it out in O(1).
+GangContribution = namedtuple(
+    "GangContribution", ["gang_name", "reputation", "fighters", "injured", "ganger_ids"]
+)
+BattleContribution = namedtuple("BattleContribution", ["winner", "participants"])
+
+class CampaignMetrics:
+    """
+    Campaign-wide aggregates (fighter and injured fighter totals, reputation, territory
+    control, wins and battle participation per gang), kept current as commits happen
+    instead of being recomputed from every entity on each page run.
+
+    The totals are built once from load() (() -> (gangs, territories, battles)) on
+    first read; key_attrs names each kind's key attribute. After that, the commit
+    writer passes every committed Change to apply(), which replaces the changed
+    entity's stored contribution. Changes committed while a build is loading are queued
+    and replayed onto it. Writes that bypass the commit queue (bulk rebuilds, direct
+    entity saves) call invalidate() instead.
+
+    A TraitIndex (made by make_traits()) is kept over every stored fighter, for skill
+    and injury lookups.
+    """
+    def __init__(self, load, key_attrs, make_traits):
+        self._load = load
+        self._key_attrs = key_attrs
+        self._make_traits = make_traits
+        self._lock = threading.Lock()  # Guards the totals
+        self._build_lock = threading.Lock()  # One build at a time
+        self._built = False
+        self._pending = None  # Changes committed while a build is loading
+        # Bumped by invalidate(), so a build that raced one isn't kept
+        self._generation = 0
+        self._reset()
+
+    def _reset(self):
+        self._contributions = {"gangs": {}, "territories": {}, "battles": {}}
+        self._versions = {"gangs": {}, "territories": {}, "battles": {}}
+        self.gang_count = 0
+        self.total_fighters = 0
+        self.injured_fighters = 0  # Fighters whose status is "Injured"
+        self.traits = self._make_traits()
+        self.reputation_sum = 0
+        self.territory_count = 0
+        self.controlled_territories = 0
+        self.battle_count = 0
+        self.wins = Counter()
+        self.participations = Counter()
+
+    # ---- Reads ----
+
+    def ensure_built(self):
+        if self._built:
+            return self
+        with self._build_lock:
+            if self._built:
+                return self
+            with self._lock:
+                self._pending = []
+                generation = self._generation
+            try:
+                gangs, territories, battles = self._load()
+                with self._lock:
+                    self._reset()
+                    loaded = (gangs, territories, battles)
+                    for kind, entities in zip(self._contributions, loaded, strict=True):
+                        key_attr = self._key_attrs[kind]
+                        for entity in entities:
+                            key = getattr(entity, key_attr)
+                            self._put(kind, key, entity, entity.stored_version)
+                    # Commits that landed after load() read the store; older ones are
+                    # skipped by version
+                    for changes in self._pending:
+                        self._apply(changes)
+                    self._built = generation == self._generation
+            finally:
+                with self._lock:
+                    self._pending = None
+        return self
+
+    @property
+    def average_reputation(self):
+        return self.reputation_sum / self.gang_count if self.gang_count else 0
+
+    def win_rate(self, gang_name):
+        """Percentage of its battles a gang won, or 0 if it hasn't fought."""
+        fought = self.participations.get(gang_name, 0)
+        return self.wins.get(gang_name, 0) / fought * 100 if fought else 0
+
+    # ---- Updates ----
+
+    def apply(self, changes):
+        """Folds committed changes (commit_queue.Change) into the totals."""
+        with self._lock:
+            if self._pending is not None:
+                # Replayed once the build in progress has loaded
+                self._pending.append(changes)
+            elif self._built:
+                self._apply(changes)
+            # Otherwise the next build reads these changes from the store
+
+    def _apply(self, changes):
+        for change in changes:
+            if change.kind not in self._contributions:
+                continue
+            if change.version < self._versions[change.kind].get(change.key, 0):
+                continue  # Older than what the totals were built from
+            if change.op == "put":
+                self._put(change.kind, change.key, change.entity, change.version)
+            else:
+                self._remove(change.kind, change.key)
+                self._versions[change.kind][change.key] = change.version
+
+    def invalidate(self):
+        """Drops the totals; they are rebuilt from storage on the next read."""
+        with self._lock:
+            self._built = False
+            self._generation += 1
+
+    def _put(self, kind, key, entity, version):
+        self._remove(kind, key)
+        if kind == "gangs":
+            for fighter in entity.gangers:
+                self.traits.update(entity, fighter)
+            contribution = GangContribution(
+                entity.gang_name, entity.reputation, entity.fighter_count,
+                sum(fighter.is_injured for fighter in entity.gangers),
+                tuple(fighter.ganger_id for fighter in entity.gangers),
+            )
+            self.gang_count += 1
+            self.total_fighters += contribution.fighters
+            self.injured_fighters += contribution.injured
+            self.reputation_sum += contribution.reputation
+        elif kind == "territories":
+            contribution = bool(entity.controlled_by)
+            self.territory_count += 1
+            self.controlled_territories += contribution
+        else:
+            contribution = BattleContribution(
+                entity.winner_gang, tuple(entity.participating_gangs)
+            )
+            self.battle_count += 1
+            self.wins[contribution.winner] += 1
+            self.participations.update(contribution.participants)
+        self._contributions[kind][key] = contribution
+        self._versions[kind][key] = version
+
+    def _remove(self, kind, key):
+        contribution = self._contributions[kind].pop(key, None)
+        if contribution is None:
+            return
+        if kind == "gangs":
+            self.gang_count -= 1
+            self.total_fighters -= contribution.fighters
+            self.injured_fighters -= contribution.injured
+            for ganger_id in contribution.ganger_ids:
+                self.traits.remove(ganger_id)
+            self.reputation_sum -= contribution.reputation
+        elif kind == "territories":
+            self.territory_count -= 1
+            self.controlled_territories -= contribution
+        else:
+            self.battle_count -= 1
+            self.wins.subtract([contribution.winner])
+            self.participations.subtract(contribution.participants)
@@ -0,0 +1,601 @@
+import copy
+import threading
+from collections.abc import MutableSequence
+
+import streamlit as st
+
+from battle_index import BattleIndex
+from common import (
+    ENTITY_STORES,
+    TerritoryControl,
+    add_commit_listener,
+    data_version,
+    read_data,
+)
+
+COLLECTIONS = ("gangs", "territories", "battles")
+
+class CampaignSnapshot:
+    """
+    Frozen campaign state for one data version, shared by every session in the process
+    """
+    def __init__(self, version, gangs, territories, battles):
+        self.version = version
+        self.collections = {}
+        # Newest commit version folded into this snapshot; saves from it are checked
+        # against it
+        self.commit_version = 0
+        loaded = (gangs, territories, battles)
+        for kind, entities in zip(COLLECTIONS, loaded, strict=True):
+            key_attr = ENTITY_STORES[kind][1]
+            by_key = {}
+            for entity in entities:
+                entity.freeze()
+                by_key[getattr(entity, key_attr)] = entity
+                self.commit_version = max(self.commit_version, entity.stored_version)
+            self.collections[kind] = (tuple(by_key), by_key)
+        self.index = CampaignIndex(
+            self.collections["gangs"][1].values(),
+            self.collections["territories"][1].values(),
+        )
+        self._battle_index = None
+
+    def advanced(self, changes, version):
+        """
+        The snapshot after a commit: this one's entities with the committed puts and
+        deletes applied, without reading anything back from disk. Only the key maps of
+        the changed collections are copied (unchanged ones, and their overlays, are
+        shared); committed entities are copied and frozen, since the saving session
+        keeps its own objects.
+        """
+        snapshot = copy.copy(self)
+        snapshot.version = version
+        snapshot.index = self.index.copy()
+        changed = {}
+        for change in changes:
+            by_key = changed.get(change.kind)
+            if by_key is None:
+                by_key = changed[change.kind] = dict(self.collections[change.kind][1])
+            if change.op == "put":
+                entity = change.entity.private_copy()
+                entity.mark_clean()
+                entity._version = change.version
+                entity.freeze()
+                by_key[change.key] = entity
+                snapshot.index.put(change.kind, entity)
+            else:
+                by_key.pop(change.key, None)
+                snapshot.index.drop(change.kind, change.key)
+            snapshot.commit_version = max(snapshot.commit_version, change.version)
+        snapshot.collections = dict(self.collections)
+        for kind, by_key in changed.items():
+            snapshot.collections[kind] = (tuple(by_key), by_key)
+        if "battles" in changed:
+            snapshot._battle_index = None
+        return snapshot
+
+    def entities(self, kind):
+        """The snapshot's entities of one collection, in stored order."""
+        return list(self.collections[kind][1].values())
+
+    @property
+    def battle_index(self) -> BattleIndex:
+        # Built on first use; most pages never read the battle history
+        if self._battle_index is None:
+            self._battle_index = BattleIndex(self.collections["battles"][1].values())
+        return self._battle_index
+
+class CampaignIndex:
+    """
+    Dict indexes over a campaign: gangs by gang_id and gang_name, fighters by ganger_id
+    (-> (gang, fighter)), the gangs holding each equipment catalog item, territories by
+    name, and territory control (see TerritoryControl).
+
+    A session's index layers its own entities over the shared snapshot's index (parent),
+    so it only holds what the session changed. Session overlays report every entity they
+    add, replace or drop. Entities edited in place after that (a gang renamed or given a
+    new fighter) are re-indexed when a lookup misses or finds a stale entry.
+    """
+    def __init__(self, gangs=(), territories=(), parent=None, collections=None):
+        self.parent = parent
+        # (gangs, territories) a session index repairs itself from
+        self.collections = collections
+        # key -> entity, or None if dropped in this layer
+        self._entities = {"gangs": {}, "territories": {}}
+        self._gang_names = {}  # gang_name -> gang_id
+        self._indexed_names = {}  # gang_id -> gang_name as indexed
+        # ganger_id -> (gang_id, fighter); built on the first fighter lookup
+        self._fighters = None
+        self._rosters = {}  # gang_id -> ganger_ids as indexed
+        # catalog_id -> gang_ids holding it; built on first use from gang headers
+        self._holders = None
+        self._carried = {}  # gang_id -> catalog_ids as indexed
+        self._control = None  # TerritoryControl, built on first use
+        for gang in gangs:
+            self.put("gangs", gang)
+        for territory in territories:
+            self.put("territories", territory)
+
+    # ---- Maintenance ----
+
+    def copy(self):
+        """
+        An index of the same entities that later puts and drops leave this one out of.
+        """
+        index = copy.copy(self)
+        index._entities = {kind: dict(keyed) for kind, keyed in self._entities.items()}
+        index._gang_names = dict(self._gang_names)
+        index._indexed_names = dict(self._indexed_names)
+        index._rosters = dict(self._rosters)
+        index._carried = dict(self._carried)
+        if self._fighters is not None:
+            index._fighters = dict(self._fighters)
+        if self._holders is not None:
+            holders = self._holders.items()
+            index._holders = {catalog_id: set(gangs) for catalog_id, gangs in holders}
+        index._control = None  # Rebuilt from the territories on first use
+        return index
+
+    def put(self, kind, entity):
+        """Indexes an added or replaced entity."""
+        if kind == "gangs":
+            self._unindex_gang(entity.gang_id)
+            self._entities["gangs"][entity.gang_id] = entity
+            self._gang_names[entity.gang_name] = entity.gang_id
+            self._indexed_names[entity.gang_id] = entity.gang_name
+            if self._fighters is not None:
+                self._index_roster(entity)
+            if self._holders is not None:
+                self._index_carried(entity)
+        elif kind == "territories":
+            self._entities["territories"][entity.name] = entity
+            if self._control is not None:
+                self._control.put(entity)
+
+    def drop(self, kind, key):
+        """
+        Removes an entity from this layer, hiding any parent entry for the same key.
+        """
+        if kind == "gangs":
+            self._unindex_gang(key)
+        if kind in self._entities:
+            self._entities[kind][key] = None
+        if kind == "territories" and self._control is not None:
+            self._control.drop(key)
+
+    def revert(self, kind, key):
+        """
+        Forgets this layer's entry for key, so lookups fall through to the parent again.
+        """
+        if kind == "gangs":
+            self._unindex_gang(key)
+        if kind in self._entities:
+            self._entities[kind].pop(key, None)
+        if kind == "territories" and self._control is not None:
+            self._control.drop(key)
+            territory = self._get("territories", key)
+            if territory is not None:
+                self._control.put(territory)
+
+    @property
+    def control(self) -> TerritoryControl:
+        """
+        Territory control over every territory this index sees (the session's, for a
+        session index).
+        """
+        if self._control is None:
+            if self.collections is not None:
+                territories = self.collections[1]
+            else:
+                indexed = self._entities["territories"].values()
+                territories = [t for t in indexed if t is not None]
+            self._control = TerritoryControl(territories)
+        return self._control
+
+    def repair(self):
+        """
+        Re-indexes the entities this session may have edited in place since they were
+        indexed.
+        """
+        if self.collections is None:
+            return
+        kinds = ("gangs", "territories")
+        for kind, collection in zip(kinds, self.collections, strict=True):
+            session_entities = getattr(collection, "session_entities", None)
+            if session_entities is None:
+                # A plain list can change anywhere; rebuild this kind from it
+                if kind == "gangs":
+                    for gang_id in list(self._entities["gangs"]):
+                        self._unindex_gang(gang_id)
+                else:
+                    self._control = None
+                self._entities[kind] = {}
+                entities = collection
+            else:
+                entities = session_entities()
+            for entity in entities:
+                self.put(kind, entity)
+
+    def _unindex_gang(self, gang_id):
+        name = self._indexed_names.pop(gang_id, None)
+        if name is not None and self._gang_names.get(name) == gang_id:
+            del self._gang_names[name]
+        if self._fighters is not None:
+            for ganger_id in self._rosters.pop(gang_id, ()):
+                if self._fighters.get(ganger_id, (None,))[0] == gang_id:
+                    del self._fighters[ganger_id]
+        if self._holders is not None:
+            for catalog_id in self._carried.pop(gang_id, ()):
+                self._holders[catalog_id].discard(gang_id)
+
+    def _index_roster(self, gang):
+        self._rosters[gang.gang_id] = [fighter.ganger_id for fighter in gang.gangers]
+        for fighter in gang.gangers:
+            self._fighters[fighter.ganger_id] = (gang.gang_id, fighter)
+
+    def _fighter_index(self):
+        if self._fighters is None:
+            # Built aside and published at once; the snapshot's index is shared
+            # between sessions
+            fighters, rosters = {}, {}
+            for gang in list(self._entities["gangs"].values()):
+                if gang is not None:
+                    rosters[gang.gang_id] = [f.ganger_id for f in gang.gangers]
+                    for fighter in gang.gangers:
+                        fighters[fighter.ganger_id] = (gang.gang_id, fighter)
+            self._rosters = rosters
+            self._fighters = fighters
+        return self._fighters
+
+    def _index_carried(self, gang):
+        self._carried[gang.gang_id] = gang.catalog_ids
+        for catalog_id in gang.catalog_ids:
+            self._holders.setdefault(catalog_id, set()).add(gang.gang_id)
+
+    def _holder_index(self):
+        if self._holders is None:
+            # Read from gang headers, so header-only gangs aren't hydrated; published
+            # at once like _fighter_index
+            holders, carried = {}, {}
+            for gang in list(self._entities["gangs"].values()):
+                if gang is not None:
+                    carried[gang.gang_id] = gang.catalog_ids
+                    for catalog_id in gang.catalog_ids:
+                        holders.setdefault(catalog_id, set()).add(gang.gang_id)
+            self._carried = carried
+            self._holders = holders
+        return self._holders
+
+    # ---- Lookups ----
+
+    def _get(self, kind, key):
+        entities = self._entities[kind]
+        if key in entities:
+            return entities[key]
+        return self.parent._get(kind, key) if self.parent is not None else None
+
+    def gang(self, gang_id):
+        return self._get("gangs", gang_id)
+
+    def territory(self, name):
+        territory = self._get("territories", name)
+        if territory is None or territory.name != name:
+            self.repair()
+            territory = self._get("territories", name)
+        return territory if territory is not None and territory.name == name else None
+
+    def _gang_named(self, name):
+        gang_id = self._gang_names.get(name)
+        if gang_id is not None:
+            return self._entities["gangs"].get(gang_id)
+        if self.parent is not None:
+            gang = self.parent._gang_named(name)
+            if gang is not None and gang.gang_id not in self._entities["gangs"]:
+                return gang
+        return None
+
+    def gang_named(self, name):
+        gang = self._gang_named(name)
+        if gang is None or gang.gang_name != name:
+            self.repair()
+            gang = self._gang_named(name)
+        return gang if gang is not None and gang.gang_name == name else None
+
+    def _find_fighter(self, ganger_id):
+        found = self._fighter_index().get(ganger_id)
+        if found is not None:
+            return self._entities["gangs"].get(found[0]), found[1]
+        if self.parent is not None:
+            found = self.parent._find_fighter(ganger_id)
+            if found is not None and found[0].gang_id not in self._entities["gangs"]:
+                return found
+        return None
+
+    def _is_current(self, found):
+        gang, fighter = found
+        return (
+            gang is not None
+            and self.gang(gang.gang_id) is gang
+            and any(f is fighter for f in gang.gangers)
+        )
+
+    def _equipment_holders(self):
+        holders = {}
+        if self.parent is not None:
+            for catalog_id, gangs in self.parent._equipment_holders().items():
+                layered = self._entities["gangs"]
+                kept = [gang for gang in gangs if gang.gang_id not in layered]
+                if kept:
+                    holders[catalog_id] = kept
+        for catalog_id, gang_ids in self._holder_index().items():
+            gangs = [self._entities["gangs"][gang_id] for gang_id in gang_ids]
+            if gangs:
+                holders.setdefault(catalog_id, []).extend(gangs)
+        return holders
+
+    def equipment_holders(self) -> dict:
+        """
+        {catalog_id: [gang]} of every equipment item a gang's fighters or stash hold.
+        """
+        self.repair()  # Session gangs may have been given or lost equipment in place
+        return self._equipment_holders()
+
+    def fighter(self, ganger_id):
+        """
+        (gang, fighter) for a ganger_id, or None. The first call indexes (and so
+        hydrates) every roster.
+        """
+        found = self._find_fighter(ganger_id)
+        if found is None or not self._is_current(found):
+            self.repair()
+            found = self._find_fighter(ganger_id)
+        return found if found is not None and self._is_current(found) else None
+
+# The process-wide snapshot; replaced, never modified, so sessions can keep reading an
+# older one
+_snapshot = None
+_snapshot_lock = threading.Lock()
+_build_lock = threading.Lock()
+
+def get_shared_snapshot() -> CampaignSnapshot:
+    """
+    The campaign as of data_version(). Commits made in this process move it forward in
+    memory (see _advance_snapshot); it is only reloaded from disk when the data changed
+    some other way, e.g. another process saved or the files were edited.
+    """
+    global _snapshot
+    snapshot = _snapshot
+    if snapshot is not None and snapshot.version == data_version():
+        return snapshot
+    with _build_lock:
+        version = data_version()
+        snapshot = _snapshot
+        if snapshot is not None and snapshot.version == version:
+            return snapshot
+        snapshot = CampaignSnapshot(version, *read_data())
+        with _snapshot_lock:
+            _snapshot = snapshot
+    return snapshot
+
+def _advance_snapshot(changes, before, after):
+    """Commit listener: applies a commit to the snapshot it was written on top of."""
+    global _snapshot
+    with _snapshot_lock:
+        if _snapshot is not None and _snapshot.version == before:
+            _snapshot = _snapshot.advanced(changes, after)
+
+add_commit_listener(_advance_snapshot)
+
+class EntityOverlay(MutableSequence):
+    """
+    A session's list-like view of one shared collection. Reads fall through to the
+    shared snapshot; edit() swaps in a private copy, so a session only holds the
+    entities it changes (plus a key list once it adds or removes entities).
+    """
+    def __init__(self, base_keys, base_by_key, key_attr, base_version=0):
+        self._base_keys = base_keys
+        self._base_by_key = base_by_key
+        self._key_attr = key_attr
+        # commit version of the snapshot this overlay reads from
+        self.base_version = base_version
+        self._copies = {}  # key -> session-owned entity (edited or added)
+        # materialized key list once the membership diverges from the base
+        self._order = None
+        self.index = None  # the session's CampaignIndex, told about every change
+        self.kind = None
+
+    @property
+    def base_keys(self):
+        return self._base_keys
+
+    def _key(self, entity):
+        return getattr(entity, self._key_attr)
+
+    def _keys(self):
+        return self._order if self._order is not None else self._base_keys
+
+    def _materialize(self):
+        if self._order is None:
+            self._order = list(self._base_keys)
+        return self._order
+
+    def _get(self, key):
+        entity = self._copies.get(key)
+        return entity if entity is not None else self._base_by_key[key]
+
+    def __len__(self):
+        return len(self._keys())
+
+    def __iter__(self):
+        for key in self._keys():
+            yield self._get(key)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._get(key) for key in self._keys()[index]]
+        return self._get(self._keys()[index])
+
+    def __setitem__(self, index, entity):
+        old_key, new_key = self._keys()[index], self._key(entity)
+        if old_key != new_key:
+            self._materialize()[index] = new_key
+            self._copies.pop(old_key, None)
+            self._dropped(old_key)
+        self._copies[new_key] = entity
+        self._put(entity)
+
+    def __delitem__(self, index):
+        keys = self._materialize()
+        key = keys.pop(index)
+        self._copies.pop(key, None)
+        self._dropped(key)
+
+    def insert(self, index, entity):
+        key = self._key(entity)
+        self._materialize().insert(index, key)
+        self._copies[key] = entity
+        self._put(entity)
+
+    def put(self, entity):
+        """
+        Replaces the entity with the same key, or appends it. Returns True if it
+        replaced one.
+        """
+        key = self._key(entity)
+        listed = self._order is None or key in self._order
+        if key in self._copies or (key in self._base_by_key and listed):
+            self._copies[key] = entity
+            self._put(entity)
+            return True
+        self.append(entity)
+        return False
+
+    def has_session_changes(self) -> bool:
+        """
+        Whether the session holds entities or a membership of its own, rather than
+        reading the snapshot as is.
+        """
+        return bool(self._copies) or self._order is not None
+
+    def session_entities(self):
+        """The entities this session added or copied out of the snapshot."""
+        return list(self._copies.values())
+
+    def _put(self, entity):
+        if self.index is not None:
+            self.index.put(self.kind, entity)
+
+    def _dropped(self, key):
+        if self.index is not None:
+            self.index.drop(self.kind, key)
+
+    def edit(self, entity):
+        """
+        Returns this session's modifiable version of `entity`, copying it out of the
+        snapshot on first edit.
+        """
+        key = self._key(entity)
+        if key not in self._copies:
+            self._copies[key] = entity.private_copy()
+            self._put(self._copies[key])
+        return self._copies[key]
+
+    def discard(self, key):
+        """
+        Drops this session's copy of `key` (e.g. after a save conflict), falling back
+        to the snapshot.
+        """
+        self._copies.pop(key, None)
+        added = self._order is not None and key not in self._base_by_key
+        if added and key in self._order:
+            self._order.remove(key)
+        if self.index is not None:
+            self.index.revert(self.kind, key)
+
+    def rebase(self, base_keys, base_by_key, base_version=0):
+        """
+        Moves onto a newer snapshot. Copies that were saved are dropped (the snapshot
+        now has them); unsaved edits and additions are kept. Unsaved removals are not.
+        """
+        self._copies = {k: e for k, e in self._copies.items() if e.is_dirty()}
+        self._base_keys, self._base_by_key = base_keys, base_by_key
+        self.base_version = base_version
+        added = [k for k in self._copies if k not in base_by_key]
+        self._order = list(base_keys) + added if added else None
+
+def sync_session_campaign():
+    """
+    Points st.session_state.gangs/territories/battles at the current shared snapshot,
+    creating overlays on first use and rebasing them (keeping unsaved edits) after any
+    session saves. Collections replaced with plain lists are left alone.
+    """
+    snapshot = get_shared_snapshot()
+    rebased = False
+    for kind in COLLECTIONS:
+        base_keys, base_by_key = snapshot.collections[kind]
+        overlay = st.session_state.get(kind)
+        if overlay is None:
+            st.session_state[kind] = EntityOverlay(
+                base_keys, base_by_key, ENTITY_STORES[kind][1], snapshot.commit_version
+            )
+            st.session_state[kind].kind = kind
+            rebased = True
+        elif isinstance(overlay, EntityOverlay) and overlay.base_keys is not base_keys:
+            overlay.rebase(base_keys, base_by_key, snapshot.commit_version)
+            rebased = True
+    gangs, territories = st.session_state.gangs, st.session_state.territories
+    overlays = all(isinstance(c, EntityOverlay) for c in (gangs, territories))
+    if overlays and (rebased or gangs.index is None):
+        index = CampaignIndex(
+            gangs.session_entities(), territories.session_entities(),
+            parent=snapshot.index, collections=(gangs, territories),
+        )
+        gangs.index = territories.index = index
+
+def shared_cache_key(*collections):
+    """
+    Cache key for data derived from session collections: data_version() while they
+    all read the shared snapshot unchanged, so sessions share the cached result, or
+    None once the session holds changes of its own (saved or not), when it must be
+    computed fresh.
+    """
+    for collection in collections:
+        if not isinstance(collection, EntityOverlay):
+            return None
+        if collection.has_session_changes():
+            return None
+    return data_version()
+
+def report_conflict(error):
+    """
+    Handles a ConflictError from a save. The conflicting copies have already been
+    discarded, so the page reruns on the newer data, and main.py shows the warning.
+    """
+    kinds = sorted({kind for kind, _ in error.conflicts})
+    st.session_state.save_conflict = (
+        "Your changes were not saved: another session changed the same "
+        f"{' and '.join(kinds)} first. The page has been reloaded with their changes; "
+        "please make your edit again."
+    )
+    st.rerun()
+
+def get_campaign_index() -> CampaignIndex:
+    """
+    The session's CampaignIndex. Collections replaced with plain lists get an index of
+    their own, rebuilt whenever the lists are replaced or change length.
+    """
+    gangs = st.session_state.get("gangs", [])
+    territories = st.session_state.get("territories", [])
+    index = getattr(gangs, "index", None)
+    if index is not None:
+        return index
+    index, sizes = st.session_state.get("campaign_index", (None, None))
+    if (
+        index is None
+        or index.collections[0] is not gangs
+        or index.collections[1] is not territories
+        or sizes != (len(gangs), len(territories))
+    ):
+        index = CampaignIndex(gangs, territories, collections=(gangs, territories))
+        st.session_state.campaign_index = (index, (len(gangs), len(territories)))
+    return index
@@ -0,0 +1,143 @@
+import queue
+import threading
+from collections import namedtuple
+from concurrent.futures import Future
+
+# One entity write planned by the writer. `version` is the commit version that
+# produced it; `is_new` marks puts of keys the store didn't have.
+Change = namedtuple("Change", ["op", "kind", "key", "entity", "version", "is_new"])
+
+class ConflictError(Exception):
+    """
+    Raised when a save touches entities that another session changed since they were
+    loaded
+    """
+    def __init__(self, conflicts):
+        self.conflicts = conflicts  # [(kind, key)]
+        names = ", ".join(f"{kind[:-1]} '{key}'" for kind, key in conflicts)
+        super().__init__(
+            f"Changed by another session since this page loaded it: {names}"
+        )
+
+class CommitRequest:
+    """
+    A session's save: the dirty entities it wants written, the full key set of each
+    collection it is saving (anything else it had seen is removed), and the newest
+    commit version it had seen. base_version=None turns off conflict checks, for
+    callers that hold plain lists rather than snapshot overlays.
+    """
+    def __init__(self, puts, live_keys, base_version):
+        self.puts = puts  # [(kind, key, entity, expected_version)]
+        self.live_keys = live_keys  # {kind: set of keys}
+        self.base_version = base_version
+        self.future = Future()
+
+class CommitWriter:
+    """
+    Dedicated writer thread that every save goes through. Queued requests are checked
+    against per-entity versions, each accepted request gets the next commit version,
+    and the whole batch is persisted with a single backend write.
+    """
+    def __init__(self, load_versions, write, max_batch=64, on_commit=None):
+        self._load_versions = load_versions  # () -> (version, {kind: {key: version}})
+        self._write = write  # ([Change]) -> None
+        self._on_commit = on_commit  # ([Change]) -> None, after each durable batch
+        self.max_batch = max_batch
+        self.version = None
+        self._versions = None
+        self._queue = queue.Queue()
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+    def commit(self, request, timeout=None):
+        """
+        Queues a request and blocks until it is durable. Returns its commit version or
+        raises ConflictError.
+        """
+        self._ensure_started()
+        self._queue.put(request)
+        return request.future.result(timeout)
+
+    def _ensure_started(self):
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name="campaign-writer", daemon=True
+                )
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self.max_batch:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            self._commit_batch(batch)
+
+    def _commit_batch(self, batch):
+        try:
+            if self._versions is None:
+                self.version, self._versions = self._load_versions()
+        except Exception as e:
+            for request in batch:
+                request.future.set_exception(e)
+            return
+
+        changes, accepted = [], []
+        for request in batch:
+            conflicts = self._conflicts(request)
+            if conflicts:
+                request.future.set_exception(ConflictError(conflicts))
+                continue
+            self.version += 1
+            request_changes = self._plan(request, self.version)
+            for change in request_changes:
+                stored = self._versions.setdefault(change.kind, {})
+                if change.op == "put":
+                    stored[change.key] = change.version
+                else:
+                    stored.pop(change.key, None)
+            changes += request_changes
+            accepted.append((request, self.version))
+
+        try:
+            if changes:
+                self._write(changes)
+        except Exception as e:
+            # Forget the optimistic bookkeeping; it is reloaded on the next batch
+            self._versions = None
+            for request, _ in accepted:
+                request.future.set_exception(e)
+            return
+        if self._on_commit is not None and changes:
+            try:
+                self._on_commit(changes)
+            except Exception as e:
+                print(f"Commit listener failed: {e}")
+        for request, version in accepted:
+            request.future.set_result(version)
+
+    def _conflicts(self, request):
+        if request.base_version is None:
+            return []
+        return [
+            (kind, key)
+            for kind, key, _, expected in request.puts
+            if self._versions.get(kind, {}).get(key, 0) != expected
+        ]
+
+    def _plan(self, request, version):
+        changes = []
+        for kind, key, entity, _ in request.puts:
+            stored = self._versions.get(kind, {})
+            changes.append(Change("put", kind, key, entity, version, key not in stored))
+        base_version = request.base_version
+        for kind, live_keys in request.live_keys.items():
+            for key, stored_version in self._versions.get(kind, {}).items():
+                # Only remove entities the caller had actually seen
+                seen = base_version is None or stored_version <= base_version
+                if key not in live_keys and seen:
+                    changes.append(Change("delete", kind, key, None, version, False))
+        return changes
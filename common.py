@@ -3,10 +3,25 @@
 import streamlit as st
 import json
 import os
+import sqlite3
+import threading
+import hashlib
 import uuid
+from array import array
+from collections import defaultdict
+from contextlib import contextmanager
 from datetime import datetime
-from typing import List, Optional
-from pydantic import BaseModel, Field, ValidationError
+from functools import lru_cache
+from typing import Any, Callable, List, Optional, get_args, get_origin
+import numpy as np
+from pydantic import BaseModel, Field, PrivateAttr, TypeAdapter, ValidationError, model_serializer, model_validator
+from pydantic_core import core_schema
+from journal import MutationJournal, fsync_directory
+from commit_queue import Change, CommitRequest, CommitWriter, ConflictError
+from equipment_catalog import CatalogItem, catalog as equipment_catalog
+from trait_registry import TraitRegistry, TraitSet
+from campaign_metrics import CampaignMetrics
+from battle_facts import BattleFacts
 
 # -------------------- Constants --------------------
 DATA_FILE = "campaign_data.json"
@@ -17,6 +32,14 @@ GANGS_DIR = os.path.join(DATA_DIR, "gangs")
 TERRITORIES_DIR = os.path.join(DATA_DIR, "territories")
 BATTLES_DIR = os.path.join(DATA_DIR, "battles")
 EQUIPMENT_DIR = os.path.join(DATA_DIR, "equipment")
+INDEX_FILE = os.path.join(DATA_DIR, "index.json")
+SQLITE_DB_FILE = os.path.join(DATA_DIR, "campaign.db")
+
+# Bumped whenever a model changes shape; stored data stamped with an older schema is re-validated on load
+SCHEMA_VERSION = 2
+
+# "files" (per-entity JSON + journal) or "sqlite"
+STORAGE_BACKEND = os.environ.get("NECROMUNDA_STORAGE", "files")
 
 # Ensure directories exist
 for directory in [GANGS_DIR, TERRITORIES_DIR, BATTLES_DIR, EQUIPMENT_DIR]:
@@ -25,6 +48,73 @@ for directory in [GANGS_DIR, TERRITORIES_DIR, BATTLES_DIR, EQUIPMENT_DIR]:
 
 
 
+# -------------------- Change Tracking --------------------
+
+class TrackedModel(BaseModel):
+    """Base model that remembers whether it changed since it was last persisted"""
+    _dirty: bool = PrivateAttr(default=True)
+    # Commit version that last wrote this entity; 0 if it has never been stored
+    _version: int = PrivateAttr(default=0)
+    # Set on entities of the process-wide shared snapshot, which no session may modify
+    _frozen: bool = PrivateAttr(default=False)
+
+    def __setattr__(self, name, value):
+        if not name.startswith("_") and self._frozen:
+            raise TypeError(
+                f"{type(self).__name__} belongs to the shared campaign snapshot; "
+                "modify the copy returned by checkout() instead"
+            )
+        super().__setattr__(name, value)
+        if not name.startswith("_"):
+            super().__setattr__("_dirty", True)
+
+    def _nested(self):
+        """Tracked models held in this model's list fields (fighters, equipment)."""
+        for value in self.__dict__.values():
+            if isinstance(value, list):
+                for item in value:
+                    if isinstance(item, TrackedModel):
+                        yield item
+
+    @property
+    def stored_version(self) -> int:
+        return self._version
+
+    def is_dirty(self) -> bool:
+        return self._dirty or any(child.is_dirty() for child in self._nested())
+
+    def mark_dirty(self):
+        self._dirty = True
+
+    def mark_clean(self):
+        self._dirty = False
+        for child in self._nested():
+            child.mark_clean()
+
+    def freeze(self):
+        self._frozen = True
+        for child in self._nested():
+            child.freeze()
+
+    def private_copy(self):
+        """Deep, unfrozen copy that a session can modify."""
+        copy = self.model_copy(deep=True)
+        copy._thaw()
+        return copy
+
+    def _thaw(self):
+        self._frozen = False
+        for child in self._nested():
+            child._thaw()
+
+def mark_dirty(*entities):
+    """
+    Flags entities as changed. Attribute assignment is tracked automatically,
+    but in-place list edits (e.g. gang.territories.append) must be flagged here.
+    """
+    for entity in entities:
+        entity.mark_dirty()
+
 # -------------------- Local Campaign Models --------------------
 
 class Injury(BaseModel):
@@ -51,38 +141,200 @@ class Advancement(BaseModel):
     xp_cost: int
     date_acquired: datetime = Field(default_factory=datetime.now)
 
-class Equipment(BaseModel):
-    equipment_id: str = Field(default_factory=lambda: str(uuid.uuid4()))
-    name: str
+# Fighter status counted by the dashboard's Injured Fighters metric (compared exactly)
+INJURED_STATUS = "Injured"
+
+# Lasting injuries from the core rules that permanently reduce a characteristic
+PERMANENT_INJURIES = ("Humiliated", "Head Injury", "Eye Injury", "Hand Injury", "Hobbled", "Spinal Injury", "Enfeebled")
+
+# Definitions of every skill and injury name fighters carry; fighters hold their ids
+skill_registry = TraitRegistry(
+    "skills", Skill, lambda name: Skill(name=name, type="", description="")
+)
+injury_registry = TraitRegistry(
+    "injuries", Injury,
+    lambda name: Injury(
+        name=name, description="",
+        severity="Major" if name in PERMANENT_INJURIES else "Minor",
+        permanent=name in PERMANENT_INJURIES,
+    ),
+)
+
+class Equipment(TrackedModel):
+    """
+    A quantity of one equipment catalog item. Stored as {"catalog_id", "qty"}; name,
+    cost and traits are read from the shared catalog item. Equipment(name=..., qty=...,
+    cost=..., traits=...) and older inline data intern the item into the catalog.
+    """
+    item: CatalogItem
     qty: int
-    cost: int = 0
-    traits: str = ""
 
-class GangFighter(BaseModel):
+    @property
+    def catalog_id(self):
+        return self.item.catalog_id
+
+    @property
+    def equipment_id(self):
+        # Equal items share one id; kept for callers that key equipment by it
+        return self.item.catalog_id
+
+    @property
+    def name(self):
+        return self.item.name
+
+    @name.setter
+    def name(self, value):
+        self.item = equipment_catalog.intern(value, self.item.cost, self.item.traits)
+
+    @property
+    def cost(self):
+        return self.item.cost
+
+    @cost.setter
+    def cost(self, value):
+        self.item = equipment_catalog.intern(self.item.name, int(value), self.item.traits)
+
+    @property
+    def traits(self):
+        return self.item.traits
+
+    @traits.setter
+    def traits(self, value):
+        self.item = equipment_catalog.intern(self.item.name, self.item.cost, value)
+
+    @classmethod
+    def _pack_fields(cls, values):
+        """Resolves a stored catalog_id, or interns inline name/cost/traits, into the shared item."""
+        if "item" in values:
+            return values
+        if "catalog_id" in values:
+            catalog_id = values.pop("catalog_id")
+            try:
+                values["item"] = equipment_catalog.get(catalog_id)
+            except KeyError:
+                raise ValueError(f"Unknown equipment catalog id: {catalog_id!r}") from None
+        elif "name" in values:
+            values.pop("equipment_id", None)
+            values["item"] = equipment_catalog.intern(
+                values.pop("name"), int(values.pop("cost", 0)), values.pop("traits", "")
+            )
+        return values
+
+    @model_validator(mode="before")
+    @classmethod
+    def _pack_item(cls, data: Any):
+        return cls._pack_fields(dict(data)) if isinstance(data, dict) else data
+
+    @model_serializer(mode="wrap")
+    def _serialize_item(self, handler):
+        dumped = handler(self)
+        return {"catalog_id": dumped.pop("item"), **dumped} if "item" in dumped else dumped
+
+# Characteristic order of a StatBlock
+STAT_NAMES = ("m", "ws", "bs", "s", "t", "w", "i", "a", "ld", "cl", "wil", "intelligence")
+_STAT_INDEX = {name: index for index, name in enumerate(STAT_NAMES)}
+_STAT_RANGE = (-2 ** 15, 2 ** 15 - 1)  # What an int16 slot holds
+_int_adapter = TypeAdapter(int)
+
+def _stat_value(name, value):
+    """
+    One characteristic checked like the int fields it replaced (4, 4.0 and "4" pass,
+    4.5 doesn't) and against the int16 range. Raises ValueError, which pydantic reports
+    as a ValidationError.
+    """
+    try:
+        value = _int_adapter.validate_python(value)
+    except ValidationError as err:
+        raise ValueError(f"{name} must be a whole number, got {value!r}") from err
+    if not _STAT_RANGE[0] <= value <= _STAT_RANGE[1]:
+        raise ValueError(f"{name} must be between {_STAT_RANGE[0]} and {_STAT_RANGE[1]}, got {value}")
+    return value
+
+class StatBlock:
+    """
+    Immutable fixed-layout block of a fighter's 12 characteristics, backed by one int16
+    array. Change a stat with replace() (or by assigning fighter.ws etc., which does it).
+    """
+    __slots__ = ("values",)
+
+    def __init__(self, values):
+        values = list(values)
+        if len(values) != len(STAT_NAMES):
+            raise ValueError(f"A stat block needs {len(STAT_NAMES)} values, got {len(values)}")
+        self.values = array("h", (_stat_value(name, v) for name, v in zip(STAT_NAMES, values, strict=True)))
+
+    @classmethod
+    def validate(cls, value):
+        return value if isinstance(value, cls) else cls(value)
+
+    @classmethod
+    def __get_pydantic_core_schema__(cls, source, handler):
+        return core_schema.no_info_plain_validator_function(
+            cls.validate,
+            serialization=core_schema.plain_serializer_function_ser_schema(lambda block: block.values.tolist()),
+        )
+
+    def __getitem__(self, name):
+        return self.values[_STAT_INDEX[name]]
+
+    def replace(self, **changes):
+        values = array("h", self.values)
+        for name, value in changes.items():
+            values[_STAT_INDEX[name]] = _stat_value(name, value)
+        block = StatBlock.__new__(StatBlock)
+        block.values = values
+        return block
+
+    def as_dict(self):
+        return dict(zip(STAT_NAMES, self.values, strict=True))
+
+    def __eq__(self, other):
+        return isinstance(other, StatBlock) and self.values == other.values
+
+    def __hash__(self):
+        return hash(self.values.tobytes())
+
+    def __getstate__(self):
+        return self.values.tobytes()
+
+    def __setstate__(self, state):
+        self.values = array("h")
+        self.values.frombytes(state)
+
+    def __repr__(self):
+        return f"StatBlock({', '.join(f'{n}={v}' for n, v in zip(STAT_NAMES, self.values, strict=True))})"
+
+def _stat_property(name):
+    def get(self):
+        return self.stats[name]
+    def set(self, value):
+        self.stats = self.stats.replace(**{name: value})
+    return property(get, set)
+
+def stat_matrix(fighters) -> np.ndarray:
+    """(len(fighters), 12) int16 matrix of characteristics, columns in STAT_NAMES order."""
+    raw = b"".join(fighter.stats.values.tobytes() for fighter in fighters)
+    return np.frombuffer(raw, dtype=np.int16).reshape(-1, len(STAT_NAMES))
+
+# GangFighter's packed trait fields and the keys they are serialized as
+TRAIT_FIELDS = {"skill_set": "skills", "injury_set": "injuries"}
+
+class GangFighter(TrackedModel):
     ganger_id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     label_id: Optional[str] = ""
     name: str
     type: str
-    m: int
-    ws: int
-    bs: int
-    s: int
-    t: int
-    w: int
-    i: int
-    a: int
-    ld: int
-    cl: int
-    wil: int
-    # intelligence: int = Field(..., alias="int")
-    intelligence: int = Field(..., alias="int")
+    # m, ws, bs, s, t, w, i, a, ld, cl, wil and intelligence ("int" in imports), packed into
+    # one StatBlock. They are still read, assigned and serialized as individual fields.
+    stats: StatBlock
     cost: int
     xp: int
     kills: int
     advance_count: int
     equipment: List[Equipment] = []
-    skills: List[str] = []
-    injuries: List[str] = []
+    # Skill and injury registry ids; read and assigned as lists of names via .skills/.injuries
+    skill_set: TraitSet
+    injury_set: TraitSet
     image: Optional[str] = None
     status: str
     notes: str
@@ -93,7 +345,77 @@ class GangFighter(BaseModel):
         # allow_population_by_field_name = True
         populate_by_name = True
 
-class Gang(BaseModel):
+    m = _stat_property("m")
+    ws = _stat_property("ws")
+    bs = _stat_property("bs")
+    s = _stat_property("s")
+    t = _stat_property("t")
+    w = _stat_property("w")
+    i = _stat_property("i")
+    a = _stat_property("a")
+    ld = _stat_property("ld")
+    cl = _stat_property("cl")
+    wil = _stat_property("wil")
+    intelligence = _stat_property("intelligence")
+
+    @property
+    def skills(self):
+        return self.skill_set.names()
+
+    @skills.setter
+    def skills(self, names):
+        self.skill_set = skill_registry.trait_set(names)
+
+    @property
+    def injuries(self):
+        return self.injury_set.names()
+
+    @injuries.setter
+    def injuries(self, names):
+        self.injury_set = injury_registry.trait_set(names)
+
+    @property
+    def is_injured(self):
+        return self.status == INJURED_STATUS
+
+    @classmethod
+    def _pack_fields(cls, values):
+        """
+        Converts serialized data to the packed fields: the individual characteristics
+        into a StatBlock, skill and injury names into registry ids.
+        """
+        if "stats" not in values:
+            if "intelligence" not in values and "int" in values:
+                values["intelligence"] = values.pop("int")
+            if all(name in values for name in STAT_NAMES):
+                values["stats"] = StatBlock([values.pop(name) for name in STAT_NAMES])
+        if "skill_set" not in values:
+            values["skill_set"] = skill_registry.trait_set(values.pop("skills", ()))
+        if "injury_set" not in values:
+            values["injury_set"] = injury_registry.trait_set(values.pop("injuries", ()))
+        return values
+
+    @model_validator(mode="before")
+    @classmethod
+    def _pack_stats(cls, data: Any):
+        return cls._pack_fields(dict(data)) if isinstance(data, dict) else data
+
+    @model_serializer(mode="wrap")
+    def _unpack_stats(self, handler):
+        # Serialized form keeps the individual fields, in their original position
+        dumped = handler(self)
+        data = {}
+        for key in type(self).model_fields:
+            if key == "stats" and key in dumped:
+                data.update(zip(STAT_NAMES, dumped.pop(key), strict=True))
+            elif key in TRAIT_FIELDS and key in dumped:
+                data[TRAIT_FIELDS[key]] = dumped.pop(key)
+            elif key in dumped:
+                data[key] = dumped.pop(key)
+        data.update(dumped)  # Aliased keys
+        return data
+
+class Gang(TrackedModel):
     gang_id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     gang_name: str
     gang_type: str
@@ -104,7 +426,143 @@ class Gang(BaseModel):
     gangers: List[GangFighter] = []
     stash: List[Equipment] = []
 
-class Territory(BaseModel):
+    # Set on gangs loaded header-only; returns the raw (gangers, stash) lists on first access
+    _roster_loader: Optional[Callable] = PrivateAttr(default=None)
+    _fighter_count: int = PrivateAttr(default=0)
+    _catalog_ids: Optional[tuple] = PrivateAttr(default=None)
+    _stash_items: Optional[int] = PrivateAttr(default=None)
+    _stat_totals: Optional[tuple] = PrivateAttr(default=None)
+    # Why the roster couldn't be loaded; such a gang shows an empty roster and can't be saved
+    _roster_error: Optional[str] = PrivateAttr(default=None)
+
+    @classmethod
+    def from_header(cls, header, roster_loader, trusted=False):
+        """
+        Builds a gang from its header fields only. gangers and stash are left out of the
+        model until first accessed, when roster_loader is called to fetch them.
+        """
+        header = dict(header)
+        fighter_count = header.pop("fighter_count", 0)
+        catalog_ids = header.pop("catalog_ids", None)  # Missing from headers indexed before it was added
+        stash_items = header.pop("stash_items", None)
+        stat_totals = header.pop("stat_totals", None)
+        gang = construct_trusted(cls, header) if trusted else cls(**header)
+        for name in ROSTER_FIELDS:
+            gang.__dict__.pop(name, None)
+        gang._roster_loader = roster_loader
+        gang._fighter_count = fighter_count
+        gang._catalog_ids = tuple(catalog_ids) if catalog_ids is not None else None
+        gang._stash_items = stash_items
+        gang._stat_totals = tuple(stat_totals) if stat_totals is not None else None
+        return gang
+
+    def __getattr__(self, name):
+        if name in ROSTER_FIELDS and self._roster_loader is not None:
+            self.hydrate()
+            return self.__dict__[name]
+        return super().__getattr__(name)
+
+    @property
+    def is_hydrated(self) -> bool:
+        return self._roster_loader is None
+
+    @property
+    def fighter_count(self) -> int:
+        """Number of fighters, without loading the roster of a header-only gang."""
+        return self._fighter_count if self._roster_loader is not None else len(self.gangers)
+
+    @property
+    def catalog_ids(self) -> tuple:
+        """Catalog ids of the equipment the gang's fighters and stash hold, without loading the roster if the header lists them."""
+        if self._roster_loader is not None and self._catalog_ids is not None:
+            return self._catalog_ids
+        return tuple(dict.fromkeys(
+            [eq.catalog_id for fighter in self.gangers for eq in fighter.equipment] + [eq.catalog_id for eq in self.stash]
+        ))
+
+    @property
+    def stash_items(self) -> int:
+        """Total quantity of the equipment in the stash, without loading the roster if the header has it."""
+        if self._roster_loader is not None and self._stash_items is not None:
+            return self._stash_items
+        return sum(eq.qty for eq in self.stash)
+
+    @property
+    def stat_totals(self) -> np.ndarray:
+        """Sum of each characteristic over the fighters (STAT_NAMES order), without loading the roster if the header has them."""
+        if self._roster_loader is not None and self._stat_totals is not None:
+            return np.array(self._stat_totals, dtype=np.int64)
+        return stat_matrix(self.gangers).sum(axis=0, dtype=np.int64)
+
+    @property
+    def roster_error(self) -> Optional[str]:
+        """Why this gang's roster could not be loaded, or None."""
+        return self._roster_error
+
+    def hydrate(self):
+        """
+        Loads the roster of a header-only gang. Loaded fighters inherit the gang's frozen
+        state. A roster that can't be read is reported and left empty, and roster_error
+        says why; save_data refuses to write the gang over its stored roster.
+        """
+        if self._roster_loader is None:
+            return self
+        # Shared snapshot gangs are hydrated by whichever session reads them first
+        with _hydrate_lock:
+            loader = self._roster_loader
+            if loader is None:
+                return self
+            try:
+                gangers, stash, trusted = loader()
+                build = (lambda model, data: construct_trusted(model, data)) if trusted else (lambda model, data: model(**data))
+                roster = {
+                    "gangers": [build(GangFighter, f) for f in gangers],
+                    "stash": [build(Equipment, e) for e in stash],
+                }
+            except (OSError, ValueError) as e:  # ValidationError is a ValueError
+                print(f"Error loading roster of gang {self.gang_name}: {e}")
+                self._roster_error = str(e)
+                roster, trusted = {"gangers": [], "stash": []}, True
+            for items in roster.values():
+                for item in items:
+                    if not trusted:
+                        item.mark_clean()
+                    if self._frozen:
+                        item.freeze()
+            self.__dict__.update(roster)
+            self._roster_loader = None
+        return self
+
+    def model_dump(self, **kwargs):
+        return super(Gang, self.hydrate()).model_dump(**kwargs)
+
+    def model_dump_json(self, **kwargs):
+        return super(Gang, self.hydrate()).model_dump_json(**kwargs)
+
+    def __eq__(self, other):
+        if isinstance(other, Gang):
+            self.hydrate()
+            other.hydrate()
+        return super().__eq__(other)
+
+_hydrate_lock = threading.Lock()
+
+# Gang fields listed in the index, so gangs can be loaded without their rosters
+GANG_HEADER_FIELDS = ("gang_id", "gang_name", "gang_type", "campaign", "credits", "reputation", "territories")
+ROSTER_FIELDS = ("gangers", "stash")
+
+def gang_header(data):
+    """Header of a serialized gang, as stored in the index."""
+    header = {name: data[name] for name in GANG_HEADER_FIELDS if name in data}
+    gangers = data.get("gangers", [])
+    header["fighter_count"] = len(gangers)
+    carried = [eq for fighter in gangers for eq in fighter.get("equipment", [])] + data.get("stash", [])
+    header["catalog_ids"] = list(dict.fromkeys(eq["catalog_id"] for eq in carried if "catalog_id" in eq))
+    header["stash_items"] = sum(eq.get("qty", 0) for eq in data.get("stash", []))
+    header["stat_totals"] = [sum(fighter.get(name, 0) for fighter in gangers) for name in STAT_NAMES]
+    return header
+
+class Territory(TrackedModel):
     name: str
     type: str
     controlled_by: Optional[str] = None
@@ -131,7 +589,7 @@ class Scenario(BaseModel):
     min_players: int = 2
     max_players: int = 4
 
-class LocalBattle(BaseModel):
+class LocalBattle(TrackedModel):
     battle_id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     battle_created_datetime: str
     battle_scenario: str
@@ -139,6 +597,102 @@ class LocalBattle(BaseModel):
     winner_territory: Optional[str] = None
     participating_gangs: List[str]
 
+class TraitIndex:
+    """
+    Inverted indexes from skill and injury ids to the fighters carrying them, so
+    "who has Nerves of Steel" costs the size of the answer rather than a scan of every
+    roster. Keep it current with update()/remove() as fighters change; CampaignMetrics
+    keeps one over the stored rosters through the commit path.
+    """
+    def __init__(self, gangs: List[Gang] = ()):
+        self.fighters = {}  # ganger_id -> (gang, fighter)
+        self._indexed = {}  # ganger_id -> (skill ids, injury ids) as indexed
+        self._skills = defaultdict(set)
+        self._injuries = defaultdict(set)
+        for gang in gangs:
+            for fighter in gang.gangers:
+                self.update(gang, fighter)
+
+    def update(self, gang, fighter):
+        """(Re)indexes one fighter."""
+        self.remove(fighter.ganger_id)
+        skill_ids, injury_ids = tuple(fighter.skill_set), tuple(fighter.injury_set)
+        self.fighters[fighter.ganger_id] = (gang, fighter)
+        self._indexed[fighter.ganger_id] = (skill_ids, injury_ids)
+        for skill_id in skill_ids:
+            self._skills[skill_id].add(fighter.ganger_id)
+        for injury_id in injury_ids:
+            self._injuries[injury_id].add(fighter.ganger_id)
+
+    def remove(self, ganger_id):
+        skill_ids, injury_ids = self._indexed.pop(ganger_id, ((), ()))
+        self.fighters.pop(ganger_id, None)
+        for skill_id in skill_ids:
+            self._skills[skill_id].discard(ganger_id)
+        for injury_id in injury_ids:
+            self._injuries[injury_id].discard(ganger_id)
+
+    def _lookup(self, index, ids):
+        ganger_ids = set().union(*(index.get(i, ()) for i in ids)) if ids else set()
+        return [self.fighters[ganger_id] for ganger_id in ganger_ids]
+
+    def with_skill(self, name):
+        """[(gang, fighter)] of fighters with this skill."""
+        skill_id = skill_registry.lookup(name)
+        return self._lookup(self._skills, [] if skill_id is None else [skill_id])
+
+    def with_injury(self, name):
+        injury_id = injury_registry.lookup(name)
+        return self._lookup(self._injuries, [] if injury_id is None else [injury_id])
+
+    def with_permanent_injuries(self):
+        return self._lookup(self._injuries, injury_registry.ids_where(lambda injury: injury.permanent))
+
+# -------------------- Trusted Loading --------------------
+
+@lru_cache(maxsize=None)
+def _trusted_layout(model):
+    """Per-model facts construct_trusted needs: nested List[SomeModel] fields, field names and clean private state."""
+    nested = {}
+    for name, field in model.model_fields.items():
+        args = get_args(field.annotation)
+        if get_origin(field.annotation) is list and args and isinstance(args[0], type) and issubclass(args[0], BaseModel):
+            nested[name] = args[0]
+    private = {name: attr.get_default() for name, attr in model.__private_attributes__.items()}
+    if "_dirty" in private:
+        private["_dirty"] = False
+    # Models whose stored form differs from their fields (GangFighter's stats) convert it here
+    prepare = getattr(model, "_pack_fields", None)
+    return nested, frozenset(model.model_fields), private, prepare
+
+def construct_trusted(model, data):
+    """
+    Builds a clean `model` (and its nested list models) from data this app serialized
+    itself, skipping validation. Only use it for data stamped with the current SCHEMA_VERSION;
+    anything external (imports, legacy files, edited files) must go through model(**data).
+    """
+    nested, field_names, private, prepare = _trusted_layout(model)
+    values = dict(data)
+    if prepare is not None:
+        values = prepare(values)
+    for name, item_model in nested.items():
+        if name in values:
+            values[name] = [construct_trusted(item_model, item) for item in values[name]]
+    if values.keys() != field_names:
+        # Partial or aliased data (e.g. a gang header): let pydantic fill in defaults and map aliases
+        obj = model.model_construct(**values)
+        if isinstance(obj, TrackedModel):
+            obj._dirty = False
+        return obj
+    # Every field present: set the instance state directly, which is several times
+    # cheaper than model_construct's per-field default handling
+    obj = model.__new__(model)
+    object.__setattr__(obj, "__dict__", values)
+    object.__setattr__(obj, "__pydantic_fields_set__", set(values))
+    object.__setattr__(obj, "__pydantic_extra__", None)
+    object.__setattr__(obj, "__pydantic_private__", dict(private))
+    return obj
+
 # -------------------- Full Campaign Models --------------------
 
 class Member(BaseModel):
@@ -199,75 +753,902 @@ class Campaign(BaseModel):
 
 # -------------------- Persistence Functions --------------------
 
-@st.cache_data(ttl=60)  # Cache for 60 seconds
-def load_data():
-    if os.path.exists(DATA_FILE):
-        with open(DATA_FILE, "r") as f:
-            data = json.load(f)
-        gangs = []
-        territories = []
-        battles = []
-        for g in data.get("gangs", []):
-            try:
-                gangs.append(Gang(**g))
-            except ValidationError as e:
-                print(f"Error loading gang data: {e}")
-        for t in data.get("territories", []):
+# Per-entity storage layout: collection -> (directory, key attribute, model)
+ENTITY_STORES = {
+    "gangs": (GANGS_DIR, "gang_id", Gang),
+    "territories": (TERRITORIES_DIR, "name", Territory),
+    "battles": (BATTLES_DIR, "battle_id", LocalBattle),
+}
+
+# Journal event names per collection: (added, updated, removed)
+JOURNAL_EVENTS = {
+    "gangs": ("gang_registered", "gang_updated", "gang_removed"),
+    "territories": ("territory_added", "territory_updated", "territory_removed"),
+    "battles": ("battle_recorded", "battle_updated", "battle_removed"),
+}
+
+# Directory of every entity kind tracked by the manifest (data/index.json)
+MANIFEST_DIRS = {**{kind: store[0] for kind, store in ENTITY_STORES.items()}, "equipment": EQUIPMENT_DIR}
+
+# Guards read-modify-write of the index between save_data, the compactor and direct entity saves
+_index_lock = threading.Lock()
+
+def file_digest(raw):
+    """Content hash used by the manifest, backups and bulk loader."""
+    return hashlib.blake2b(raw, digest_size=16).hexdigest()
+
+def _write_json_atomic(file_path, data, indent=None):
+    """
+    Writes JSON to a temp file and swaps it in, so readers never see a half-written file.
+    Returns the content hash of the written bytes.
+    """
+    raw = json.dumps(data, indent=indent).encode("utf-8")
+    tmp_path = f"{file_path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(raw)
+        f.flush()
+        os.fsync(f.fileno())  # The content is on disk before the rename can be
+    os.replace(tmp_path, file_path)
+    return file_digest(raw)
+
+def _entity_file_name(key):
+    return f"{key}.json"
+
+def write_entity_file(kind, key, data, schema=SCHEMA_VERSION):
+    """
+    Writes one entity file and returns its manifest entry: file name, content hash,
+    size, mtime and schema version (plus the header for gangs). The caller records it
+    with update_manifest(), so bulk writers can record many entries at once.
+    """
+    equipment_catalog.save()  # Catalog items the entity references must be on disk first
+    file_name = _entity_file_name(key)
+    file_path = os.path.join(MANIFEST_DIRS[kind], file_name)
+    digest = _write_json_atomic(file_path, data, indent=4)
+    stat = os.stat(file_path)
+    entry = {"file": file_name, "hash": digest, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "schema": schema}
+    if kind == "gangs":
+        entry["header"] = gang_header(data)
+    return entry
+
+def _read_index():
+    """Returns the entity index, or None if the campaign hasn't been split into entity files yet."""
+    if not os.path.exists(INDEX_FILE):
+        return None
+    try:
+        with open(INDEX_FILE, "r") as f:
+            index = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Error reading index file: {e}")
+        return None
+    for kind in MANIFEST_DIRS:
+        entries = index.get(kind, {})
+        for key, entry in entries.items():
+            if isinstance(entry, str):
+                # Early indexes stored just the file name
+                entries[key] = {"file": entry, "version": 0}
+    return index
+
+def _write_index(index):
+    _write_json_atomic(INDEX_FILE, index)
+
+def _empty_index():
+    # Entries are {key: {"file", "version", "hash", "size", "mtime_ns", "schema"}};
+    # "seq" is the newest folded commit version
+    return {"seq": 0, **{kind: {} for kind in MANIFEST_DIRS}}
+
+def _merge_entries(index, kind, entries, removed=()):
+    """Merges manifest entries into `index`, keeping each entity's commit version unless the entry sets one."""
+    current = index.setdefault(kind, {})
+    for key, entry in entries.items():
+        current[key] = {"version": current.get(key, {}).get("version", 0), **entry}
+    for key in removed:
+        current.pop(key, None)
+
+def update_manifest(kind, entries, removed=()):
+    """Records entries returned by write_entity_file() (by entity key) and drops removed keys."""
+    with _index_lock:
+        index = _read_index() or _empty_index()
+        _merge_entries(index, kind, entries, removed)
+        _write_index(index)
+
+def load_manifest():
+    """The manifest: {kind: {key: entry}} plus "seq". Empty if nothing was written through it yet."""
+    return _read_index() or _empty_index()
+
+def manifest_entries_by_file(kind):
+    """Manifest entries of one kind keyed by file name, for loaders that walk directories."""
+    return {entry["file"]: entry for entry in load_manifest().get(kind, {}).values() if "file" in entry}
+
+def _stat_matches(stat, entry):
+    return entry.get("size") == stat.st_size and entry.get("mtime_ns") == stat.st_mtime_ns
+
+def changed_entities(kind):
+    """
+    Files of `kind` that differ from the manifest, found with one stat per file and no reads:
+    (changed keys, files missing from the manifest, manifest keys whose file is gone).
+    """
+    entries = load_manifest().get(kind, {})
+    directory = MANIFEST_DIRS[kind]
+    known_files = set()
+    changed, missing = [], []
+    for key, entry in entries.items():
+        known_files.add(entry["file"])
+        try:
+            stat = os.stat(os.path.join(directory, entry["file"]))
+        except FileNotFoundError:
+            missing.append(key)
+            continue
+        if not _stat_matches(stat, entry):
+            changed.append(key)
+    untracked = [
+        name for name in os.listdir(directory)
+        if name.endswith(".json") and name not in known_files
+    ]
+    return changed, untracked, missing
+
+def diff_manifests(old, new):
+    """Per kind, the keys (added, changed, removed) between two manifests, compared by content hash."""
+    diff = {}
+    for kind in MANIFEST_DIRS:
+        old_entries, new_entries = old.get(kind, {}), new.get(kind, {})
+        added = [k for k in new_entries if k not in old_entries]
+        removed = [k for k in old_entries if k not in new_entries]
+        changed = [
+            k for k, entry in new_entries.items()
+            if k in old_entries and entry.get("hash") != old_entries[k].get("hash")
+        ]
+        diff[kind] = (added, changed, removed)
+    return diff
+
+def _split_legacy_data(index):
+    """
+    Writes every entity of campaign_data.json that the index doesn't hold to its own file
+    and returns their manifest entries. Run by the first compaction, so collections that
+    no save touched survive the switch from the legacy file to the index.
+    """
+    entries = {kind: {} for kind in ENTITY_STORES}
+    for kind, entities in _load_legacy_data().items():
+        for key, entity in entities.items():
+            if key not in index.get(kind, {}):
+                entries[kind][key] = write_entity_file(kind, key, entity.model_dump())
+    return entries
+
+def _apply_journal_records(records):
+    """Compaction callback: folds journaled puts/deletes into the entity files and the manifest."""
+    index = _read_index()
+    if index is None or not index.get("seq"):
+        # Still on campaign_data.json; the records are applied over its entities
+        entries = _split_legacy_data(index or {})
+    else:
+        entries = {kind: {} for kind in ENTITY_STORES}
+    removed = {kind: [] for kind in ENTITY_STORES}
+    for record in records:
+        kind, key = record["kind"], record["key"]
+        if record["op"] == "put":
+            # Files whose schema and hash still match are loaded without re-validation
+            entry = write_entity_file(kind, key, record["data"], record.get("schema"))
+            entry["version"] = record["version"]
+            entries[kind][key] = entry
+        else:
+            file_path = os.path.join(MANIFEST_DIRS[kind], _entity_file_name(key))
+            if os.path.exists(file_path):
+                os.remove(file_path)
+            removed[kind].append(key)
+    with _index_lock:
+        index = _read_index() or _empty_index()
+        for kind in ENTITY_STORES:
+            _merge_entries(index, kind, entries[kind], removed[kind])
+        index["seq"] = max([index.get("seq", 0)] + [record["version"] for record in records])
+        _write_index(index)
+    # The journal drops these records next; the renames and removals must survive a crash first
+    for directory in {*MANIFEST_DIRS.values(), DATA_DIR}:
+        fsync_directory(directory)
+
+_journal = MutationJournal(DATA_DIR, apply_fn=_apply_journal_records)
+
+def compact_journal():
+    """Folds the mutation journal into the entity files and index, so the files hold every committed change."""
+    _journal.compact()
+
+def _load_legacy_data():
+    """Loads the single-file campaign_data.json layout. Entities come back dirty so the next save splits them out."""
+    loaded = {kind: {} for kind in ENTITY_STORES}
+    if not os.path.exists(DATA_FILE):
+        return loaded
+    with open(DATA_FILE, "r") as f:
+        data = json.load(f)
+    for kind, (_, key_attr, model) in ENTITY_STORES.items():
+        for item in data.get(kind, []):
             try:
-                territories.append(Territory(**t))
+                obj = model(**item)
             except ValidationError as e:
-                print(f"Error loading territory data: {e}")
-        for b in data.get("battles", []):
+                print(f"Error loading {kind} data: {e}")
+                continue
+            loaded[kind][getattr(obj, key_attr)] = obj
+    return loaded
+
+def _read_entity_file(file_path, entry):
+    """
+    Returns the file's data and whether it is unchanged since this app wrote it. A file whose
+    size and mtime still match its manifest entry isn't hashed.
+    """
+    with open(file_path, "rb") as f:
+        stat = os.fstat(f.fileno())
+        raw = f.read()
+    trusted = entry.get("schema") == SCHEMA_VERSION and (
+        _stat_matches(stat, entry) or entry.get("hash") == file_digest(raw)
+    )
+    return json.loads(raw), trusted
+
+class _FileRoster:
+    """Roster loader for a header-only gang, reading its entity file. A class rather than a closure so cached gangs can be pickled."""
+    def __init__(self, file_path, entry):
+        self.file_path = file_path
+        self.entry = {name: entry.get(name) for name in ("schema", "hash", "size", "mtime_ns")}
+
+    def __call__(self):
+        data, trusted = _read_entity_file(self.file_path, self.entry)
+        return data.get("gangers", []), data.get("stash", []), trusted
+
+def _load_indexed(index):
+    loaded = {kind: {} for kind in ENTITY_STORES}
+    for kind, (directory, _, model) in ENTITY_STORES.items():
+        for key, entry in index.get(kind, {}).items():
+            file_name = entry["file"]
+            file_path = os.path.join(directory, file_name)
+            if not os.path.exists(file_path):
+                # Added since the last compaction; the journal has it
+                continue
             try:
-                battles.append(LocalBattle(**b))
-            except ValidationError as e:
-                print(f"Error loading battle data: {e}")
+                if "header" in entry:
+                    # Gangs are loaded header-only from the index; rosters are read on first access
+                    trusted = entry.get("schema") == SCHEMA_VERSION
+                    obj = Gang.from_header(entry["header"], _FileRoster(file_path, entry), trusted)
+                else:
+                    data, trusted = _read_entity_file(file_path, entry)
+                    obj = construct_trusted(model, data) if trusted else model(**data)
+            except (OSError, ValueError, ValidationError) as e:
+                print(f"Error loading {kind} file {file_name}: {e}")
+                continue
+            obj.mark_clean()
+            obj._version = entry["version"]
+            loaded[kind][key] = obj
+    return loaded
+
+def _replay_journal(loaded):
+    for record in _journal.records():
+        entities = loaded[record["kind"]]
+        if record["op"] == "delete":
+            entities.pop(record["key"], None)
+            continue
+        model = ENTITY_STORES[record["kind"]][2]
+        try:
+            if record.get("schema") == SCHEMA_VERSION:
+                obj = construct_trusted(model, record["data"])
+            else:
+                obj = model(**record["data"])
+        except ValidationError as e:
+            print(f"Error replaying journal record for {record['key']}: {e}")
+            continue
+        obj.mark_clean()
+        obj._version = record["version"]
+        entities[record["key"]] = obj
+
+def _load_files():
+    """Returns the file store's current view, keyed by entity key per collection."""
+    with _journal.compaction_lock:
+        index = _read_index()
+        if index is None or not index.get("seq"):
+            # Nothing compacted yet: campaign_data.json, overridden by any entity files saved directly
+            loaded = _load_legacy_data()
+            for kind, entities in _load_indexed(index or {}).items():
+                loaded[kind].update(entities)
+        else:
+            loaded = _load_indexed(index)
+        _replay_journal(loaded)
+    return loaded
+
+def _load_file_versions():
+    """Newest commit version and per-entity versions of the file store (index, then journal)."""
+    index = _read_index() or _empty_index()
+    version = index.get("seq", 0)
+    versions = {
+        kind: {key: entry["version"] for key, entry in index.get(kind, {}).items()}
+        for kind in ENTITY_STORES
+    }
+    for record in _journal.records():
+        if record["op"] == "put":
+            versions[record["kind"]][record["key"]] = record["version"]
+        else:
+            versions[record["kind"]].pop(record["key"], None)
+        version = max(version, record["version"])
+    return version, versions
+
+def _write_files(changes):
+    """
+    Writer-thread backend for the file store: journals a batch of changes with one append
+    and updates the index when entities are added or removed. The compactor later folds
+    the journal into the per-entity files.
+    """
+    records = []
+    for change in changes:
+        added, updated, removed = JOURNAL_EVENTS[change.kind]
+        if change.op == "put":
+            event = added if change.is_new else updated
+            records.append(MutationJournal.record(
+                event, "put", change.kind, change.key, change.version, change.entity.model_dump(), SCHEMA_VERSION
+            ))
+        else:
+            records.append(MutationJournal.record(removed, "delete", change.kind, change.key, change.version))
+    equipment_catalog.save()
+    _journal.append(records)
+    membership = [c for c in changes if c.op == "delete" or c.is_new]
+    if membership:
+        with _index_lock:
+            index = _read_index() or _empty_index()
+            for change in membership:
+                entries = index.setdefault(change.kind, {})
+                if change.op == "put":
+                    # Keeps the hash, header and schema a concurrent compaction may have just recorded
+                    entry = entries.setdefault(change.key, {})
+                    entry.update(file=_entity_file_name(change.key), version=change.version)
+                else:
+                    entries.pop(change.key, None)
+            _write_index(index)
+
+# -------------------- SQLite Storage Backend --------------------
+
+class SQLiteStore:
+    """
+    Embedded SQLite backend with the same load/save contract as the file store.
+    Fighters and equipment get their own tables, indexed by owning gang, so a gang's
+    roster is loaded with index queries. Lookups by id, name, status or controller are
+    served by the in-memory CampaignIndex, so they have no SQL indexes.
+    """
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS gangs (
+        gang_id TEXT PRIMARY KEY,
+        gang_name TEXT NOT NULL,
+        gang_type TEXT NOT NULL,
+        campaign TEXT NOT NULL DEFAULT '',
+        credits INTEGER NOT NULL,
+        reputation INTEGER NOT NULL,
+        territories TEXT NOT NULL DEFAULT '[]',
+        position INTEGER NOT NULL,
+        version INTEGER NOT NULL DEFAULT 0
+    );
+
+    CREATE TABLE IF NOT EXISTS fighters (
+        gang_id TEXT NOT NULL REFERENCES gangs(gang_id) ON DELETE CASCADE,
+        ganger_id TEXT NOT NULL,
+        position INTEGER NOT NULL,
+        name TEXT NOT NULL,
+        type TEXT NOT NULL,
+        status TEXT NOT NULL,
+        data TEXT NOT NULL,
+        PRIMARY KEY (gang_id, ganger_id)
+    );
+
+    -- Owned by a fighter (ganger_id set), a gang stash (ganger_id NULL) or the library (both NULL)
+    CREATE TABLE IF NOT EXISTS equipment (
+        equipment_id TEXT NOT NULL,  -- the catalog id, shared by every row of the same item
+        gang_id TEXT REFERENCES gangs(gang_id) ON DELETE CASCADE,
+        ganger_id TEXT,
+        position INTEGER NOT NULL,
+        name TEXT NOT NULL,
+        qty INTEGER NOT NULL,
+        cost INTEGER NOT NULL DEFAULT 0,
+        traits TEXT NOT NULL DEFAULT ''
+    );
+    CREATE INDEX IF NOT EXISTS idx_equipment_owner ON equipment(gang_id, ganger_id);
+    CREATE INDEX IF NOT EXISTS idx_equipment_name ON equipment(name);
+
+    CREATE TABLE IF NOT EXISTS territories (
+        name TEXT PRIMARY KEY,
+        type TEXT NOT NULL,
+        controlled_by TEXT,
+        x REAL,
+        y REAL,
+        lat REAL,
+        lng REAL,
+        elevation REAL,
+        position INTEGER NOT NULL,
+        version INTEGER NOT NULL DEFAULT 0
+    );
+
+    CREATE TABLE IF NOT EXISTS battles (
+        battle_id TEXT PRIMARY KEY,
+        battle_created_datetime TEXT NOT NULL,
+        battle_scenario TEXT NOT NULL,
+        winner_gang TEXT NOT NULL,
+        winner_territory TEXT,
+        participating_gangs TEXT NOT NULL,
+        version INTEGER NOT NULL DEFAULT 0
+    );
+    CREATE INDEX IF NOT EXISTS idx_battles_created ON battles(battle_created_datetime);
+
+    CREATE TABLE IF NOT EXISTS meta (
+        key TEXT PRIMARY KEY,
+        value INTEGER NOT NULL
+    );
+    """
+    # collection -> (table, key column)
+    TABLES = {
+        "gangs": ("gangs", "gang_id"),
+        "territories": ("territories", "name"),
+        "battles": ("battles", "battle_id"),
+    }
+    TERRITORY_COLUMNS = ("name", "type", "controlled_by", "x", "y", "lat", "lng", "elevation")
+    EQUIPMENT_COLUMNS = ("equipment_id", "name", "qty", "cost", "traits")
+    # Indexes of earlier versions that no query uses; they only slowed writes down
+    UNUSED_INDEXES = (
+        "idx_gangs_gang_name", "idx_fighters_ganger_id", "idx_fighters_status",
+        "idx_equipment_item", "idx_territories_controlled_by",
+    )
+    # Per-gang characteristic sums for the header, read out of the fighter JSON
+    STAT_TOTALS = ", ".join(f"COALESCE(SUM(json_extract(f.data, '$.{name}')), 0)" for name in STAT_NAMES)
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        with self._transaction() as conn:
+            conn.executescript(self.SCHEMA)
+            for name in self.UNUSED_INDEXES:
+                conn.execute(f"DROP INDEX IF EXISTS {name}")
+            # Databases migrated before versioning lack the version column
+            for table, _ in self.TABLES.values():
+                columns = [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+                if "version" not in columns:
+                    conn.execute(f"ALTER TABLE {table} ADD COLUMN version INTEGER NOT NULL DEFAULT 0")
+            # A new database only ever holds rows written at the current schema
+            if conn.execute("SELECT 1 FROM gangs LIMIT 1").fetchone() is None:
+                conn.execute("INSERT OR IGNORE INTO meta VALUES ('schema', ?)", (SCHEMA_VERSION,))
+            self._migrate(conn)
+
+    def _migrate(self, conn):
+        """Brings rows stamped with an older schema up to SCHEMA_VERSION, one step at a time."""
+        row = conn.execute("SELECT value FROM meta WHERE key = 'schema'").fetchone()
+        schema = row[0] if row is not None else None
+        if schema == 1:
+            # Schema 2: equipment_id holds the catalog id of the row's item instead of a per-row uuid
+            for name, cost, traits in conn.execute("SELECT DISTINCT name, cost, traits FROM equipment").fetchall():
+                conn.execute(
+                    "UPDATE equipment SET equipment_id = ? WHERE name = ? AND cost = ? AND traits = ?",
+                    (equipment_catalog.intern(name, cost, traits).catalog_id, name, cost, traits),
+                )
+            equipment_catalog.save()  # Before the rows referencing the items are committed
+            schema = 2
+        if row is not None and schema != row[0]:
+            conn.execute("UPDATE meta SET value = ? WHERE key = 'schema'", (schema,))
+
+    @contextmanager
+    def _transaction(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA foreign_keys=ON")
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    # ---- Load ----
+
+    def _trusted(self, conn):
+        """Rows are only written through write(), so they skip validation while the stored schema is current."""
+        row = conn.execute("SELECT value FROM meta WHERE key = 'schema'").fetchone()
+        return row is not None and row[0] == SCHEMA_VERSION
+
+    def load(self):
+        with self._transaction() as conn:
+            trusted = self._trusted(conn)
+            gangs = []
+            for row in conn.execute(
+                "SELECT g.gang_id, gang_name, gang_type, campaign, credits, reputation, territories, version, "
+                "(SELECT COUNT(*) FROM fighters f WHERE f.gang_id = g.gang_id), "
+                "(SELECT GROUP_CONCAT(DISTINCT equipment_id) FROM equipment e WHERE e.gang_id = g.gang_id), "
+                "(SELECT COALESCE(SUM(qty), 0) FROM equipment e WHERE e.gang_id = g.gang_id AND e.ganger_id IS NULL), "
+                f"(SELECT json_array({self.STAT_TOTALS}) FROM fighters f WHERE f.gang_id = g.gang_id) "
+                "FROM gangs g ORDER BY position"
+            ):
+                gang_id = row[0]
+                header = {
+                    "gang_id": gang_id, "gang_name": row[1], "gang_type": row[2], "campaign": row[3],
+                    "credits": row[4], "reputation": row[5], "territories": json.loads(row[6]),
+                    "fighter_count": row[8], "catalog_ids": row[9].split(",") if row[9] else [],
+                    "stash_items": row[10], "stat_totals": json.loads(row[11]),
+                }
+                try:
+                    # Fighters and stash are queried when the roster is first accessed
+                    gang = Gang.from_header(header, _SQLiteRoster(self, gang_id), trusted)
+                except ValidationError as e:
+                    print(f"Error loading gang {gang_id}: {e}")
+                    continue
+                gang.mark_clean()
+                gang._version = row[7]
+                gangs.append(gang)
+            territories = [
+                self._territory(row, trusted) for row in conn.execute(
+                    f"SELECT {', '.join(self.TERRITORY_COLUMNS)}, version FROM territories ORDER BY position"
+                )
+            ]
+            battles = [
+                self._battle(row, trusted) for row in conn.execute(
+                    "SELECT * FROM battles ORDER BY battle_created_datetime"
+                )
+            ]
         return gangs, territories, battles
+
+    def _territory(self, row, trusted=False):
+        values = dict(zip(self.TERRITORY_COLUMNS, row, strict=False))  # row ends with the version
+        territory = Territory.model_construct(**values) if trusted else Territory(**values)
+        territory.mark_clean()
+        territory._version = row[-1]
+        return territory
+
+    def _battle(self, row, trusted=False):
+        values = {
+            "battle_id": row[0], "battle_created_datetime": row[1], "battle_scenario": row[2],
+            "winner_gang": row[3], "winner_territory": row[4], "participating_gangs": json.loads(row[5]),
+        }
+        battle = LocalBattle.model_construct(**values) if trusted else LocalBattle(**values)
+        battle.mark_clean()
+        battle._version = row[6]
+        return battle
+
+    def load_roster(self, gang_id):
+        """Raw fighter and stash dicts of one gang, and whether they can skip validation."""
+        with self._transaction() as conn:
+            trusted = self._trusted(conn)
+            equipment = defaultdict(list)
+            for row in conn.execute(
+                "SELECT ganger_id, equipment_id, name, qty, cost, traits FROM equipment "
+                "WHERE gang_id = ? ORDER BY position", (gang_id,)
+            ):
+                equipment[row[0]].append(dict(zip(self.EQUIPMENT_COLUMNS, row[1:], strict=True)))
+            gangers = []
+            for ganger_id, data in conn.execute(
+                "SELECT ganger_id, data FROM fighters WHERE gang_id = ? ORDER BY position", (gang_id,)
+            ):
+                fighter = json.loads(data)
+                fighter["equipment"] = equipment.get(ganger_id, [])
+                gangers.append(fighter)
+        return gangers, equipment.get(None, []), trusted
+
+    def load_versions(self):
+        """Newest commit version and per-entity versions, for the commit writer."""
+        with self._transaction() as conn:
+            versions = {
+                kind: dict(conn.execute(f"SELECT {key_column}, version FROM {table}"))
+                for kind, (table, key_column) in self.TABLES.items()
+            }
+            row = conn.execute("SELECT value FROM meta WHERE key = 'seq'").fetchone()
+        return (row[0] if row else 0), versions
+
+    def load_equipment_library(self):
+        with self._transaction() as conn:
+            rows = conn.execute(
+                "SELECT equipment_id, name, qty, cost, traits FROM equipment "
+                "WHERE gang_id IS NULL ORDER BY position"
+            ).fetchall()
+        return [Equipment(**dict(zip(self.EQUIPMENT_COLUMNS, row, strict=True))) for row in rows]
+
+    # ---- Save ----
+
+    def write(self, changes):
+        """Writer-thread backend: applies a batch of changes in one transaction."""
+        if not changes:
+            return
+        with self._transaction() as conn:
+            for change in changes:
+                table, key_column = self.TABLES[change.kind]
+                if change.op == "delete":
+                    conn.execute(f"DELETE FROM {table} WHERE {key_column} = ?", (change.key,))
+                elif change.kind == "gangs":
+                    self._put_gang(conn, change.entity, change.version)
+                elif change.kind == "territories":
+                    self._put_territory(conn, change.entity, change.version)
+                else:
+                    b = change.entity
+                    conn.execute(
+                        "INSERT OR REPLACE INTO battles VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        (b.battle_id, b.battle_created_datetime, b.battle_scenario, b.winner_gang,
+                         b.winner_territory, json.dumps(b.participating_gangs), change.version),
+                    )
+            conn.execute("INSERT OR REPLACE INTO meta VALUES ('seq', ?)", (max(c.version for c in changes),))
+
+    def _position(self, conn, table, key_column, key):
+        """Keeps an existing row's position; new rows go to the end."""
+        row = conn.execute(f"SELECT position FROM {table} WHERE {key_column} = ?", (key,)).fetchone()
+        if row:
+            return row[0]
+        return conn.execute(f"SELECT COALESCE(MAX(position), -1) + 1 FROM {table}").fetchone()[0]
+
+    def _put_territory(self, conn, territory, version):
+        position = self._position(conn, "territories", "name", territory.name)
+        conn.execute(
+            f"INSERT OR REPLACE INTO territories ({', '.join(self.TERRITORY_COLUMNS)}, position, version) "
+            f"VALUES ({', '.join('?' * (len(self.TERRITORY_COLUMNS) + 2))})",
+            tuple(getattr(territory, c) for c in self.TERRITORY_COLUMNS) + (position, version),
+        )
+
+    def _put_gang(self, conn, gang, version):
+        position = self._position(conn, "gangs", "gang_id", gang.gang_id)
+        conn.execute("DELETE FROM fighters WHERE gang_id = ?", (gang.gang_id,))
+        conn.execute("DELETE FROM equipment WHERE gang_id = ?", (gang.gang_id,))
+        conn.execute(
+            "INSERT OR REPLACE INTO gangs VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (gang.gang_id, gang.gang_name, gang.gang_type, gang.campaign, gang.credits,
+             gang.reputation, json.dumps(gang.territories), position, version),
+        )
+        conn.executemany(
+            "INSERT INTO fighters VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [
+                (gang.gang_id, f.ganger_id, pos, f.name, f.type, f.status,
+                 json.dumps(f.model_dump(exclude={"equipment"})))
+                for pos, f in enumerate(gang.gangers)
+            ],
+        )
+        owned = [(f.ganger_id, f.equipment) for f in gang.gangers] + [(None, gang.stash)]
+        conn.executemany(
+            "INSERT INTO equipment (gang_id, ganger_id, position, equipment_id, name, qty, cost, traits) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            [
+                (gang.gang_id, ganger_id, pos, eq.equipment_id, eq.name, eq.qty, eq.cost, eq.traits)
+                for ganger_id, items in owned
+                for pos, eq in enumerate(items)
+            ],
+        )
+
+    def save_equipment_library(self, items):
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM equipment WHERE gang_id IS NULL")
+            conn.executemany(
+                "INSERT INTO equipment (gang_id, ganger_id, position, equipment_id, name, qty, cost, traits) "
+                "VALUES (NULL, NULL, ?, ?, ?, ?, ?, ?)",
+                [(pos, eq.equipment_id, eq.name, eq.qty, eq.cost, eq.traits) for pos, eq in enumerate(items)],
+            )
+
+class _SQLiteRoster:
+    """Roster loader for a header-only gang held in an SQLiteStore"""
+    def __init__(self, store, gang_id):
+        self.store = store
+        self.gang_id = gang_id
+
+    def __call__(self):
+        return self.store.load_roster(self.gang_id)
+
+_sqlite_store = SQLiteStore(SQLITE_DB_FILE) if STORAGE_BACKEND == "sqlite" else None
+
+def _load_equipment_files():
+    library = []
+    for file_name in sorted(os.listdir(EQUIPMENT_DIR)):
+        if file_name.endswith(".json"):
+            try:
+                with open(os.path.join(EQUIPMENT_DIR, file_name), "r") as f:
+                    library.append(Equipment(**json.load(f)))
+            except (OSError, ValueError, ValidationError) as e:
+                print(f"Skipping equipment file {file_name}: {e}")
+    return library
+
+def migrate_to_sqlite(db_path=SQLITE_DB_FILE):
+    """
+    Imports the file store (campaign_data.json or the indexed entity files plus journal)
+    and any other entity files found under data/ into an SQLite database.
+    Returns the number of gangs, territories, battles and library equipment items imported.
+    """
+    loaded = _load_files()
+    for kind, (directory, key_attr, model) in ENTITY_STORES.items():
+        for file_name in sorted(os.listdir(directory)):
+            if not file_name.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(directory, file_name), "r") as f:
+                    obj = model(**json.load(f))
+            except (OSError, ValueError, ValidationError) as e:
+                print(f"Skipping {kind} file {file_name}: {e}")
+                continue
+            loaded[kind].setdefault(getattr(obj, key_attr), obj)
+    library = _load_equipment_files()
+    store = SQLiteStore(db_path)
+    store.write([
+        Change("put", kind, key, entity, 1, True)
+        for kind in ENTITY_STORES
+        for key, entity in loaded[kind].items()
+    ])
+    store.save_equipment_library(library)
+    with store._transaction() as conn:
+        conn.execute("INSERT OR REPLACE INTO meta VALUES ('schema', ?)", (SCHEMA_VERSION,))
+    return tuple(len(loaded[kind]) for kind in ("gangs", "territories", "battles")) + (len(library),)
+
+# -------------------- Load / Save API --------------------
+
+def data_version():
+    """
+    Cheap fingerprint (mtime + size of the backing files) that changes whenever a save lands.
+    Caches keyed on it reload exactly when the data changes, whichever session saved.
+    """
+    if _sqlite_store is not None:
+        paths = [SQLITE_DB_FILE, f"{SQLITE_DB_FILE}-wal"]
     else:
-        return [], [], []
+        paths = [INDEX_FILE, _journal.journal_path, _journal.compacting_path, DATA_FILE]
+    version = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+            version.append((stat.st_mtime_ns, stat.st_size))
+        except FileNotFoundError:
+            version.append(None)
+    return tuple(version)
 
-def save_data(gangs: List[Gang], territories: List[Territory], battles: List[LocalBattle]):
-    data = {
-        "gangs": [g.dict() for g in gangs],
-        "territories": [t.dict() for t in territories],
-        "battles": [b.dict() for b in battles]
-    }
-    with open(DATA_FILE, "w") as f:
-        json.dump(data, f, indent=4)
+def read_data():
+    """Uncached load from the configured backend; most callers want load_data()."""
+    if _sqlite_store is not None:
+        return _sqlite_store.load()
+    loaded = _load_files()
+    return (
+        list(loaded["gangs"].values()),
+        list(loaded["territories"].values()),
+        list(loaded["battles"].values()),
+    )
+
+@st.cache_data(max_entries=4)
+def _load_data(version):  # noqa: ARG001
+    # `version` is only the cache key; see data_version()
+    return read_data()
+
+def load_data():
+    return _load_data(data_version())
+
+def load_equipment_library() -> List[Equipment]:
+    """The saved equipment library: the SQLite library rows, or the files in data/equipment."""
+    if _sqlite_store is not None:
+        return _sqlite_store.load_equipment_library()
+    return _load_equipment_files()
+
+def _snapshot_data():
+    """(gangs, territories, battles) of the shared snapshot every session reads from."""
+    from campaign_store import get_shared_snapshot  # campaign_store imports this module
+    collections = get_shared_snapshot().collections
+    return tuple(list(collections[kind][1].values()) for kind in ("gangs", "territories", "battles"))
+
+# Dashboard totals and the battle fact table, updated by every commit (see CampaignMetrics, BattleFacts)
+campaign_metrics = CampaignMetrics(
+    _snapshot_data, {kind: store[1] for kind, store in ENTITY_STORES.items()}, make_traits=TraitIndex,
+)
+battle_facts = BattleFacts(lambda: _snapshot_data()[2])
+
+# Listeners told about every durable commit batch; see add_commit_listener()
+_commit_listeners = []
+# data_version() just before and after the last batch write (writer thread only)
+_write_versions = [None, None]
+
+def add_commit_listener(listener):
+    """
+    Registers listener(changes, before, after), called on the writer thread after each
+    durable batch with data_version() from just before and just after its write.
+    """
+    _commit_listeners.append(listener)
+
+def _tracked_write(write):
+    def write_batch(changes):
+        before = data_version()
+        write(changes)
+        _write_versions[:] = [before, data_version()]
+    return write_batch
+
+def _committed(changes):
+    campaign_metrics.apply(changes)
+    battle_facts.apply(changes)
+    before, after = _write_versions
+    for listener in _commit_listeners:
+        listener(changes, before, after)
+
+def invalidate_aggregates():
+    """Drops the commit-maintained aggregates after a write the commit queue didn't see."""
+    campaign_metrics.invalidate()
+    battle_facts.invalidate()
+
+# Every save in the process goes through this single writer thread
+if _sqlite_store is not None:
+    _writer = CommitWriter(_sqlite_store.load_versions, _tracked_write(_sqlite_store.write), on_commit=_committed)
+else:
+    _writer = CommitWriter(_load_file_versions, _tracked_write(_write_files), on_commit=_committed)
+
+def _check_savable(entity):
+    """Raises ValueError for a gang whose roster couldn't be loaded, rather than storing it empty."""
+    error = getattr(entity, "roster_error", None)
+    if error:
+        raise ValueError(f"Gang {entity.gang_name} was not saved: its roster could not be loaded ({error})")
+
+def save_data(gangs: Optional[List[Gang]], territories: Optional[List[Territory]], battles: Optional[List[LocalBattle]]):
+    """
+    Persists the entities that changed since they were loaded or last saved, and removes
+    ones dropped from the collections, through the single-writer commit queue.
+    Pass None for a collection to leave it untouched. Returns the commit version.
+
+    Raises ConflictError if another session saved one of the changed entities first;
+    session overlays then discard their copies so the next rerun shows the newer data.
+    """
+    puts, live_keys, base_versions = [], {}, []
+    collections = {"gangs": gangs, "territories": territories, "battles": battles}
+    for kind, entities in collections.items():
+        if entities is None:
+            continue
+        key_attr = ENTITY_STORES[kind][1]
+        live_keys[kind] = set()
+        for entity in entities:
+            key = getattr(entity, key_attr)
+            live_keys[kind].add(key)
+            if entity.is_dirty():
+                _check_savable(entity)
+                puts.append((kind, key, entity, entity.stored_version))
+        base_versions.append(getattr(entities, "base_version", None))
+    base_version = None if None in base_versions or not base_versions else min(base_versions)
+
+    try:
+        version = _writer.commit(CommitRequest(puts, live_keys, base_version))
+    except ConflictError as e:
+        for kind, key in e.conflicts:
+            discard = getattr(collections[kind], "discard", None)
+            if discard is not None:
+                discard(key)
+        raise
+    for _, _, entity, _ in puts:
+        entity.mark_clean()
+        entity._version = version
     
-    # Create backup after saving
+    # Schedule a backup after saving; it is coalesced and runs off the request path
     if 'backup_manager' in st.session_state:
-        st.session_state.backup_manager.create_backup()
-
+        st.session_state.backup_manager.schedule_backup()
+    return version
 
+def restore_entity(kind: str, data: dict, collection):
+    """
+    Puts a backed-up gang, territory or battle back into `collection`, replacing the
+    current one with the same key, and saves it like any other edit. The data is
+    fully validated. Returns the commit version.
+    """
+    _, key_attr, model = ENTITY_STORES[kind]
+    restored = model(**data)
+    key = getattr(restored, key_attr)
+    for position, entity in enumerate(collection):
+        if getattr(entity, key_attr) == key:
+            # Overwrites the version this session has seen; a newer save elsewhere still conflicts
+            restored._version = entity.stored_version
+            collection[position] = restored
+            break
+    else:
+        collection.append(restored)
+    collections = dict.fromkeys(ENTITY_STORES)
+    collections[kind] = collection
+    return save_data(collections["gangs"], collections["territories"], collections["battles"])
 
 # Save a single gang
 def save_gang(gang):
-    """Saves a gang as a separate JSON file."""
-    file_path = os.path.join(GANGS_DIR, f"{gang.gang_id}.json")
-    with open(file_path, "w") as f:
-        json.dump(gang.dict(), f, indent=4)
+    """Saves a gang as a separate JSON file, records it in the manifest and returns its file name."""
+    return _save_entity("gangs", gang.gang_id, gang)
 
 # Save a single territory
 def save_territory(territory):
-    """Saves a territory as a separate JSON file."""
-    file_path = os.path.join(TERRITORIES_DIR, f"{territory.name}.json")
-    with open(file_path, "w") as f:
-        json.dump(territory.dict(), f, indent=4)
+    """Saves a territory as a separate JSON file, records it in the manifest and returns its file name."""
+    return _save_entity("territories", territory.name, territory)
 
 # Save a single battle
 def save_battle(battle):
-    """Saves a battle as a separate JSON file."""
-    file_path = os.path.join(BATTLES_DIR, f"{battle.battle_id}.json")
-    with open(file_path, "w") as f:
-        json.dump(battle.dict(), f, indent=4)
+    """Saves a battle as a separate JSON file, records it in the manifest and returns its file name."""
+    return _save_entity("battles", battle.battle_id, battle)
 
 # Save a single equipment item
 def save_equipment(equipment):
-    """Saves an equipment item as a separate JSON file."""
-    file_path = os.path.join(EQUIPMENT_DIR, f"{equipment.equipment_id}.json")
-    with open(file_path, "w") as f:
-        json.dump(equipment.dict(), f, indent=4)
+    """Saves an equipment item as a separate JSON file, records it in the manifest and returns its file name."""
+    return _save_entity("equipment", equipment.equipment_id, equipment)
+
+def _save_entity(kind, key, entity):
+    _check_savable(entity)
+    entry = write_entity_file(kind, key, entity.model_dump())
+    update_manifest(kind, {key: entry})
+    invalidate_aggregates()  # Not seen by the commit queue
+    return entry["file"]
 # -------------------- Utility Functions --------------------
 
 
@@ -377,17 +1758,109 @@ def get_gang_id(gang):
         return new_id
 
 
-def assign_territory(territory_name: str, gang_name: str, gangs: List[Gang], territories: List[Territory]):
-    for territory in territories:
-        if territory.name == territory_name:
-            territory.controlled_by = gang_name
-            break
-    for gang in gangs:
-        if gang.gang_name == gang_name:
-            if territory_name not in gang.territories:
-                gang.territories.append(territory_name)
-            break
-    save_data(gangs, territories, [])
+def checkout(collection, entity):
+    """
+    Returns `entity` in a form that is safe to modify in place. Session overlays
+    (see campaign_store) hand out a private copy of a shared snapshot entity;
+    plain lists return the entity itself.
+    """
+    edit = getattr(collection, "edit", None)
+    return edit(entity) if edit is not None else entity
+
+def upsert(collection, entity, key_attr):
+    """
+    Replaces the entity in `collection` that has the same key, or appends it. Returns True
+    if it replaced one. Session overlays do this by key; plain lists are scanned.
+    """
+    put = getattr(collection, "put", None)
+    if put is not None:
+        return put(entity)
+    key = getattr(entity, key_attr)
+    for position, existing in enumerate(collection):
+        if getattr(existing, key_attr) == key:
+            collection[position] = entity
+            return True
+    collection.append(entity)
+    return False
+
+class TerritoryControl:
+    """
+    Territory control in both directions: territory name -> controlling gang name, and
+    gang name -> the territories it controls, in territory order. Territory.controlled_by
+    is the source of truth. assign() changes it and the Gang.territories lists of the old
+    and new controller together. Gang.territories entries that aren't Territory entities
+    (e.g. a gang's enclave) are left alone.
+    """
+    def __init__(self, territories=()):
+        self._controller = {}
+        self._holdings = defaultdict(dict)  # gang name -> {territory name: None}, as an ordered set
+        for territory in territories:
+            self.put(territory)
+
+    def put(self, territory):
+        """Indexes a territory as it currently stands."""
+        self.drop(territory.name)
+        if territory.controlled_by:
+            self._controller[territory.name] = territory.controlled_by
+            self._holdings[territory.controlled_by][territory.name] = None
+
+    def drop(self, territory_name):
+        gang_name = self._controller.pop(territory_name, None)
+        if gang_name is not None:
+            self._holdings[gang_name].pop(territory_name, None)
+
+    def controller(self, territory_name) -> Optional[str]:
+        return self._controller.get(territory_name)
+
+    def territories_of(self, gang_name) -> List[str]:
+        return list(self._holdings.get(gang_name, ()))
+
+    def controlled_count(self) -> int:
+        return len(self._controller)
+
+    def assign(self, territory, gang_name, gangs, territories, index=None):
+        """
+        Hands `territory` to gang_name (None releases it), updating the territory, the
+        previous and new controller's Gang.territories and this index together. Returns
+        the session's copy of the territory; the caller saves.
+        """
+        previous = territory.controlled_by
+        territory = checkout(territories, territory)
+        territory.controlled_by = gang_name
+        for name, keep in ((previous, False), (gang_name, True)):
+            gang = _find_gang(name, gangs, index) if name else None
+            if gang is None or (territory.name in gang.territories) == keep:
+                continue
+            gang = checkout(gangs, gang)
+            if keep:
+                gang.territories.append(territory.name)
+            else:
+                gang.territories.remove(territory.name)
+            mark_dirty(gang)
+        self.put(territory)
+        return territory
+
+def _find_gang(gang_name, gangs, index=None):
+    if index is not None:
+        return index.gang_named(gang_name)
+    return next((g for g in gangs if g.gang_name == gang_name), None)
+
+def assign_territory(territory_name: str, gang_name: str, gangs: List[Gang], territories: List[Territory], index=None):
+    """
+    Gives a territory to a gang and saves both. `index` (a campaign_store.CampaignIndex,
+    defaulting to the one session overlays carry) finds them without scanning and
+    supplies the session's TerritoryControl.
+    """
+    index = index or getattr(gangs, "index", None)
+    if index is not None:
+        territory, control = index.territory(territory_name), index.control
+    else:
+        territory = next((t for t in territories if t.name == territory_name), None)
+        control = TerritoryControl(territories)
+    if territory is not None:
+        control.assign(territory, gang_name, gangs, territories, index)
+    save_data(gangs, territories, None)
+
 
 def to_gang_obj(g):
     if isinstance(g, dict):
@@ -0,0 +1,192 @@
+import hashlib
+import json
+import os
+import threading
+from collections import defaultdict
+
+from pydantic_core import core_schema
+
+from journal import fsync_directory
+
+
+class CatalogItem:
+    """
+    One distinct piece of equipment (name, cost and traits). Items are interned: the
+    catalog hands out a single shared instance per distinct item, and its id is derived
+    from its content, so the same item gets the same id in every process and session.
+    """
+    __slots__ = ("catalog_id", "name", "cost", "traits")
+
+    def __init__(self, catalog_id, name, cost, traits):
+        object.__setattr__(self, "catalog_id", catalog_id)
+        object.__setattr__(self, "name", name)
+        object.__setattr__(self, "cost", cost)
+        object.__setattr__(self, "traits", traits)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Catalog items are immutable; intern a new item instead")
+
+    @classmethod
+    def __get_pydantic_core_schema__(cls, source, handler):
+        # Held in a model field as the shared instance, serialized as its id
+        serialize = core_schema.plain_serializer_function_ser_schema(
+            lambda item: item.catalog_id
+        )
+        return core_schema.no_info_plain_validator_function(
+            _validate_item, serialization=serialize
+        )
+
+    def __reduce__(self):
+        # Unpickled items (e.g. from worker processes) are interned into the receiving
+        # catalog
+        return _unpickle_item, (self.name, self.cost, self.traits)
+
+    def as_dict(self):
+        return {
+            "catalog_id": self.catalog_id,
+            "name": self.name,
+            "cost": self.cost,
+            "traits": self.traits,
+        }
+
+    def __repr__(self):
+        return (
+            f"CatalogItem({self.catalog_id}, {self.name!r}, "
+            f"cost={self.cost}, traits={self.traits!r})"
+        )
+
+class CatalogError(RuntimeError):
+    """
+    The catalog file is missing or unreadable while stored data references it. Not a
+    ValueError, so loaders that skip invalid files fail instead of dropping (and on the
+    next save, deleting) every gang that carries equipment.
+    """
+
+def catalog_id_for(name, cost, traits):
+    """Stable id of an item: a short hash of its content."""
+    raw = json.dumps([name, cost, traits], separators=(",", ":")).encode("utf-8")
+    return hashlib.blake2b(raw, digest_size=8).hexdigest()
+
+class EquipmentCatalog:
+    """
+    Interned equipment items, persisted as one JSON file (data/catalog.json) mapping
+    catalog id -> item. Fighters and stashes reference items by id. The catalog only
+    grows, so references in older files and backups always resolve.
+    """
+    def __init__(self, catalog_dir="data"):
+        self.catalog_path = os.path.join(catalog_dir, "catalog.json")
+        self._items = {}
+        self._by_name = defaultdict(set)
+        self._loaded = False
+        self._unsaved = False
+        self._lock = threading.RLock()
+
+    def intern(self, name, cost=0, traits=""):
+        """
+        Returns the shared item for this content, adding it to the catalog if it is
+        new.
+        """
+        catalog_id = catalog_id_for(name, cost, traits)
+        item = self._items.get(catalog_id)
+        if item is not None:
+            return item
+        with self._lock:
+            self._ensure_loaded()
+            item = self._items.get(catalog_id)
+            if item is None:
+                item = self._add(CatalogItem(catalog_id, name, cost, traits))
+                self._unsaved = True
+            return item
+
+    def get(self, catalog_id):
+        """
+        Returns the item with this id. Raises KeyError for ids the catalog doesn't know,
+        or CatalogError if there is no catalog file to look them up in.
+        """
+        item = self._items.get(catalog_id)
+        if item is None:
+            with self._lock:
+                self._ensure_loaded()
+                item = self._items.get(catalog_id)
+                if item is None and not os.path.exists(self.catalog_path):
+                    raise CatalogError(
+                        f"{self.catalog_path} is missing, so equipment "
+                        f"{catalog_id!r} can't be resolved; restore it from a backup"
+                    )
+                if item is None:
+                    raise KeyError(catalog_id)
+        return item
+
+    def find(self, name):
+        """Items with this name (case-insensitive); one per distinct cost/traits."""
+        with self._lock:
+            self._ensure_loaded()
+            return [self._items[i] for i in self._by_name.get(name.strip().lower(), ())]
+
+    def items(self):
+        with self._lock:
+            self._ensure_loaded()
+            return list(self._items.values())
+
+    def __len__(self):
+        with self._lock:
+            self._ensure_loaded()
+            return len(self._items)
+
+    def save(self):
+        """
+        Writes the catalog if items were added since it was last saved. Called before
+        any data referencing them is written.
+        """
+        if not self._unsaved:
+            return
+        with self._lock:
+            # Merge in items another process may have added meanwhile
+            self._loaded = False
+            self._ensure_loaded()
+            data = {item.catalog_id: item.as_dict() for item in self._items.values()}
+            tmp_path = f"{self.catalog_path}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(data, f, indent=4)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.catalog_path)
+            fsync_directory(os.path.dirname(self.catalog_path) or ".")
+            self._unsaved = False
+
+    def _ensure_loaded(self):
+        if self._loaded:
+            return
+        if os.path.exists(self.catalog_path):
+            try:
+                with open(self.catalog_path, "r") as f:
+                    stored = json.load(f)
+            except (OSError, ValueError) as e:
+                raise CatalogError(
+                    f"Error reading equipment catalog {self.catalog_path}: {e}"
+                ) from e
+            for catalog_id, item in stored.items():
+                if catalog_id not in self._items:
+                    name, cost, traits = item["name"], item["cost"], item["traits"]
+                    self._add(CatalogItem(catalog_id, name, cost, traits))
+        self._loaded = True
+
+    def _add(self, item):
+        self._items[item.catalog_id] = item
+        self._by_name[item.name.strip().lower()].add(item.catalog_id)
+        return item
+
+# The process-wide catalog every Equipment reference resolves against
+catalog = EquipmentCatalog()
+
+def _validate_item(value):
+    if isinstance(value, CatalogItem):
+        return value
+    try:
+        return catalog.get(value)
+    except (KeyError, TypeError):
+        raise ValueError(f"Unknown equipment catalog id: {value!r}") from None
+
+def _unpickle_item(name, cost, traits):
+    # The id is derived from the content, so interning recovers the same one
+    return catalog.intern(name, cost, traits)
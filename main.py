@@ -47,8 +47,9 @@ from common import (
     DATA_FILE, FULL_CAMPAIGN_DATA_FILE,
     Equipment, GangFighter, Gang, Territory, LocalBattle,
     Member, CampaignGang, CampaignTerritory, BattleGang, Battle, Campaign,
-    load_data, save_data, assign_territory, to_gang_obj, load_full_campaign
+    load_data, save_data, assign_territory, to_gang_obj, load_full_campaign, load_equipment_library
 )
+from campaign_store import sync_session_campaign
 
 # Set page config **before anything else**
 st.set_page_config(
@@ -98,13 +99,8 @@ hidden_pages = {
 # all_pages.update(hidden_pages)
 
 
-# # Create navigation using the grouped dictionary.
-nav = st.navigation(all_pages)
-nav.run()
-
-
-
 # -------------------- Session State Initialization --------------------
+# Runs before the page so every page sees this session's campaign view.
 from backup_manager import BackupManager
 
 # Initialize backup manager
@@ -114,24 +110,35 @@ if 'backup_manager' not in st.session_state:
 if "gangs" not in st.session_state:
     log_info("Initializing session state with game data")
     try:
-        log_debug("Loading data from storage")
-        gangs, territories, battles = load_data()
-        st.session_state.gangs = gangs
-        log_debug(f"Loaded {len(gangs)} gangs")
-        st.session_state.territories = territories
-        log_debug(f"Loaded {len(territories)} territories")
-        st.session_state.battles = battles
-        log_debug(f"Loaded {len(battles)} battles")
+        log_debug("Attaching session to the shared campaign snapshot")
+        sync_session_campaign()
+        log_debug(f"Loaded {len(st.session_state.gangs)} gangs")
+        log_debug(f"Loaded {len(st.session_state.territories)} territories")
+        log_debug(f"Loaded {len(st.session_state.battles)} battles")
         
-        log_info("Creating backup")
-        st.session_state.backup_manager.create_backup()
-        log_info("Initial data load and backup completed successfully")
+        log_info("Scheduling backup")
+        st.session_state.backup_manager.schedule_backup()
+        log_info("Initial data load completed successfully")
     except Exception as e:
         log_error("Failed to initialize session state", exc_info=True)
         raise
+else:
+    # Pick up saves from other sessions, keeping this session's unsaved edits
+    sync_session_campaign()
 
 if "equipment_list" not in st.session_state:
-    st.session_state.equipment_list = []
+    st.session_state.equipment_list = load_equipment_library()
+
+# Left by campaign_store.report_conflict() when a save lost to another session's
+if "save_conflict" in st.session_state:
+    st.warning(st.session_state.pop("save_conflict"))
+
+# # Create navigation using the grouped dictionary.
+nav = st.navigation(all_pages)
+nav.run()
+
+
+
 
 # # Define pages in the 'views/' directory
 # home_page = st.Page("views/Home.py", title="Home", icon="🏠")
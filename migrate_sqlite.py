@@ -0,0 +1,8 @@
+from common import SQLITE_DB_FILE, migrate_to_sqlite
+
+# Imports campaign_data.json and the data/ directories into the SQLite backend.
+# Run once, then start the app with NECROMUNDA_STORAGE=sqlite.
+if __name__ == '__main__':
+    gangs, territories, battles, equipment = migrate_to_sqlite()
+    print(f"Imported {gangs} gangs, {territories} territories, {battles} battles "
+          f"and {equipment} equipment items into {SQLITE_DB_FILE}")
@@ -0,0 +1,25 @@
+import os
+
+import pytest
+import streamlit as st
+
+import campaign_store
+import common
+
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    """
+    Runs the test in an empty working directory with a fresh data/ tree. The store uses
+    paths relative to the working directory, so every test gets its own campaign.
+    """
+    monkeypatch.chdir(tmp_path)
+    for directory in common.MANIFEST_DIRS.values():
+        os.makedirs(directory, exist_ok=True)
+    # The writer reloads stored versions on its next batch; cached reads start over
+    common._writer._versions = None
+    common.invalidate_aggregates()
+    st.cache_data.clear()
+    st.cache_resource.clear()
+    campaign_store._snapshot = None
+    return tmp_path / "data"
@@ -0,0 +1,32 @@
+from common import Gang, GangFighter, LocalBattle, Territory
+
+FIGHTER_DEFAULTS = {
+    "type": "Champion",
+    "m": 5, "ws": 3, "bs": 4, "s": 3, "t": 3, "w": 2, "i": 3, "a": 2,
+    "ld": 7, "cl": 6, "wil": 7, "intelligence": 7,
+    "cost": 120, "xp": 0, "kills": 0, "advance_count": 0,
+    "skills": ["Nerves of Steel"], "injuries": [],
+    "status": "Alive", "notes": "",
+    "datetime_added": "2025-01-01 12:00:00",
+    "datetime_updated": "2025-01-01 12:00:00",
+}
+LASGUN = {"name": "Lasgun", "qty": 1, "cost": 15, "traits": "Rapid Fire (1)"}
+
+def make_fighter(name="Xavier", **fields):
+    values = {**FIGHTER_DEFAULTS, "equipment": [LASGUN], "name": name}
+    return GangFighter(**{**values, **fields})
+
+def make_gang(name="Blood Brothers", fighters=None, **fields):
+    values = {"gang_type": "Goliath", "credits": 100, "reputation": 5, **fields}
+    gang = Gang(gang_name=name, **values)
+    gang.gangers = fighters if fighters is not None else [make_fighter()]
+    return gang
+
+def make_territory(name="Black Market", **fields):
+    return Territory(name=name, type="Income", **fields)
+
+def make_battle(winner="Blood Brothers", loser="Iron Fists", **fields):
+    return LocalBattle(
+        battle_created_datetime="2025-01-02T20:00:00", battle_scenario="Ambush",
+        winner_gang=winner, participating_gangs=[winner, loser], **fields,
+    )
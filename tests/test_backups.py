@@ -0,0 +1,72 @@
+import pytest
+from factories import make_battle, make_fighter, make_gang, make_territory
+
+import common
+from backup_manager import BackupManager
+
+
+@pytest.fixture
+def manager(data_dir):
+    return BackupManager(str(data_dir.parent / "backups"))
+
+@pytest.fixture
+def campaign(data_dir):
+    gang = make_gang(fighters=[make_fighter("Xavier"), make_fighter("Yuri")])
+    territory = make_territory()
+    common.save_data([gang], [territory], [])
+    common.compact_journal()
+    assert (data_dir / "gangs" / f"{gang.gang_id}.json").exists()
+    return gang, territory
+
+def _backup(manager):
+    assert manager.create_backup("data")
+    return manager.list_backups(manifests_only=True)[-1]
+
+def _edit_campaign(gang):
+    gang.gangers[0].xp = 12
+    gang.gangers = gang.gangers + [make_fighter("Zeke")]
+    common.save_data([gang], [], [make_battle()])
+
+def test_diff_against_live_data_includes_journaled_saves(manager, campaign):
+    gang, territory = campaign
+    name = _backup(manager)
+    _edit_campaign(gang)
+
+    diff = manager.diff(name)
+
+    assert diff["gangs"] == {"added": [], "changed": [gang.gang_id], "removed": []}
+    assert diff["territories"]["removed"] == [territory.name]
+    assert diff["battles"]["added"] == [b.battle_id for b in common.read_data()[2]]
+    fighters = diff["fighters"]
+    assert fighters["changed"] == [(gang.gang_id, gang.gangers[0].ganger_id, "Xavier")]
+    assert fighters["added"] == [(gang.gang_id, gang.gangers[2].ganger_id, "Zeke")]
+    assert fighters["removed"] == []
+
+def test_diff_between_backups(manager, campaign):
+    gang, _ = campaign
+    old = _backup(manager)
+    _edit_campaign(gang)
+    common.compact_journal()
+    new = _backup(manager)
+
+    assert old != new
+    diff = manager.diff(old, new)
+    assert diff["gangs"]["changed"] == [gang.gang_id]
+    assert [change[2] for change in diff["fighters"]["added"]] == ["Zeke"]
+    assert manager.diff(new)["gangs"]["changed"] == []
+
+def test_restore_entity_brings_back_the_backed_up_gang(manager, campaign):
+    gang, _ = campaign
+    original = gang.model_dump()
+    name = _backup(manager)
+    _edit_campaign(gang)
+
+    data = manager.read_entity(name, "gangs", gang.gang_id)
+    assert data == original
+    gangs = common.read_data()[0]
+    common.restore_entity("gangs", data, gangs)
+
+    (restored,) = common.read_data()[0]
+    assert restored.model_dump() == original
+    assert manager.diff(name)["gangs"]["changed"] == []
+    assert manager.read_entity(name, "battles", "missing") is None
@@ -0,0 +1,50 @@
+import pytest
+from factories import make_gang, make_territory
+
+import common
+from bulk_io import load_directory, save_directory
+from campaign_store import EntityOverlay, get_shared_snapshot
+from commit_queue import ConflictError
+
+pytestmark = pytest.mark.usefixtures("data_dir")
+
+def _overlay(kind):
+    snapshot = get_shared_snapshot()
+    base_keys, base_by_key = snapshot.collections[kind]
+    key_attr = common.ENTITY_STORES[kind][1]
+    overlay = EntityOverlay(base_keys, base_by_key, key_attr, snapshot.commit_version)
+    overlay.kind = kind
+    return overlay
+
+def test_save_directory_commits_changes_and_removals():
+    kept, dropped = make_gang(), make_gang("Iron Fists")
+    common.save_data([kept, dropped], [make_territory()], [])
+    gangs = _overlay("gangs")
+
+    gangs.edit(gangs[0]).credits = 300
+    del gangs[1]
+    assert save_directory("gangs", gangs, "gang_id") == 1
+
+    assert {g.gang_id: g.credits for g in common.read_data()[0]} == {kept.gang_id: 300}
+    assert [t.name for t in common.read_data()[1]] == ["Black Market"]
+
+def test_save_directory_detects_conflicts():
+    common.save_data([make_gang()], [], [])
+    first, second = _overlay("gangs"), _overlay("gangs")
+    first.edit(first[0]).credits = 300
+    save_directory("gangs", first, "gang_id")
+
+    second.edit(second[0]).credits = 50
+    with pytest.raises(ConflictError):
+        save_directory("gangs", second, "gang_id")
+    assert [g.credits for g in common.read_data()[0]] == [300]
+
+def test_load_directory_returns_the_compacted_entities():
+    gang = make_gang()
+    version = common.save_data([gang], [], [])
+
+    (loaded,), errors = load_directory("gangs", common.Gang)
+
+    assert errors == []
+    assert loaded.model_dump() == gang.model_dump()
+    assert loaded.stored_version == version and not loaded.is_dirty()
@@ -0,0 +1,25 @@
+import pytest
+from factories import make_fighter, make_gang
+
+import common
+
+pytestmark = pytest.mark.usefixtures("data_dir")
+
+def test_injured_fighters_counts_the_injured_status():
+    gang = make_gang(fighters=[
+        make_fighter("Xavier", status="Injured"),
+        make_fighter("Yuri", status="Alive", injuries=["Hobbled"]),
+        make_fighter("Zeke", status="Not Injured"),
+    ])
+    common.save_data([gang], [], [])
+    metrics = common.campaign_metrics.ensure_built()
+    assert (metrics.total_fighters, metrics.injured_fighters) == (3, 1)
+
+    gang.gangers[0].status = "Alive"
+    gang.gangers[2].status = "Injured"
+    gang.gangers = gang.gangers + [make_fighter("Vorn", status="Injured")]
+    common.save_data([gang], [], [])
+    assert (metrics.total_fighters, metrics.injured_fighters) == (4, 2)
+
+    common.campaign_metrics.invalidate()
+    assert common.campaign_metrics.ensure_built().injured_fighters == 2
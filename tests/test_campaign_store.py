@@ -0,0 +1,50 @@
+import pytest
+from factories import make_gang, make_territory
+
+import campaign_store
+import common
+from campaign_store import EntityOverlay, get_shared_snapshot, shared_cache_key
+
+pytestmark = pytest.mark.usefixtures("data_dir")
+
+def _overlay(kind):
+    snapshot = get_shared_snapshot()
+    base_keys, base_by_key = snapshot.collections[kind]
+    key_attr = common.ENTITY_STORES[kind][1]
+    overlay = EntityOverlay(base_keys, base_by_key, key_attr, snapshot.commit_version)
+    overlay.kind = kind
+    return overlay
+
+def test_shared_cache_key_only_for_unchanged_overlays():
+    common.save_data([make_gang(), make_gang("Iron Fists")], [make_territory()], [])
+    gangs, territories = _overlay("gangs"), _overlay("territories")
+    assert shared_cache_key(gangs, territories) == common.data_version()
+
+    gangs.edit(gangs[0]).credits = 5
+    assert shared_cache_key(gangs, territories) is None
+    assert shared_cache_key(territories) == common.data_version()
+
+    del territories[0]
+    assert shared_cache_key(territories) is None
+    assert shared_cache_key(list(_overlay("gangs"))) is None
+
+def test_commits_advance_the_shared_snapshot_in_memory(monkeypatch):
+    gang, territory = make_gang(), make_territory()
+    common.save_data([gang], [territory], [])
+    before = get_shared_snapshot()
+    gangs = _overlay("gangs")
+
+    def reload():
+        raise AssertionError("the snapshot was reloaded")
+    monkeypatch.setattr(campaign_store, "read_data", reload)
+    gangs.edit(gangs[0]).credits = 300
+    common.save_data(gangs, None, None)
+    after = get_shared_snapshot()
+
+    assert after is not before and after.version == common.data_version()
+    (stored,) = after.entities("gangs")
+    assert stored.credits == 300 and stored is not gangs[0]
+    assert stored.stored_version == after.commit_version > before.commit_version
+    assert after.index.gang_named(gang.gang_name) is stored
+    assert after.collections["territories"] is before.collections["territories"]
+    assert before.entities("gangs")[0].credits == gang.credits
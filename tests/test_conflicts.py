@@ -0,0 +1,78 @@
+import pytest
+from factories import make_gang, make_territory
+
+import common
+from campaign_store import EntityOverlay, get_shared_snapshot
+from commit_queue import CommitRequest, CommitWriter, ConflictError
+
+
+@pytest.fixture
+def writer():
+    written = []
+    writer = CommitWriter(lambda: (0, {}), written.extend)
+    writer.written = written
+    return writer
+
+def _save(writer, puts, base_version=0, live_keys=None):
+    return writer.commit(CommitRequest(puts, live_keys or {}, base_version), timeout=5)
+
+def test_stale_put_raises_conflict(writer):
+    assert _save(writer, [("gangs", "g1", "first", 0)]) == 1
+    assert _save(writer, [("gangs", "g1", "second", 1)], base_version=1) == 2
+
+    puts = [("gangs", "g1", "stale", 1), ("gangs", "g2", "new", 0)]
+    with pytest.raises(ConflictError) as error:
+        _save(writer, puts, base_version=1)
+    assert error.value.conflicts == [("gangs", "g1")]
+    assert [change.entity for change in writer.written] == ["first", "second"]
+    assert writer.version == 2
+
+def test_unchecked_saves_overwrite(writer):
+    _save(writer, [("territories", "Slag Furnace", "first", 0)])
+    puts = [("territories", "Slag Furnace", "second", 0)]
+    assert _save(writer, puts, base_version=None) == 2
+
+def test_removals_only_cover_entities_the_session_saw(writer):
+    _save(writer, [("gangs", "g1", "first", 0)])
+    _save(writer, [("gangs", "g2", "added elsewhere", 0)])
+
+    _save(writer, [], base_version=1, live_keys={"gangs": set()})
+    deletes = [(c.op, c.key) for c in writer.written if c.op == "delete"]
+    assert deletes == [("delete", "g1")]
+
+def _overlay(kind):
+    snapshot = get_shared_snapshot()
+    base_keys, base_by_key = snapshot.collections[kind]
+    key_attr = common.ENTITY_STORES[kind][1]
+    overlay = EntityOverlay(base_keys, base_by_key, key_attr, snapshot.commit_version)
+    overlay.kind = kind
+    return overlay
+
+@pytest.mark.usefixtures("data_dir")
+def test_second_session_saving_the_same_gang_conflicts():
+    gang = make_gang()
+    common.save_data([gang], [make_territory()], [])
+    first, second = _overlay("gangs"), _overlay("gangs")
+
+    first.edit(first[0]).credits = 300
+    common.save_data(first, None, None)
+    second.edit(second[0]).credits = 50
+    with pytest.raises(ConflictError) as error:
+        common.save_data(second, None, None)
+
+    assert error.value.conflicts == [("gangs", gang.gang_id)]
+    # The losing session's copy is dropped, so it falls back to its snapshot
+    assert second.session_entities() == []
+    assert [g.credits for g in common.read_data()[0]] == [300]
+
+@pytest.mark.usefixtures("data_dir")
+def test_different_entities_save_without_conflict():
+    common.save_data([make_gang(), make_gang("Iron Fists")], [], [])
+    first, second = _overlay("gangs"), _overlay("gangs")
+
+    first.edit(first[0]).credits = 300
+    common.save_data(first, None, None)
+    second.edit(second[1]).credits = 50
+    common.save_data(second, None, None)
+
+    assert [g.credits for g in common.read_data()[0]] == [300, 50]
@@ -0,0 +1,100 @@
+import json
+
+import pytest
+from factories import make_battle, make_fighter, make_gang, make_territory
+
+import common
+from common import Equipment
+
+pytestmark = pytest.mark.usefixtures("data_dir")
+
+def _by_key(entities, key_attr):
+    return {getattr(entity, key_attr): entity.model_dump() for entity in entities}
+
+def test_save_then_read_round_trips_every_collection():
+    roster = [make_fighter("Brakk"), make_fighter("Vorn", status="Dead")]
+    gangs = [make_gang(), make_gang("Iron Fists", roster)]
+    territories = [make_territory(), make_territory("Slag Furnace")]
+    battles = [make_battle()]
+
+    version = common.save_data(gangs, territories, battles)
+
+    assert version > 0
+    assert not any(entity.is_dirty() for entity in gangs + territories + battles)
+    loaded_gangs, loaded_territories, loaded_battles = common.read_data()
+    assert _by_key(loaded_gangs, "gang_id") == _by_key(gangs, "gang_id")
+    assert _by_key(loaded_territories, "name") == _by_key(territories, "name")
+    assert _by_key(loaded_battles, "battle_id") == _by_key(battles, "battle_id")
+    assert all(gang.stored_version == version for gang in loaded_gangs)
+
+def test_compacted_gangs_load_header_only_and_hydrate(data_dir):
+    roster = [make_fighter("Xavier"), make_fighter("Yuri", injuries=["Hobbled"])]
+    gang = make_gang(fighters=roster)
+    gang.stash = [Equipment(name="Frag grenade", qty=3, cost=30, traits="Blast (3\")")]
+    common.save_data([gang], [], [])
+    common.compact_journal()
+
+    assert (data_dir / f"gangs/{gang.gang_id}.json").exists()
+    (loaded,), _, _ = common.read_data()
+    assert not loaded.is_hydrated
+    assert loaded.fighter_count == 2
+    assert loaded.stash_items == 3
+    assert list(loaded.stat_totals) == list(common.stat_matrix(roster).sum(axis=0))
+    assert not loaded.is_hydrated
+    assert loaded.model_dump() == gang.model_dump()
+    assert loaded.is_hydrated and not loaded.is_dirty()
+
+def test_dropped_entities_are_deleted(data_dir):
+    kept, dropped = make_gang(), make_gang("Iron Fists")
+    common.save_data([kept, dropped], [], [])
+    common.compact_journal()
+
+    common.save_data([kept], None, None)
+    assert [gang.gang_id for gang in common.read_data()[0]] == [kept.gang_id]
+    common.compact_journal()
+    assert not (data_dir / f"gangs/{dropped.gang_id}.json").exists()
+    assert [gang.gang_id for gang in common.read_data()[0]] == [kept.gang_id]
+
+def test_edits_after_compaction_replay_from_the_journal():
+    gang = make_gang()
+    common.save_data([gang], [], [])
+    common.compact_journal()
+
+    gang.credits = 250
+    gang.gangers[0].xp = 6
+    version = common.save_data([gang], None, None)
+
+    (loaded,), _, _ = common.read_data()
+    assert loaded.credits == 250
+    assert loaded.gangers[0].xp == 6
+    assert loaded.stored_version == version
+
+def _write_legacy_campaign(gangs, territories, battles):
+    data = {
+        "gangs": [g.model_dump() for g in gangs],
+        "territories": [t.model_dump() for t in territories],
+        "battles": [b.model_dump() for b in battles],
+    }
+    with open(common.DATA_FILE, "w") as f:
+        json.dump(data, f)
+
+def _counts():
+    return tuple(len(collection) for collection in common.read_data())
+
+def test_partial_save_of_a_legacy_campaign_keeps_the_other_collections(data_dir):
+    gangs = [make_gang(), make_gang("Iron Fists")]
+    territories = [make_territory(), make_territory("Slag Furnace")]
+    _write_legacy_campaign(gangs, territories, [make_battle()])
+    loaded_gangs = common.read_data()[0]
+
+    # Fighter Management saves only the gangs
+    loaded_gangs[0].credits = 300
+    common.save_data(loaded_gangs, None, None)
+    assert _counts() == (2, 2, 1)
+
+    common.compact_journal()
+    assert (data_dir / "territories" / "Slag Furnace.json").exists()
+    assert _counts() == (2, 2, 1)
+    assert {g.gang_name: g.credits for g in common.read_data()[0]} == {
+        "Blood Brothers": 300, "Iron Fists": 100,
+    }
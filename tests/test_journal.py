@@ -0,0 +1,104 @@
+import json
+
+import pytest
+from factories import make_gang
+
+import common
+from commit_queue import Change
+from journal import MutationJournal
+
+
+def _put(key, version, **data):
+    return MutationJournal.record("gang_updated", "put", "gangs", key, version, data, 1)
+
+def _delete(key, version):
+    return MutationJournal.record("gang_disbanded", "delete", "gangs", key, version)
+
+@pytest.fixture
+def journal(tmp_path):
+    folded = []
+    # A threshold no test reaches, so compaction only runs when a test asks for it
+    journal = MutationJournal(str(tmp_path), folded.append, compact_threshold=1 << 30)
+    journal.folded = folded
+    return journal
+
+def test_records_replay_in_append_order(journal):
+    journal.append([_put("a", 1, credits=10), _put("b", 1)])
+    journal.append([_put("a", 2, credits=20), _delete("b", 3)])
+
+    records = list(journal.records())
+    assert [(r["op"], r["key"], r["version"]) for r in records] == [
+        ("put", "a", 1), ("put", "b", 1), ("put", "a", 2), ("delete", "b", 3),
+    ]
+    assert records[2]["data"] == {"credits": 20}
+
+def test_torn_final_line_is_skipped(journal):
+    journal.append([_put("a", 1)])
+    with open(journal.journal_path, "a") as f:
+        f.write(json.dumps(_put("b", 2))[:25])
+
+    assert [r["key"] for r in journal.records()] == ["a"]
+
+def test_compact_folds_the_latest_record_per_key(journal):
+    journal.append([_put("a", 1, credits=10), _put("b", 1)])
+    journal.append([_put("a", 2, credits=20), _delete("b", 3)])
+
+    journal.compact()
+
+    (folded,) = journal.folded
+    latest = {(r["key"], r["op"], r["version"]) for r in folded}
+    assert latest == {("a", "put", 2), ("b", "delete", 3)}
+    assert list(journal.records()) == []
+    assert journal.size() == 0
+
+def test_interrupted_compaction_is_replayed_and_finished(journal):
+    journal.append([_put("a", 1)])
+
+    def crash(_records):
+        raise RuntimeError("crashed while folding")
+
+    # A crash after the rotation leaves the records in the compacting file
+    journal.apply_fn = crash
+    with pytest.raises(RuntimeError):
+        journal.compact()
+    journal.append([_put("b", 2)])
+
+    assert [r["key"] for r in journal.records()] == ["a", "b"]
+
+    journal.apply_fn = journal.folded.append
+    journal.compact()
+    assert [[r["key"] for r in batch] for batch in journal.folded] == [["a"]]
+    assert [r["key"] for r in journal.records()] == ["b"]
+
+def test_file_store_replays_uncompacted_saves(data_dir):
+    gang = make_gang()
+    common.save_data([gang], [], [])
+    common.compact_journal()
+    gang.credits = 75
+    common.save_data([gang], None, None)
+    dropped = make_gang("Iron Fists")
+    common.save_data([gang, dropped], None, None)
+    common.save_data([gang], None, None)
+
+    assert not (data_dir / f"gangs/{dropped.gang_id}.json").exists()
+    assert common._journal.size() > 0
+    assert {g.gang_id: g.credits for g in common.read_data()[0]} == {gang.gang_id: 75}
+
+    common.compact_journal()
+    assert common._journal.size() == 0
+    with open(data_dir / f"gangs/{gang.gang_id}.json") as f:
+        assert json.load(f)["credits"] == 75
+    assert {g.gang_id: g.credits for g in common.read_data()[0]} == {gang.gang_id: 75}
+
+@pytest.mark.usefixtures("data_dir")
+def test_saves_keep_the_entries_compaction_recorded():
+    gang = make_gang()
+    common.save_data([gang], [], [])
+    common.compact_journal()
+    compacted = common.load_manifest()["gangs"][gang.gang_id]
+
+    # A save that still sees the gang as new (its versions predate the compaction)
+    common._write_files([Change("put", "gangs", gang.gang_id, gang, 5, True)])
+
+    entry = common.load_manifest()["gangs"][gang.gang_id]
+    assert entry == {**compacted, "version": 5}
@@ -0,0 +1,102 @@
+import pytest
+from factories import make_battle, make_fighter, make_gang, make_territory
+
+import common
+from commit_queue import Change
+from common import Equipment, SQLiteStore
+
+
+@pytest.fixture
+def store(data_dir):
+    return SQLiteStore(str(data_dir / "campaign.db"))
+
+def _put(kind, key, entity, version, is_new=True):
+    return Change("put", kind, key, entity, version, is_new)
+
+def test_write_then_load_round_trips_every_collection(store):
+    stash = [Equipment(name="Frag grenade", qty=3, cost=30, traits="Blast (3\")")]
+    roster = [make_fighter("Brakk"), make_fighter("Vorn", injuries=["Hobbled"])]
+    gang = make_gang(fighters=roster)
+    gang.stash = stash
+    territory = make_territory(controlled_by=gang.gang_name, x=1.5, y=2.0)
+    battle = make_battle()
+    store.write([
+        _put("gangs", gang.gang_id, gang, 1),
+        _put("territories", territory.name, territory, 2),
+        _put("battles", battle.battle_id, battle, 2),
+    ])
+
+    (loaded,), territories, battles = store.load()
+    assert not loaded.is_hydrated
+    assert loaded.fighter_count == 2
+    assert loaded.stash_items == 3
+    assert list(loaded.stat_totals) == list(common.stat_matrix(roster).sum(axis=0))
+    carried = stash + gang.gangers[0].equipment
+    assert set(loaded.catalog_ids) == {eq.catalog_id for eq in carried}
+    assert loaded.model_dump() == gang.model_dump()
+    assert loaded.stored_version == 1 and not loaded.is_dirty()
+    assert [t.model_dump() for t in territories] == [territory.model_dump()]
+    assert [b.model_dump() for b in battles] == [battle.model_dump()]
+    assert store.load_versions() == (2, {
+        "gangs": {gang.gang_id: 1},
+        "territories": {territory.name: 2},
+        "battles": {battle.battle_id: 2},
+    })
+
+def test_updates_keep_order_and_deletes_cascade(store):
+    first, second = make_gang(), make_gang("Iron Fists")
+    store.write([_put("gangs", g.gang_id, g, 1) for g in (first, second)])
+
+    first.credits = 400
+    first.gangers = [make_fighter("Replacement")]
+    store.write([_put("gangs", first.gang_id, first, 2, is_new=False)])
+    gangs = store.load()[0]
+    assert [g.gang_id for g in gangs] == [first.gang_id, second.gang_id]
+    assert gangs[0].credits == 400
+    assert [f.name for f in gangs[0].gangers] == ["Replacement"]
+
+    store.write([Change("delete", "gangs", first.gang_id, None, 3, False)])
+    assert [g.gang_id for g in store.load()[0]] == [second.gang_id]
+    assert store.load_roster(first.gang_id)[:2] == ([], [])
+
+def test_equipment_library_round_trips(store):
+    library = [
+        Equipment(name="Lasgun", qty=1, cost=15, traits="Rapid Fire (1)"),
+        Equipment(name="Stub gun", qty=2, cost=5, traits="Plentiful"),
+    ]
+    store.save_equipment_library(library)
+    loaded = store.load_equipment_library()
+    assert [eq.model_dump() for eq in loaded] == [eq.model_dump() for eq in library]
+
+def test_migrate_to_sqlite_imports_the_file_store(data_dir):
+    gangs = [make_gang(), make_gang("Iron Fists")]
+    territories, battles = [make_territory()], [make_battle()]
+    common.save_data(gangs, territories, battles)
+    db_path = str(data_dir / "campaign.db")
+
+    assert common.migrate_to_sqlite(db_path) == (2, 1, 1, 0)
+    loaded_gangs, loaded_territories, loaded_battles = SQLiteStore(db_path).load()
+    assert [g.model_dump() for g in loaded_gangs] == [g.model_dump() for g in gangs]
+    assert [t.name for t in loaded_territories] == [territories[0].name]
+    assert [b.battle_id for b in loaded_battles] == [battles[0].battle_id]
+
+def test_schema_1_equipment_ids_migrate_to_catalog_ids(store):
+    gang = make_gang()
+    gang.stash = [Equipment(name="Frag grenade", qty=3, cost=30, traits="Blast (3\")")]
+    store.write([_put("gangs", gang.gang_id, gang, 1)])
+    # Schema 1 gave every equipment row its own uuid
+    with store._transaction() as conn:
+        conn.execute("UPDATE equipment SET equipment_id = lower(hex(randomblob(16)))")
+        conn.execute("UPDATE meta SET value = 1 WHERE key = 'schema'")
+
+    migrated = SQLiteStore(store.db_path)
+
+    with migrated._transaction() as conn:
+        assert migrated._trusted(conn)
+        rows = conn.execute("SELECT equipment_id FROM equipment").fetchall()
+    stored_ids = {row[0] for row in rows}
+    carried = gang.stash + gang.gangers[0].equipment
+    assert stored_ids == {eq.catalog_id for eq in carried}
+    (loaded,), _, _ = migrated.load()
+    assert set(loaded.catalog_ids) == stored_ids
+    assert loaded.model_dump() == gang.model_dump()
@@ -0,0 +1,149 @@
+import json
+import os
+import threading
+from array import array
+
+from pydantic import ValidationError
+from pydantic_core import core_schema
+
+# Every registry by kind, so pickled TraitSets can find theirs again
+_registries = {}
+
+class TraitSet:
+    """
+    Immutable, ordered ids of a fighter's skills or injuries in one registry. Ids are
+    only meaningful inside this process; a TraitSet is stored and pickled as names.
+    """
+    __slots__ = ("registry", "ids")
+
+    def __init__(self, registry, ids=()):
+        self.registry = registry
+        self.ids = array("I", ids)  # "H" would overflow past 65535 distinct names
+
+    @classmethod
+    def __get_pydantic_core_schema__(cls, source, handler):
+        # Built by GangFighter from names; serialized back to names
+        serialize = core_schema.plain_serializer_function_ser_schema(
+            lambda traits: traits.names()
+        )
+        return core_schema.is_instance_schema(cls, serialization=serialize)
+
+    def names(self):
+        return self.registry.names(self.ids)
+
+    def __contains__(self, name):
+        trait_id = self.registry.lookup(name)
+        return trait_id is not None and trait_id in self.ids
+
+    def __iter__(self):
+        return iter(self.ids)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __eq__(self, other):
+        return (
+            isinstance(other, TraitSet)
+            and self.registry is other.registry
+            and self.ids == other.ids
+        )
+
+    def __hash__(self):
+        return hash((self.registry.kind, self.ids.tobytes()))
+
+    def __reduce__(self):
+        return _unpickle_trait_set, (self.registry.kind, self.names())
+
+    def __repr__(self):
+        return f"TraitSet({self.registry.kind}, {self.names()})"
+
+class TraitRegistry:
+    """
+    Definitions (Skill or Injury models) of the traits fighters carry, each given a
+    small integer id the first time its name is seen. Names not defined anywhere get a
+    default definition from make_default(name). Definitions edited with define() are
+    kept in data/<kind>.json, keyed by name.
+    """
+    def __init__(self, kind, model, make_default, registry_dir="data"):
+        self.kind = kind
+        self.model = model
+        self.make_default = make_default
+        self.registry_path = os.path.join(registry_dir, f"{kind}.json")
+        self._definitions = []  # id -> definition
+        self._ids = {}  # name -> id
+        self._stored = None
+        self._lock = threading.RLock()
+        _registries[kind] = self
+
+    def id_for(self, name):
+        """Id of a trait name, registering it if it is new."""
+        trait_id = self._ids.get(name)
+        if trait_id is not None:
+            return trait_id
+        with self._lock:
+            if name not in self._ids:
+                self._ids[name] = len(self._definitions)
+                self._definitions.append(self._definition(name))
+            return self._ids[name]
+
+    def lookup(self, name):
+        """Id of a registered name, or None. Never registers anything."""
+        return self._ids.get(name)
+
+    def trait_set(self, names):
+        if isinstance(names, str) or not all(isinstance(name, str) for name in names):
+            raise ValueError(f"{self.kind} must be a list of names")
+        return TraitSet(self, [self.id_for(name) for name in names])
+
+    def names(self, ids):
+        return [self._definitions[i].name for i in ids]
+
+    def get(self, trait_id):
+        return self._definitions[trait_id]
+
+    def ids_where(self, predicate):
+        """Ids of every registered definition matching predicate(definition)."""
+        definitions = enumerate(self._definitions)
+        return [i for i, definition in definitions if predicate(definition)]
+
+    def definitions(self):
+        return list(self._definitions)
+
+    def define(self, definition):
+        """Adds or replaces the definition for definition.name and saves it."""
+        with self._lock:
+            # Re-read so definitions saved by other processes are kept
+            self._stored = None
+            stored = dict(self._load_stored())
+            stored[definition.name] = definition.model_dump(mode="json")
+            tmp_path = f"{self.registry_path}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(stored, f, indent=4)
+            os.replace(tmp_path, self.registry_path)
+            self._stored = stored
+            trait_id = self.id_for(definition.name)
+            self._definitions[trait_id] = definition
+            return trait_id
+
+    def _definition(self, name):
+        stored = self._load_stored().get(name)
+        if stored is not None:
+            try:
+                return self.model(**stored)
+            except ValidationError as e:
+                print(f"Invalid {self.kind} definition for '{name}': {e}")
+        return self.make_default(name)
+
+    def _load_stored(self):
+        if self._stored is None:
+            self._stored = {}
+            if os.path.exists(self.registry_path):
+                try:
+                    with open(self.registry_path, "r") as f:
+                        self._stored = json.load(f)
+                except (OSError, ValueError) as e:
+                    print(f"Error reading {self.kind} definitions: {e}")
+        return self._stored
+
+def _unpickle_trait_set(kind, names):
+    return _registries[kind].trait_set(names)
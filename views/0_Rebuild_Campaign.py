@@ -1,8 +1,9 @@
 import streamlit as st
-import os
-import json
 from pathlib import Path
-from common import Gang, Territory, LocalBattle, Equipment  # Import models
+from common import ConflictError, Gang, Territory, LocalBattle, Equipment, restore_entity  # Import models
+from bulk_io import load_directory, save_directory
+from campaign_store import report_conflict, sync_session_campaign
+from utils.logger import log_info, log_error, log_debug
 
 # Define data directories
 DATA_DIR = Path("data")
@@ -20,52 +21,69 @@ for directory in [GANGS_DIR, TERRITORIES_DIR, BATTLES_DIR, EQUIPMENT_DIR]:
     directory.mkdir(parents=True, exist_ok=True)
 
 # -------------------- Loading Functions --------------------
-def load_json_files(directory, model_class):
-    objects = []
-    for file_path in directory.glob("*.json"):
-        try:
-            data = json.loads(file_path.read_text())
-            objects.append(model_class(**data))
-        except Exception as e:
-            st.error(f"⚠️ Error loading {file_path.name}: {e}")
-    return objects
+def load_json_files(kind, model_class):
+    # Reads in parallel; files unchanged since the app wrote them skip validation (see bulk_io)
+    progress = st.progress(0.0, text=f"Loading {kind}...")
+    objects, errors = load_directory(
+        kind, model_class,
+        progress=lambda done, total: progress.progress(done / total, text=f"Loading {kind}: {done // 2}/{total // 2}"),
+    )
+    progress.empty()
+    for file_name, error in errors:
+        st.error(f"⚠️ Error loading {file_name}: {error}")
+    return objects, {file_name for file_name, _ in errors}
+
+def rebuild_collection(kind, model_class, key_attr):
+    """
+    Reloads a shared collection from its files into a fresh session overlay, so later
+    saves are still checked for conflicts. Only entities whose files differ from what
+    the app stored go into the overlay (dirty, so the next save records them); entities
+    whose files were deleted are dropped. Files that failed to load are left alone.
+    """
+    objects, failed = load_json_files(kind, model_class)
+    st.session_state.pop(kind, None)
+    sync_session_campaign()
+    overlay = st.session_state[kind]
+    loaded = {getattr(entity, key_attr) for entity in objects}
+    for entity in objects:
+        if entity.is_dirty():
+            overlay.put(entity)
+    for position in reversed(range(len(overlay))):
+        key = getattr(overlay[position], key_attr)
+        if key not in loaded and f"{key}.json" not in failed:
+            del overlay[position]
+    return overlay
 
 # -------------------- Saving Functions --------------------
 def save_all_data():
-    # Save gangs individually
-    for gang in st.session_state.gangs:
-        file_path = GANGS_DIR / f"{gang.gang_id}.json"
-        with open(file_path, "w") as f:
-            json.dump(gang.dict(), f, indent=4)
-    # Save territories individually
-    for territory in st.session_state.territories:
-        # Here, using territory name as filename; ensure names are unique or consider adding an ID.
-        file_path = TERRITORIES_DIR / f"{territory.name}.json"
-        with open(file_path, "w") as f:
-            json.dump(territory.dict(), f, indent=4)
-    # Save battles individually
-    for battle in st.session_state.battles:
-        file_path = BATTLES_DIR / f"{battle.battle_id}.json"
-        with open(file_path, "w") as f:
-            json.dump(battle.dict(), f, indent=4)
-    # Save equipment individually
-    for eq in st.session_state.equipment_list:
-        file_path = EQUIPMENT_DIR / f"{eq.equipment_id}.json"
-        with open(file_path, "w") as f:
-            json.dump(eq.dict(), f, indent=4)
+    # Gangs, territories and battles are committed like any other save (one request per
+    # collection); equipment files are written in parallel, skipping unchanged ones.
+    # Territories use their name as the file name; ensure names are unique.
+    collections = [
+        ("gangs", st.session_state.gangs, "gang_id"),
+        ("territories", st.session_state.territories, "name"),
+        ("battles", st.session_state.battles, "battle_id"),
+        ("equipment", st.session_state.equipment_list, "equipment_id"),
+    ]
+    written = 0
+    for kind, entities, key_attr in collections:
+        progress = st.progress(0.0, text=f"Saving {kind}...")
+        written += save_directory(
+            kind, entities, key_attr,
+            progress=lambda done, total, bar=progress, kind=kind: bar.progress(done / total, text=f"Saving {kind}: {done}/{total}"),
+        )
+        progress.empty()
+    return written
 
 # -------------------- Buttons --------------------
 # Button to reload campaign data from JSON files into session state
 if st.button("🔄 Rebuild Campaign Data"):
     log_info("Starting campaign data rebuild")
     try:
-        st.session_state.gangs = load_json_files(GANGS_DIR, Gang)
-        log_debug(f"Loaded {len(st.session_state.gangs)} gangs")
-        st.session_state.territories = load_json_files(TERRITORIES_DIR, Territory)
-        log_debug(f"Loaded {len(st.session_state.territories)} territories")
-        st.session_state.battles = load_json_files(BATTLES_DIR, LocalBattle)
-        log_debug(f"Loaded {len(st.session_state.battles)} battles")
-        st.session_state.equipment_list = load_json_files(EQUIPMENT_DIR, Equipment)
+        log_debug(f"Loaded {len(rebuild_collection('gangs', Gang, 'gang_id'))} gangs")
+        log_debug(f"Loaded {len(rebuild_collection('territories', Territory, 'name'))} territories")
+        log_debug(f"Loaded {len(rebuild_collection('battles', LocalBattle, 'battle_id'))} battles")
+        st.session_state.equipment_list = load_json_files("equipment", Equipment)[0]
         log_debug(f"Loaded {len(st.session_state.equipment_list)} equipment items")
         log_info("Campaign data rebuild completed successfully")
         st.success("✅ Campaign data successfully reloaded!")
@@ -75,8 +93,56 @@ if st.button("🔄 Rebuild Campaign Data"):
 
 # Button to save current session data into the respective JSON files
 if st.button("💾 Save Campaign Data"):
-    save_all_data()
-    st.success("✅ Campaign data successfully saved!")
+    try:
+        written = save_all_data()
+        st.success(f"✅ Campaign data successfully saved! ({written} changed entities written)")
+    except ConflictError as e:
+        report_conflict(e)
+
+# -------------------- Backups: Diff & Selective Restore --------------------
+st.markdown("---")
+st.write("### 🕓 Backups")
+
+backup_manager = st.session_state.get("backup_manager")
+backups = backup_manager.list_backups(manifests_only=True) if backup_manager else []
+if not backups:
+    st.info("No backups available yet.")
+else:
+    backup_name = st.selectbox("Backup", list(reversed(backups)))
+    compare_with = st.selectbox("Compare with", ["Live data"] + [b for b in reversed(backups) if b != backup_name])
+    if st.button("🔍 Show Changes"):
+        st.session_state.backup_diff = (
+            backup_name, compare_with,
+            backup_manager.diff(backup_name, None if compare_with == "Live data" else compare_with),
+        )
+
+    if st.session_state.get("backup_diff") and st.session_state.backup_diff[:2] == (backup_name, compare_with):
+        diff = st.session_state.backup_diff[2]
+        for kind in ("gangs", "fighters", "territories", "battles", "equipment"):
+            changes = diff[kind]
+            counts = ", ".join(f"{len(changes[c])} {c}" for c in ("added", "changed", "removed"))
+            with st.expander(f"{kind.title()}: {counts}"):
+                for change in ("added", "changed", "removed"):
+                    for item in changes[change]:
+                        label = f"{item[2]} (gang {item[0]})" if kind == "fighters" else item
+                        st.write(f"{change}: {label}")
+
+        # Anything that differs and existed in the selected backup can be rolled back on its own
+        restorable = {
+            kind: diff[kind]["changed"] + diff[kind]["removed"]
+            for kind in ("gangs", "territories", "battles")
+        }
+        restore_kind = st.selectbox("Restore a", [k for k, keys in restorable.items() if keys] or ["gangs"])
+        restore_key = st.selectbox("Entity", restorable.get(restore_kind, []))
+        if restore_key and compare_with == "Live data" and st.button(f"⏪ Restore from {backup_name}"):
+            data = backup_manager.read_entity(backup_name, restore_kind, restore_key)
+            try:
+                restore_entity(restore_kind, data, st.session_state[restore_kind])
+                st.session_state.pop("backup_diff", None)
+                st.success(f"✅ Restored {restore_key} from {backup_name}")
+            except Exception as e:
+                log_error(f"Failed to restore {restore_kind} {restore_key}", exc_info=True)
+                st.error(f"Failed to restore {restore_key}: {e}")
 
 # -------------------- Display Campaign Statistics --------------------
 st.markdown("---")
@@ -3,7 +3,8 @@ import folium
 from folium.raster_layers import ImageOverlay
 from streamlit_folium import st_folium
 import random
-from common import Territory, save_data
+from common import ConflictError, Territory, checkout, assign_territory
+from campaign_store import get_campaign_index, report_conflict
 
 # --------------------- Helper Function ---------------------
 def assign_coordinates_if_missing(
@@ -31,15 +32,16 @@ if "territories" not in st.session_state:
 # For demonstration, if no territories exist, create some sample territories.
 # Coordinates here are in the 0..4096 range (x,y).
 if not st.session_state.territories:
-    st.session_state.territories = [
+    st.session_state.territories.extend([
         Territory(name="Psi-Syndica Sector", type="Trading Post", controlled_by="Genestealer Cult", x=1000, y=3000),
         Territory(name="Raucous Raccoon Saloon", type="Mineral Deposits", controlled_by="House Goliath", x=2500, y=3500),
         Territory(name="Trade Nexus", type="Archaeotech Site", controlled_by="House Escher")  # Missing coordinates intentionally.
-    ]
+    ])
 
 # Ensure every territory has valid coordinates within 4096x4096.
 for t in st.session_state.territories:
-    t = assign_coordinates_if_missing(t)
+    if t.x is None or t.y is None:
+        assign_coordinates_if_missing(checkout(st.session_state.territories, t))
 
 # --------------------- Static Base Image & Bounds ---------------------
 # Path to your static grid image (4096x4096).
@@ -127,12 +129,16 @@ if st.button("Add Territory"):
         new_territory = Territory(
             name=territory_name_input,
             type=territory_type_input,
-            controlled_by=new_controlled_by,
             x=new_x,
             y=new_y
         )
         st.session_state.territories.append(new_territory)
-        save_data(st.session_state.gangs, st.session_state.territories, st.session_state.battles)
+        # Sets controlled_by and, when it names a gang, that gang's territory list, then saves
+        try:
+            assign_territory(territory_name_input, new_controlled_by, st.session_state.gangs,
+                             st.session_state.territories, get_campaign_index())
+        except ConflictError as e:
+            report_conflict(e)
         st.experimental_rerun()
     else:
         st.error("Please enter both the territory name and the controlling faction.")
@@ -162,15 +168,11 @@ if unassigned_territories and gang_names:
     gang_to_assign = st.selectbox("Select Gang", gang_names, key="assign_gang")
 
     if st.button("Assign Territory"):
-        for territory in st.session_state.territories:
-            if territory.name == territory_to_assign:
-                territory.controlled_by = gang_to_assign
-                break
-        for gang in st.session_state.gangs:
-            if gang.gang_name == gang_to_assign and territory_to_assign not in gang.territories:
-                gang.territories.append(territory_to_assign)
-                break
-        save_data(st.session_state.gangs, st.session_state.territories, st.session_state.battles)
+        try:
+            assign_territory(territory_to_assign, gang_to_assign, st.session_state.gangs,
+                             st.session_state.territories, get_campaign_index())
+        except ConflictError as e:
+            report_conflict(e)
         st.success(f"Assigned {territory_to_assign} to {gang_to_assign}")
 else:
     st.info("Ensure unassigned territories and registered gangs exist.")
@@ -2,7 +2,11 @@ import streamlit as st
 from datetime import datetime
 import pandas as pd
 import plotly.express as px
-from common import Gang, load_data, Territory, LocalBattle  # Import required models
+from common import Gang, data_version, campaign_metrics, battle_facts  # Import required models
+from campaign_store import get_shared_snapshot
+
+BATTLE_PAGE_SIZE = 20
+FORM_WINDOW = 5  # Battles in a gang's rolling form
 
 def to_gang_obj(g):
     """Convert a gang entry to a Gang model instance with error handling"""
@@ -14,124 +18,136 @@ def to_gang_obj(g):
             return None
     return g
 
-@st.cache_data(ttl=300)  # Cache dashboard data for 5 minutes
-def process_dashboard_data():
-    gangs, territories, battles = load_data()
-    gang_objects = [g for g in (to_gang_obj(g) for g in gangs) if g is not None]
-    return gangs, territories, battles, gang_objects
+def _figure_spec(fig):
+    """Plain-dict form of a figure, which st.plotly_chart renders without rebuilding it through plotly.express."""
+    return fig.to_dict()
+
+@st.cache_data(max_entries=4)  # Recomputed only when the stored data changes
+def build_dashboard(_snapshot, version):  # noqa: ARG001 (version is the cache key)
+    """
+    The dashboard's single data stage: the DataFrames and chart specs built from the
+    shared snapshot, once per data version. Widget interactions (e.g. the battle
+    filters) rerun the page but reuse all of it; the entities themselves are read from
+    the snapshot rather than cached here.
+    """
+    gang_objects = [g for g in (to_gang_obj(g) for g in _snapshot.entities("gangs")) if g is not None]
+    battles = _snapshot.entities("battles")
+    win_rates = battle_facts.win_rates()
+
+    stages = {
+        "reputation": (
+            lambda: pd.DataFrame([{"Gang": g.gang_name, "Reputation": g.reputation} for g in gang_objects]),
+            lambda df: px.bar(df, x="Gang", y="Reputation", title="Gang Reputation Rankings",
+                              color="Gang", height=300),
+        ),
+        "credits": (
+            lambda: pd.DataFrame([{"Gang": g.gang_name, "Credits": g.credits} for g in gang_objects]),
+            lambda df: px.pie(df, names="Gang", values="Credits",
+                              title="Credit Distribution Among Gangs", height=300),
+        ),
+        "battles": (
+            lambda: pd.DataFrame([
+                {
+                    "Date": datetime.fromisoformat(b.battle_created_datetime),
+                    "Winner": b.winner_gang,
+                    "Scenario": b.battle_scenario
+                }
+                for b in battles
+            ]),
+            lambda df: px.scatter(df, x="Date", y="Winner", color="Winner",
+                                  hover_data=["Scenario"],
+                                  title="Battle Outcomes Timeline", height=300),
+        ),
+        "win_rate": (
+            lambda: win_rates.reindex([g.gang_name for g in gang_objects], fill_value=0)
+                             .rename_axis("Gang").reset_index()
+                             .rename(columns={"win_rate": "Win Rate %", "battles": "Total Battles"}),
+            lambda df: px.bar(df, x="Gang", y="Win Rate %",
+                              hover_data=["Total Battles"],
+                              title="Gang Win Rates", height=300),
+        ),
+        "head_to_head": (
+            lambda: battle_facts.head_to_head(),
+            lambda df: px.imshow(df, text_auto=".0f", color_continuous_scale="RdYlGn",
+                                 labels={"x": "Opponent", "y": "Gang", "color": "Win Rate %"},
+                                 title="Head-to-Head Win Rates", height=400),
+        ),
+        "form": (
+            lambda: battle_facts.form(FORM_WINDOW).rename(columns={"gang": "Gang", "date": "Date", "form": "Form %"}),
+            lambda df: px.line(df, x="Date", y="Form %", color="Gang",
+                               title=f"Rolling Form (last {FORM_WINDOW} battles)", height=300),
+        ),
+        "scenario_records": (
+            lambda: battle_facts.scenario_records().rename(columns={
+                "gang": "Gang", "scenario": "Scenario", "battles": "Battles",
+                "wins": "Wins", "win_rate": "Win Rate %"}),
+            None,
+        ),
+    }
+    frames, figures, errors = {}, {}, {}
+    for name, (build_frame, build_chart) in stages.items():
+        try:
+            frames[name] = build_frame()
+            if build_chart is not None and not frames[name].empty:
+                figures[name] = _figure_spec(build_chart(frames[name]))
+        except Exception as e:
+            errors[name] = str(e)
+
+    battle_frame = frames.get("battles")
+    min_date = battle_frame["Date"].min().to_pydatetime() if battle_frame is not None and not battle_frame.empty else None
+    return {
+        "frames": frames,
+        "figures": figures,
+        "errors": errors,
+        "min_battle_date": min_date,
+    }
+
+def show_chart(dashboard, name, label):
+    if name in dashboard["figures"]:
+        st.plotly_chart(dashboard["figures"][name], use_container_width=True)
+    elif name in dashboard["errors"]:
+        st.error(f"Could not generate {label}: {dashboard['errors'][name]}")
 
 def show_dashboard():
     st.title("Campaign Dashboard")
 
-    # Load all data with caching
-    gangs, territories, battles, gang_objects = process_dashboard_data()
-    gang_objects = [g for g in (to_gang_obj(g) for g in gangs) if g is not None]
+    # Frames and chart specs for the current data version
+    snapshot = get_shared_snapshot()
+    dashboard = build_dashboard(snapshot, data_version())
+    territories = snapshot.entities("territories")
+    gang_objects = [g for g in (to_gang_obj(g) for g in snapshot.entities("gangs")) if g is not None]
+    # Campaign-wide totals, maintained as saves happen
+    metrics = campaign_metrics.ensure_built()
 
     # ---- Key Metrics ----
     st.subheader("Campaign Overview")
     col1, col2, col3, col4 = st.columns(4)
     with col1:
-        try:
-            total_fighters = sum(len(g.gangers) for g in gang_objects)
-            st.metric("Total Fighters", total_fighters)
-        except Exception as e:
-            st.error(f"Error calculating fighters: {e}")
+        st.metric("Total Fighters", metrics.total_fighters)
 
     with col2:
-        try:
-            avg_reputation = sum(g.reputation for g in gang_objects) / len(gang_objects) if gang_objects else 0
-            st.metric("Average Reputation", f"{avg_reputation:.1f}")
-        except Exception as e:
-            st.error(f"Error calculating reputation: {e}")
+        st.metric("Average Reputation", f"{metrics.average_reputation:.1f}")
 
     with col3:
-        try:
-            active_territories = len([t for t in territories if t.controlled_by])
-            st.metric("Controlled Territories", f"{active_territories}/{len(territories)}")
-        except Exception as e:
-            st.error(f"Error calculating territories: {e}")
+        st.metric("Controlled Territories", f"{metrics.controlled_territories}/{metrics.territory_count}")
 
     with col4:
-        try:
-            injured_fighters = sum(
-                len([f for f in g.gangers if "Injured" in f.status]) 
-                for g in gang_objects
-            )
-            st.metric("Injured Fighters", injured_fighters)
-        except Exception as e:
-            st.error(f"Error calculating injuries: {e}")
+        st.metric("Injured Fighters", metrics.injured_fighters)
 
     # ---- Visualizations ----
     st.subheader("Visual Analytics")
 
-    # Gang Reputation Chart
-    try:
-        rep_data = [{"Gang": g.gang_name, "Reputation": g.reputation} for g in gang_objects]
-        if rep_data:
-            df = pd.DataFrame(rep_data)
-            fig = px.bar(df, x="Gang", y="Reputation", title="Gang Reputation Rankings",
-                        color="Gang", height=300)
-            st.plotly_chart(fig, use_container_width=True)
-    except Exception as e:
-        st.error(f"Could not generate reputation chart: {e}")
-
-    # Credit Distribution Pie Chart
-    try:
-        credit_data = [{"Gang": g.gang_name, "Credits": g.credits} for g in gang_objects]
-        if credit_data:
-            df = pd.DataFrame(credit_data)
-            fig = px.pie(df, names="Gang", values="Credits", 
-                        title="Credit Distribution Among Gangs", height=300)
-            st.plotly_chart(fig, use_container_width=True)
-    except Exception as e:
-        st.error(f"Could not generate credit chart: {e}")
-
-    # Battle Outcomes Timeline
-    try:
-        battle_data = []
-        for b in battles:
-            battle_data.append({
-                "Date": datetime.fromisoformat(b.battle_created_datetime),
-                "Winner": b.winner_gang,
-                "Scenario": b.battle_scenario
-            })
-        if battle_data:
-            df = pd.DataFrame(battle_data)
-            fig = px.scatter(df, x="Date", y="Winner", color="Winner",
-                           hover_data=["Scenario"],
-                           title="Battle Outcomes Timeline", height=300)
-            st.plotly_chart(fig, use_container_width=True)
-    except Exception as e:
-        st.error(f"Could not generate battle timeline: {e}")
-
-    # Gang Win Rate
-    try:
-        win_counts = {}
-        participation_counts = {}
-        for b in battles:
-            win_counts[b.winner_gang] = win_counts.get(b.winner_gang, 0) + 1
-            for gang in b.participating_gangs:
-                participation_counts[gang] = participation_counts.get(gang, 0) + 1
-        
-        win_rate_data = []
-        for gang in gang_objects:
-            wins = win_counts.get(gang.gang_name, 0)
-            participations = participation_counts.get(gang.gang_name, 0)
-            win_rate = (wins / participations * 100) if participations > 0 else 0
-            win_rate_data.append({
-                "Gang": gang.gang_name,
-                "Win Rate %": win_rate,
-                "Total Battles": participations
-            })
-        
-        if win_rate_data:
-            df = pd.DataFrame(win_rate_data)
-            fig = px.bar(df, x="Gang", y="Win Rate %",
-                        hover_data=["Total Battles"],
-                        title="Gang Win Rates", height=300)
-            st.plotly_chart(fig, use_container_width=True)
-    except Exception as e:
-        st.error(f"Could not generate win rate chart: {e}")
+    show_chart(dashboard, "reputation", "reputation chart")
+    show_chart(dashboard, "credits", "credit chart")
+    show_chart(dashboard, "battles", "battle timeline")
+    show_chart(dashboard, "win_rate", "win rate chart")
+    show_chart(dashboard, "head_to_head", "head-to-head chart")
+    show_chart(dashboard, "form", "form chart")
+
+    records = dashboard["frames"].get("scenario_records")
+    if records is not None and not records.empty:
+        with st.expander("Scenario Records"):
+            st.dataframe(records, hide_index=True, use_container_width=True)
 
     # ---- Territory Control Section ----
     st.subheader("Territory Control")
@@ -139,7 +155,7 @@ def show_dashboard():
     # Territory Map (abstract or geolocated)
     if any(t.lat and t.lng for t in territories):
         try:
-            map_df = pd.DataFrame([t.dict() for t in territories])
+            map_df = pd.DataFrame([t.model_dump() for t in territories])
             st.map(map_df[["lat", "lng", "name", "controlled_by"]].dropna())
         except Exception as e:
             st.error(f"Could not render territory map: {e}")
@@ -158,30 +174,37 @@ def show_dashboard():
     # ---- Battle History ----
     st.subheader("Battle History")
 
+    battle_index = snapshot.battle_index
+
     # Battle filters
-    col_left, col_right = st.columns(2)
+    col_left, col_mid, col_right = st.columns(3)
     with col_left:
         filter_scenario = st.text_input("Filter by Scenario")
+    with col_mid:
+        filter_gang = st.selectbox("Filter by Gang", ["All Gangs"] + battle_index.gang_names)
     with col_right:
-        min_date = min((datetime.fromisoformat(b.battle_created_datetime) for b in battles), default=None)
+        min_date = dashboard["min_battle_date"]
         date_filter = st.date_input("Filter by Date", 
                                   min_value=min_date,
                                   max_value=datetime.now()) if min_date else None
 
-    # Filtered battles
-    filtered_battles = []
-    for b in battles:
-        battle_date = datetime.fromisoformat(b.battle_created_datetime).date()
-        matches_scenario = filter_scenario.lower() in b.battle_scenario.lower()
-        matches_date = not date_filter or battle_date == date_filter
-
-        if matches_scenario and matches_date:
-            filtered_battles.append(b)
+    # Filtered battles, read a page at a time from a keyset cursor
+    filters = (filter_scenario, date_filter, filter_gang)
+    if st.session_state.get("battle_log_filters") != filters:
+        st.session_state.battle_log_filters = filters
+        st.session_state.battle_log_cursor = None
+    matches = battle_index.filter(filter_scenario, date_filter,
+                                  None if filter_gang == "All Gangs" else filter_gang)
+    cursor = st.session_state.battle_log_cursor
+    page = battle_index.page(matches, BATTLE_PAGE_SIZE,
+                             after=cursor[1] if cursor and cursor[0] == "after" else None,
+                             before=cursor[1] if cursor and cursor[0] == "before" else None)
 
     # Battle list with details
-    if filtered_battles:
+    if page.battles:
         st.subheader("Battle Log")
-        for battle in filtered_battles:
+        st.caption(f"{page.total} matching battles")
+        for battle in page.battles:
             with st.container():
                 # Battle header
                 col1, col2 = st.columns([3, 1])
@@ -202,6 +225,17 @@ def show_dashboard():
                     st.markdown("**Credit Awards:**")
                     st.json(battle.credit_awards)
                 st.markdown("---")
+
+        # Page navigation
+        col_prev, col_next = st.columns(2)
+        with col_prev:
+            if st.button("← Earlier", disabled=page.before is None):
+                st.session_state.battle_log_cursor = ("before", page.before)
+                st.rerun()
+        with col_next:
+            if st.button("Later →", disabled=page.after is None):
+                st.session_state.battle_log_cursor = ("after", page.after)
+                st.rerun()
     else:
         st.info("No battles found matching filters")
 
@@ -216,15 +250,11 @@ def show_dashboard():
                 st.metric("Reputation", gang.reputation)
 
             with col2:
-                st.metric("Fighters", len(gang.gangers))
+                st.metric("Fighters", gang.fighter_count)
                 st.metric("Territories", len(gang.territories))
 
             with col3:
-                if gang.stash:
-                    equipment_count = sum(e.qty for e in gang.stash)
-                    st.metric("Equipment Items", equipment_count)
-                else:
-                    st.metric("Equipment Items", 0)
+                st.metric("Equipment Items", gang.stash_items)  # from the header; doesn't load the roster
 
             # Quick action buttons
             if st.button("View Details", key=f"view_{gang.gang_id}"):
@@ -1,58 +1,87 @@
 import streamlit as st
 from datetime import datetime
 from pydantic import ValidationError
-from common import Gang, GangFighter, save_data, load_data
+from common import ConflictError, Gang, save_data
+from campaign_store import get_campaign_index, report_conflict, sync_session_campaign
+
+GANGS_PER_PAGE = 20
+FIGHTERS_PER_PAGE = 10
+
+# st.fragment is st.experimental_fragment before Streamlit 1.37 (poetry.lock pins 1.36)
+fragment = getattr(st, "fragment", None) or st.experimental_fragment
 
 # Initialize session state if needed
-if 'gangs' not in st.session_state:
-    gangs, territories, battles = load_data()
-    st.session_state.gangs = gangs
-    st.session_state.territories = territories
-    st.session_state.battles = battles
+sync_session_campaign()
+
+# The selected fighter, as ids into the campaign index
+st.session_state.setdefault("detail_gang_id", None)
+st.session_state.setdefault("detail_ganger_id", None)
+
+def paginate(items, per_page, key):
+    """The current page of items, with a page picker when there is more than one page."""
+    pages = max(1, -(-len(items) // per_page))
+    if pages == 1:
+        return items
+    if st.session_state.get(key, 1) > pages:
+        st.session_state[key] = pages  # The list shrank since the page was picked
+    page = st.number_input(f"Page (of {pages})", min_value=1, max_value=pages, step=1, key=key)
+    return items[(page - 1) * per_page:page * per_page]
 
-# Ensure a container for selected fighter exists
-if "selected_fighter" not in st.session_state:
-    st.session_state.selected_fighter = None
+def select_fighter(gang_id, ganger_id):
+    st.session_state.detail_gang_id = gang_id
+    st.session_state.detail_ganger_id = ganger_id
 
 st.title("Gangs Management")
 
 col1, col2 = st.columns([2, 3])
 
+# Each panel is a fragment: paging the list, picking a fighter in the detail pane or
+# submitting the form reruns only that panel, not every gang on the page.
+
 ### Left Column: Gang & Fighter List
-with col1:
+@fragment
+def gang_list():
     st.header("Active Gangs & Fighters")
     if not st.session_state.gangs:
         st.info("No gangs registered yet.")
-    else:
-        for gang in st.session_state.gangs:
-            with st.expander(f"{gang.gang_name} ({gang.gang_type})"):
-                st.write(f"**Credits:** {gang.credits} | **Reputation:** {gang.reputation}")
-                st.write(f"**Territories:** {len(gang.territories)}")
-                st.write("**Fighters:**")
-                if gang.gangers:
-                    for fighter in gang.gangers:
-                        st.write(f"- {fighter.name} ({fighter.type})")
-                        if st.button(f"View {fighter.name} Details", key=f"view_{fighter.ganger_id}"):
-                            # Store both fighter and its gang in session state
-                            st.session_state.selected_fighter = {"fighter": fighter, "gang": gang}
-                            st.experimental_rerun()
-                else:
-                    st.info("No fighters found for this gang.")
-                st.markdown("---")
+        return
+    search = st.text_input("Search Gangs").strip().lower()
+    gangs = [g for g in st.session_state.gangs if search in g.gang_name.lower()] if search else list(st.session_state.gangs)
+    for gang in paginate(gangs, GANGS_PER_PAGE, "gang_page"):
+        with st.expander(f"{gang.gang_name} ({gang.gang_type})"):
+            st.write(f"**Credits:** {gang.credits} | **Reputation:** {gang.reputation}")
+            st.write(f"**Territories:** {len(gang.territories)}")
+            st.write("**Fighters:**")
+            if gang.gangers:
+                for fighter in paginate(gang.gangers, FIGHTERS_PER_PAGE, f"fighter_page_{gang.gang_id}"):
+                    st.write(f"- {fighter.name} ({fighter.type})")
+                    if st.button(f"View {fighter.name} Details", key=f"view_{fighter.ganger_id}",
+                                 on_click=select_fighter, args=(gang.gang_id, fighter.ganger_id)):
+                        # A fragment can't rerun another one; the list itself is only one page
+                        st.rerun()
+            elif gang.roster_error:
+                st.error(f"This gang's roster could not be loaded: {gang.roster_error}")
+            else:
+                st.info("No fighters found for this gang.")
+            st.markdown("---")
 
+@fragment
+def add_gang_form():
     st.markdown("### Add New Gang")
-    gang_name_input = st.text_input("Gang Name")
-    gang_type_input = st.selectbox("Gang Type", [
-        "House Orlock", "House Goliath", "House Escher",
-        "House Van Saar", "House Delaque", "House Cawdor",
-        "Enforcers", "Genestealer Cults", "Squat Prospectors",
-        "Chaos Cults", "Corpse Grinder Cults", "Venators (Bounty Hunters)",
-        "Slave Ogryns", "Ash Waste Nomads", "Outcast Gangs"
-    ])
-    campaign_input = st.text_input("Campaign", value="Power Play")
-    credits_input = st.number_input("Starting Credits", min_value=0, value=160)
-    reputation_input = st.number_input("Reputation", min_value=0, value=6)
-    if st.button("Register Gang"):
+    with st.form("add_gang_form"):
+        gang_name_input = st.text_input("Gang Name")
+        gang_type_input = st.selectbox("Gang Type", [
+            "House Orlock", "House Goliath", "House Escher",
+            "House Van Saar", "House Delaque", "House Cawdor",
+            "Enforcers", "Genestealer Cults", "Squat Prospectors",
+            "Chaos Cults", "Corpse Grinder Cults", "Venators (Bounty Hunters)",
+            "Slave Ogryns", "Ash Waste Nomads", "Outcast Gangs"
+        ])
+        campaign_input = st.text_input("Campaign", value="Power Play")
+        credits_input = st.number_input("Starting Credits", min_value=0, value=160)
+        reputation_input = st.number_input("Reputation", min_value=0, value=6)
+        submitted = st.form_submit_button("Register Gang")
+    if submitted:
         if gang_name_input:
             try:
                 new_gang = Gang(
@@ -67,16 +96,32 @@ with col1:
                 st.success(f"Registered {gang_name_input}!")
             except ValidationError as e:
                 st.error(f"Error creating gang: {e}")
+            except ConflictError as e:
+                report_conflict(e)
         else:
             st.error("Please enter a gang name.")
 
 ### Right Column: Selected Fighter Details
-with col2:
+@fragment
+def fighter_detail():
     st.header("Fighter Details")
-    if st.session_state.selected_fighter is not None:
-        fighter_info = st.session_state.selected_fighter
-        fighter = fighter_info["fighter"]
-        gang = fighter_info["gang"]
+    index = get_campaign_index()
+
+    # Picking here reruns only this pane
+    gang_ids = [g.gang_id for g in st.session_state.gangs]
+    if st.session_state.detail_gang_id not in gang_ids:
+        select_fighter(None, None)
+    st.selectbox("Gang", [None] + gang_ids, key="detail_gang_id",
+                 format_func=lambda gang_id: "Select a gang" if gang_id is None else index.gang(gang_id).gang_name)
+    gang = index.gang(st.session_state.detail_gang_id) if st.session_state.detail_gang_id else None
+    fighters = {f.ganger_id: f for f in gang.gangers} if gang else {}
+    if st.session_state.detail_ganger_id not in fighters:
+        st.session_state.detail_ganger_id = None
+    st.selectbox("Fighter", [None] + list(fighters), key="detail_ganger_id",
+                 format_func=lambda ganger_id: "Select a fighter" if ganger_id is None else fighters[ganger_id].name)
+
+    if st.session_state.detail_ganger_id is not None:
+        fighter = fighters[st.session_state.detail_ganger_id]
 
         st.markdown(f"## {fighter.name} ({fighter.type})")
         st.markdown("---")
@@ -127,8 +172,13 @@ with col2:
             st.markdown(f"**Notes:** {fighter.notes}")
         st.markdown(f"**Last Updated:** {fighter.datetime_updated}")
 
-        if st.button("Clear Selection"):
-            st.session_state.selected_fighter = None
-            st.experimental_rerun()
+        st.button("Clear Selection", on_click=select_fighter, args=(None, None))
     else:
         st.info("Select a fighter from the left to view details.")
+
+with col1:
+    gang_list()
+    add_gang_form()
+
+with col2:
+    fighter_detail()
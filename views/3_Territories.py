@@ -2,6 +2,7 @@
 import streamlit as st
 import plotly.express as px
 import pandas as pd
+from campaign_store import get_campaign_index, shared_cache_key
 
 st.title("Campaign Territory Chart")
 
@@ -13,20 +14,19 @@ if "gangs" not in st.session_state or "territories" not in st.session_state:
 # Define a constant campaign name (this could be dynamic if you have metadata).
 campaign_name = "Necromunda Campaign"
 
-@st.cache_data(ttl=300)  # Cache territory visualization data for 5 minutes
-def prepare_territory_data(_gangs, _territories):
+def prepare_territory_data(gangs, control):
     data = []
-    for gang in _gangs:
-        # Find territories controlled by this gang.
-        controlled_territories = [t for t in st.session_state.territories if t.controlled_by == gang.gang_name]
+    for gang in gangs:
+        # Territories controlled by this gang, from the territory-control index.
+        controlled_territories = control.territories_of(gang.gang_name)
 
         # If the gang controls at least one territory, add each territory as a row.
         if controlled_territories:
-            for territory in controlled_territories:
+            for territory_name in controlled_territories:
                 data.append({
                     "Campaign": campaign_name,
                     "Gang": gang.gang_name,
-                    "Territory": territory.name
+                    "Territory": territory_name
                 })
         else:
             # If the gang controls no territory, add a row with a placeholder.
@@ -37,8 +37,16 @@ def prepare_territory_data(_gangs, _territories):
             })
     return data
 
+@st.cache_data(max_entries=4)  # Shared by sessions without changes of their own; see shared_cache_key()
+def cached_territory_data(_gangs, _control, version):  # noqa: ARG001 (version is the cache key)
+    return prepare_territory_data(_gangs, _control)
+
 # Create the data
-data = prepare_territory_data(st.session_state.gangs, st.session_state.territories)
+cache_key = shared_cache_key(st.session_state.gangs, st.session_state.territories)
+if cache_key is None:
+    data = prepare_territory_data(st.session_state.gangs, get_campaign_index().control)
+else:
+    data = cached_territory_data(st.session_state.gangs, get_campaign_index().control, cache_key)
 
 # Convert the list into a DataFrame.
 df = pd.DataFrame(data)
@@ -1,6 +1,7 @@
 import streamlit as st
 from datetime import datetime
-from common import LocalBattle, save_data
+from common import ConflictError, LocalBattle, save_data
+from campaign_store import report_conflict
 
 def show_battles():
     st.subheader("Battle Recording")
@@ -22,7 +23,10 @@ def show_battles():
                     participating_gangs=participating_gangs
                 )
                 st.session_state.battles.append(new_battle)
-                save_data(st.session_state.gangs, st.session_state.territories, st.session_state.battles)
+                try:
+                    save_data(st.session_state.gangs, st.session_state.territories, st.session_state.battles)
+                except ConflictError as e:
+                    report_conflict(e)
                 st.success("Battle recorded!")
             else:
                 st.error("Complete all battle details and select participants.")
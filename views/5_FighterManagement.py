@@ -2,7 +2,55 @@ import streamlit as st
 import pandas as pd
 from datetime import datetime
 from pydantic import ValidationError
-from common import Gang, GangFighter, Equipment, save_data
+from common import ConflictError, GangFighter, save_data, checkout
+from campaign_store import get_campaign_index, report_conflict
+
+# Columns of the roster editor, in order; gang and ganger_id identify the row
+EDITABLE_FIELDS = [
+    "name", "type", "m", "ws", "bs", "s", "t", "w", "i", "a", "ld",
+    "cl", "wil", "intelligence", "cost", "xp", "kills",
+    "advance_count", "status", "notes", "equipment", "injuries",
+]
+
+def split_names(value):
+    """Names from a comma-separated cell."""
+    return [name.strip() for name in (value or "").split(",") if name.strip()]
+
+def fighter_row(gang, fighter):
+    row = {"gang": gang.gang_name}
+    for field in EDITABLE_FIELDS[:-2]:
+        row[field] = getattr(fighter, field)
+    # For equipment and injuries, join list elements into a comma-separated string.
+    row["equipment"] = ", ".join(eq.name for eq in fighter.equipment)
+    row["injuries"] = ", ".join(fighter.injuries)
+    return row
+
+def changed_cells(original, edited):
+    """ganger_id -> {column: new value} for every cell the editor changed."""
+    differs = original.ne(edited) & ~(original.isna() & edited.isna())
+    changes = {}
+    for ganger_id, row in differs[differs.any(axis=1)].iterrows():
+        changes[ganger_id] = {
+            column: edited.at[ganger_id, column] for column in row.index[row.to_numpy()]
+        }
+    return changes
+
+def validate_changes(fighter, changes):
+    """The fighter with `changes` applied, validated as a whole; the fighter itself is untouched."""
+    values = fighter.model_dump()
+    for column, value in changes.items():
+        value = value.item() if hasattr(value, "item") else value  # numpy scalars from the editor
+        if column == "equipment":
+            # Keep the items (and quantities) of names still listed; new names get one of each
+            current = {eq.name: eq for eq in fighter.equipment}
+            value = [
+                current[name].model_dump() if name in current else {"name": name, "qty": 1}
+                for name in split_names(value)
+            ]
+        elif column == "injuries":
+            value = split_names(value)
+        values[column] = value
+    return GangFighter(**values)
 
 st.title("Fighter Management")
 
@@ -11,159 +59,67 @@ if "gangs" not in st.session_state or not st.session_state.gangs:
     st.error("No gangs loaded. Please add a gang first.")
     st.stop()
 
-# --- Select a Gang ---
-gang_options = {gang.gang_name: gang for gang in st.session_state.gangs}
-selected_gang_name = st.selectbox("Select a Gang", list(gang_options.keys()))
-selected_gang = gang_options[selected_gang_name]
-
-# --- Select a Fighter from the Selected Gang ---
-if selected_gang.gangers:
-    fighter_options = {
-        fighter.name: fighter
-        for fighter in selected_gang.gangers
-    }
-    selected_fighter_name = st.selectbox("Select a Fighter",
-                                         list(fighter_options.keys()))
-    selected_fighter = fighter_options[selected_fighter_name]
-else:
-    st.info("No fighters available for this gang. Please add a fighter first.")
-    st.stop()
+index = get_campaign_index()
 
-st.markdown("## Edit Fighter Details")
-
-# Prepare a dictionary of fighter attributes for editing.
-# We include a subset of fields that are safe to edit.
-editable_fields = {
-    "name":
-    selected_fighter.name,
-    "type":
-    selected_fighter.type,
-    "m":
-    selected_fighter.m,
-    "ws":
-    selected_fighter.ws,
-    "bs":
-    selected_fighter.bs,
-    "s":
-    selected_fighter.s,
-    "t":
-    selected_fighter.t,
-    "w":
-    selected_fighter.w,
-    "i":
-    selected_fighter.i,
-    "a":
-    selected_fighter.a,
-    "ld":
-    selected_fighter.ld,
-    "cl":
-    selected_fighter.cl,
-    "wil":
-    selected_fighter.wil,
-    "intelligence":
-    selected_fighter.intelligence,
-    "cost":
-    selected_fighter.cost,
-    "xp":
-    selected_fighter.xp,
-    "kills":
-    selected_fighter.kills,
-    "advance_count":
-    selected_fighter.advance_count,
-    "status":
-    selected_fighter.status,
-    "notes":
-    selected_fighter.notes,
-    # For equipment and injuries, join list elements into a comma-separated string.
-    "equipment":
-    ", ".join(eq.name for eq in selected_fighter.equipment)
-    if selected_fighter.equipment else "",
-    "injuries":
-    ", ".join(selected_fighter.injuries) if selected_fighter.injuries else "",
+# --- Select Gangs ---
+gang_names = [gang.gang_name for gang in st.session_state.gangs]
+selected_gang_names = st.multiselect("Select Gangs", gang_names, default=gang_names[:1])
+selected_gangs = [index.gang_named(name) for name in selected_gang_names]
+
+rows = {
+    fighter.ganger_id: fighter_row(gang, fighter)
+    for gang in selected_gangs
+    for fighter in gang.gangers
 }
+if not rows:
+    st.info("No fighters available for the selected gangs. Please add a fighter first.")
+    st.stop()
 
-# Convert the dictionary to a one-row DataFrame for editing.
-df = pd.DataFrame([editable_fields])
-
-st.write("Edit fighter details below:")
-edited_df = st.data_editor(df, num_rows="fixed", use_container_width=True)
-
-# Button to save changes back to the fighter model
-if st.button("Save Changes"):
-    updated_values = edited_df.iloc[0].to_dict()
-    # Update fighter's basic stats
-    for field in [
-            "name", "type", "m", "ws", "bs", "s", "t", "w", "i", "a", "ld",
-            "cl", "wil", "intelligence", "cost", "xp", "kills",
-            "advance_count", "status", "notes"
-    ]:
-        try:
-            setattr(selected_fighter, field, updated_values[field])
-        except Exception as e:
-            st.error(f"Error updating field {field}: {e}")
-    # For equipment and injuries, split the string by commas (if non-empty)
-    if updated_values.get("equipment", "").strip():
-        equipment_names = [
-            name.strip() for name in updated_values["equipment"].split(",")
-            if name.strip()
-        ]
-        # Optionally, you could update quantities or create new Equipment objects here.
-        # For simplicity, we update equipment as a list of Equipment objects with default quantity 1.
-        selected_fighter.equipment = [
-            Equipment(name=name, qty=1) for name in equipment_names
-        ]
-    else:
-        selected_fighter.equipment = []
-
-    if updated_values.get("injuries", "").strip():
-        injuries_list = [
-            inj.strip() for inj in updated_values["injuries"].split(",")
-            if inj.strip()
-        ]
-        selected_fighter.injuries = injuries_list
-    else:
-        selected_fighter.injuries = []
+st.markdown("## Edit Rosters")
+if "roster_saved" in st.session_state:
+    st.success(st.session_state.pop("roster_saved"))
 
-    # Update last updated timestamp
-    selected_fighter.datetime_updated = datetime.now().strftime(
-        "%Y-%m-%d %H:%M:%S")
+original_df = pd.DataFrame.from_dict(rows, orient="index")
+original_df.index.name = "ganger_id"
 
-    # Persist changes using the save_data function
-    save_data(st.session_state.gangs, st.session_state.territories,
-              st.session_state.battles)
+st.write("Edit fighter details below; only changed rows are validated and saved.")
+edited_df = st.data_editor(
+    original_df, num_rows="fixed", use_container_width=True, disabled=["gang"],
+    key=f"roster_editor_{'|'.join(selected_gang_names)}",
+)
 
-    st.success(f"Fighter '{selected_fighter.name}' updated successfully!")
-    st.experimental_rerun()
+changes = changed_cells(original_df, edited_df)
+if changes:
+    st.caption(f"{len(changes)} fighter(s) changed")
 
-# --- Display Current Fighter Details for Confirmation ---
-st.markdown("### Current Fighter Details")
-st.markdown(f"**Name:** {selected_fighter.name}")
-st.markdown(f"**Type:** {selected_fighter.type}")
-st.markdown(
-    f"**M:** {selected_fighter.m} | **WS:** {selected_fighter.ws} | **BS:** {selected_fighter.bs}"
-)
-st.markdown(
-    f"**S:** {selected_fighter.s} | **T:** {selected_fighter.t} | **W:** {selected_fighter.w}"
-)
-st.markdown(f"**I:** {selected_fighter.i} | **A:** {selected_fighter.a}")
-st.markdown(
-    f"**Ld:** {selected_fighter.ld} | **Cl:** {selected_fighter.cl} | **Wil:** {selected_fighter.wil}"
-)
-st.markdown(f"**Int:** {selected_fighter.intelligence}")
-st.markdown(
-    f"**Cost:** {selected_fighter.cost} | **XP:** {selected_fighter.xp}")
-st.markdown(
-    f"**Kills:** {selected_fighter.kills} | **Advance Count:** {selected_fighter.advance_count}"
-)
-st.markdown("---")
-st.markdown("#### Equipment")
-if selected_fighter.equipment:
-    for eq in selected_fighter.equipment:
-        st.markdown(f"- **{eq.name}** (Qty: {eq.qty})")
-else:
-    st.markdown("_None_")
-st.markdown("#### Injuries")
-if selected_fighter.injuries:
-    st.markdown(", ".join(selected_fighter.injuries))
-else:
-    st.markdown("_None_")
+# Button to save every changed fighter in one commit
+if st.button("Save Changes", disabled=not changes):
+    validated, errors = {}, []
+    for ganger_id, fighter_changes in changes.items():
+        fighter = index.fighter(ganger_id)[1]
+        try:
+            validated[ganger_id] = (validate_changes(fighter, fighter_changes), fighter_changes)
+        except ValidationError as e:
+            errors.append(f"{fighter.name}: {e}")
+
+    if errors:
+        for error in errors:
+            st.error(f"Error updating fighter {error}")
+    else:
+        now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        for ganger_id, (candidate, fighter_changes) in validated.items():
+            # Edit this session's own copy of the gang rather than the shared snapshot
+            checkout(st.session_state.gangs, index.fighter(ganger_id)[0])
+            fighter = index.fighter(ganger_id)[1]
+            for field in fighter_changes:
+                setattr(fighter, field, getattr(candidate, field))
+            fighter.datetime_updated = now
+
+        # Only the changed gangs are written, in a single commit
+        try:
+            save_data(st.session_state.gangs, None, None)
+        except ConflictError as e:
+            report_conflict(e)
+
+        st.session_state.roster_saved = f"Updated {len(validated)} fighter(s)."
+        st.rerun()
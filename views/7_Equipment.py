@@ -1,5 +1,7 @@
 import streamlit as st
 from common import Equipment  # Import Equipment model from the common module
+from campaign_store import get_campaign_index
+from equipment_catalog import catalog
 from pydantic import ValidationError
 
 st.title("Equipment Management")
@@ -10,18 +12,18 @@ st.write("Manage your equipment library. Here you can add new equipment items, v
 if "equipment_list" not in st.session_state:
     st.session_state.equipment_list = []
 
+# Names already in the library, for constant-time duplicate checks
+library_names = {eq.name for eq in st.session_state.equipment_list}
+
 # --- Populate Equipment from Gang Data ---
-# Iterate over all gangs and their fighters. If a fighter has an equipment item not already in our equipment_list (by name),
-# add it to the equipment_list.
+# The campaign index knows which catalog items gangs hold (from the gang headers), so
+# each distinct item is checked once without loading every roster.
 if "gangs" in st.session_state:
-    for gang in st.session_state.gangs:
-        if hasattr(gang, "gangers"):
-            for fighter in gang.gangers:
-                if hasattr(fighter, "equipment"):
-                    for eq in fighter.equipment:
-                        # Check if an equipment item with the same name exists already (you can adjust this condition if needed)
-                        if not any(existing.name == eq.name for existing in st.session_state.equipment_list):
-                            st.session_state.equipment_list.append(eq)
+    for catalog_id in get_campaign_index().equipment_holders():
+        item = catalog.get(catalog_id)
+        if item.name not in library_names:
+            st.session_state.equipment_list.append(Equipment(item=item, qty=1))
+            library_names.add(item.name)
 
 # --- Form to add new equipment manually ---
 with st.form("add_equipment_form"):
@@ -41,7 +43,7 @@ with st.form("add_equipment_form"):
                     traits=equipment_traits
                 )
                 # Check if equipment with the same name already exists
-                if any(eq.name == new_equipment.name for eq in st.session_state.equipment_list):
+                if new_equipment.name in library_names:
                     st.warning(f"Equipment '{equipment_name}' already exists.")
                 else:
                     st.session_state.equipment_list.append(new_equipment)
@@ -3,7 +3,8 @@
 import streamlit as st
 import requests
 from datetime import datetime
-from common import Gang, save_data  # Import necessary models and functions
+from common import ConflictError, Gang, save_data, upsert  # Import necessary models and functions
+from campaign_store import report_conflict
 import json
 
 st.title("Import Yaktribe Gang")
@@ -63,16 +64,8 @@ if st.button("Import Gang"):
                 gangers=gang_data.get("gangers", [])
             )
 
-            # Check if a gang with this gang_id already exists in session state.
-            exists = False
-            for idx, existing in enumerate(st.session_state.gangs):
-                if existing.gang_id == new_gang.gang_id:
-                    st.session_state.gangs[idx] = new_gang  # Update the existing gang.
-                    exists = True
-                    break
-
-            if not exists:
-                st.session_state.gangs.append(new_gang)  # Add new gang if not found.
+            # Replace the gang with this gang_id if it already exists, otherwise add it.
+            exists = upsert(st.session_state.gangs, new_gang, "gang_id")
 
             # Save the updated data to campaign_data.json.
             save_data(st.session_state.gangs, st.session_state.territories, st.session_state.battles)
@@ -83,5 +76,7 @@ if st.button("Import Gang"):
                 st.success(f"Imported gang '{new_gang.gang_name}' successfully!")
     except requests.RequestException as e:
         st.error(f"HTTP error: {e}")
+    except ConflictError as e:
+        report_conflict(e)
     except Exception as e:
         st.error(f"Error importing Yaktribe gang: {e}")
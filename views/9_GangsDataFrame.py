@@ -1,6 +1,7 @@
 import streamlit as st
 import pandas as pd
-from common import Gang  # Import the Gang model from common.py
+from common import STAT_NAMES
+from campaign_store import shared_cache_key
 
 st.title("Gangs Data Overview")
 
@@ -9,10 +10,9 @@ if "gangs" not in st.session_state or not st.session_state.gangs:
     st.error("No gangs loaded. Please add some gangs first.")
     st.stop()
 
-@st.cache_data(ttl=300)  # Cache gang summary data for 5 minutes
-def create_gang_summary(_gangs):
+def create_gang_summary(gangs):
     data = []
-    for gang in _gangs:
+    for gang in gangs:
         data.append({
         "Gang ID": gang.gang_id,
         "Name": gang.gang_name,
@@ -21,17 +21,37 @@ def create_gang_summary(_gangs):
         "Credits": gang.credits,
         "Reputation": gang.reputation,
         "Territories": ", ".join(gang.territories) if gang.territories else "",
-        "Fighters Count": len(gang.gangers) if hasattr(gang, "gangers") else 0,
+        "Fighters Count": gang.fighter_count,  # doesn't load the roster
     })
     return data
 
+def create_stat_averages(gangs):
+    # Characteristic totals come from the gang headers, so rosters aren't loaded
+    rows = {}
+    for gang in gangs:
+        if gang.fighter_count:
+            rows[gang.gang_name] = (gang.stat_totals / gang.fighter_count).round(1)
+    return pd.DataFrame.from_dict(rows, orient="index", columns=[name.upper() if name != "intelligence" else "INT" for name in STAT_NAMES])
+
+@st.cache_data(max_entries=4)  # Shared by sessions without changes of their own; see shared_cache_key()
+def cached_gang_tables(_gangs, version):  # noqa: ARG001 (version is the cache key)
+    return create_gang_summary(_gangs), create_stat_averages(_gangs)
+
+cache_key = shared_cache_key(st.session_state.gangs)
+if cache_key is None:
+    data, stat_averages = create_gang_summary(st.session_state.gangs), create_stat_averages(st.session_state.gangs)
+else:
+    data, stat_averages = cached_gang_tables(st.session_state.gangs, cache_key)
+
 # Create a DataFrame from the list of dictionaries
-data = create_gang_summary(st.session_state.gangs)
 df = pd.DataFrame(data)
 
 st.markdown("### Gangs Summary Table")
 st.dataframe(df, use_container_width=True)
 
+st.markdown("### Average Characteristics")
+st.dataframe(stat_averages, use_container_width=True)
+
 # Optionally allow the user to download the DataFrame as CSV.
 csv = df.to_csv(index=False).encode("utf-8")
 st.download_button(
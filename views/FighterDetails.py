@@ -2,6 +2,7 @@
 
 import streamlit as st
 from common import Gang, GangFighter
+from campaign_store import get_campaign_index
 
 def show_fighter_details():
     st.subheader("Fighter Details")
@@ -17,17 +18,18 @@ def show_fighter_details():
     fighter_id = st.session_state.selected_fighter_id
     gang_id = st.session_state.selected_gang_id
 
-    # Find the matching gang using next()
-    target_gang = next((g for g in st.session_state.gangs if g.gang_id == gang_id), None)
+    # Look both up in the campaign index
+    index = get_campaign_index()
+    target_gang = index.gang(gang_id)
     if not target_gang:
         st.error("Selected gang not found.")
         return
 
-    # Find the matching fighter within the gang
-    target_fighter = next((f for f in target_gang.gangers if f.ganger_id == fighter_id), None)
-    if not target_fighter:
+    found = index.fighter(fighter_id)
+    if not found or found[0] is not target_gang:
         st.error("Selected fighter not found.")
         return
+    target_fighter = found[1]
 
     # Display fighter header
     st.markdown(f"## {target_fighter.name} ({target_fighter.type})")